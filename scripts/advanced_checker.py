@@ -4,20 +4,55 @@ Advanced Link Testing Module
 Tests for redirects, SSL certificates, metadata, and SEO compliance
 """
 
+import argparse
 import asyncio
 import aiohttp
+import os
 import ssl
-import socket
+import time
 from datetime import datetime
 from typing import Dict, List, Optional
+from urllib.parse import urlparse
 import json
-from bs4 import BeautifulSoup
+
+from exclusions import ExclusionMatcher
+from host_limiter import AdaptiveHostLimiter
+from link_extractor import extract_metadata
+from url_canon import canonicalize
+
+EN_DEEP_LINKS = "registry/en_deep_links.json"
+LOCALE_MAP = "registry/locale_map.json"
+# Written by crawler.py: per-page state including the metadata of every crawled page
+CRAWL_STATE = "registry/crawl_state.json"
+OUTPUT_JSON = "data/advanced_checks.json"
+# URLs checked at once by check_many; each host is also paced by an adaptive limiter
+ADVANCED_CONCURRENCY = 20
+HOST_INITIAL_RATE = 5.0
+SSL_TIMEOUT = 5
+HTML_TYPES = ("text/html", "application/xhtml+xml")
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
+}
+
+def load_crawl_metadata(state_file: str = CRAWL_STATE) -> Dict[str, Dict]:
+    """Metadata the crawler extracted from each page, by canonical URL"""
+    if os.path.exists(state_file):
+        try:
+            with open(state_file, 'r') as f:
+                state = json.load(f)
+            return {canonicalize(url): {'available': True, **entry['metadata']}
+                    for url, entry in state.items() if entry.get('metadata')}
+        except:
+            pass
+    return {}
 
 class AdvancedLinkChecker:
     """Advanced testing for links including SSL, redirects, metadata, SEO"""
     
     def __init__(self, timeout: int = 15):
         self.timeout = timeout
+        # Certificates are per host, so concurrent checks of one host share a single handshake
+        self._certificates = {}
     
     async def check_ssl_certificate(self, url: str) -> Dict:
         """
@@ -25,54 +60,65 @@ class AdvancedLinkChecker:
         Returns certificate info and expiration warning
         """
         try:
-            from urllib.parse import urlparse
             parsed = urlparse(url)
-            hostname = parsed.netloc
             
             if not parsed.scheme == 'https':
                 return {'valid': True, 'message': 'Not HTTPS', 'status': 'info'}
             
-            # Create SSL context
-            context = ssl.create_default_context()
-            
-            try:
-                with socket.create_connection((hostname, 443), timeout=5) as sock:
-                    with context.wrap_socket(sock, server_hostname=hostname) as ssock:
-                        cert = ssock.getpeercert()
-                        
-                        if not cert:
-                            return {'valid': False, 'message': 'No certificate', 'status': 'error'}
-                        
-                        # Check expiration
-                        from datetime import datetime
-                        not_after = datetime.strptime(cert['notAfter'], '%b %d %H:%M:%S %Y %Z')
-                        days_until_expiry = (not_after - datetime.utcnow()).days
-                        
-                        if days_until_expiry < 0:
-                            return {
-                                'valid': False,
-                                'message': f'Certificate expired {abs(days_until_expiry)} days ago',
-                                'status': 'error',
-                                'expires': cert['notAfter']
-                            }
-                        elif days_until_expiry < 30:
-                            return {
-                                'valid': True,
-                                'message': f'Certificate expires in {days_until_expiry} days',
-                                'status': 'warning',
-                                'expires': cert['notAfter']
-                            }
-                        else:
-                            return {
-                                'valid': True,
-                                'message': f'Certificate valid for {days_until_expiry} days',
-                                'status': 'ok',
-                                'expires': cert['notAfter']
-                            }
-            except socket.timeout:
-                return {'valid': False, 'message': 'Connection timeout', 'status': 'error'}
+            key = (parsed.hostname, parsed.port or 443)
+            if key not in self._certificates:
+                self._certificates[key] = asyncio.ensure_future(self._certificate_status(*key))
+            return dict(await self._certificates[key])
+        except Exception as e:
+            return {'valid': False, 'message': f'Error: {str(e)}', 'status': 'error'}
+    
+    async def _certificate_status(self, hostname: str, port: int) -> Dict:
+        """Handshake with a host without blocking the event loop and grade its certificate"""
+        # Create SSL context
+        context = ssl.create_default_context()
+        
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(hostname, port, ssl=context, server_hostname=hostname), timeout=SSL_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            return {'valid': False, 'message': 'Connection timeout', 'status': 'error'}
         except Exception as e:
             return {'valid': False, 'message': f'Error: {str(e)}', 'status': 'error'}
+        
+        try:
+            cert = writer.get_extra_info('peercert')
+        finally:
+            writer.close()
+        
+        if not cert:
+            return {'valid': False, 'message': 'No certificate', 'status': 'error'}
+        
+        # Check expiration
+        not_after = datetime.strptime(cert['notAfter'], '%b %d %H:%M:%S %Y %Z')
+        days_until_expiry = (not_after - datetime.utcnow()).days
+        
+        if days_until_expiry < 0:
+            return {
+                'valid': False,
+                'message': f'Certificate expired {abs(days_until_expiry)} days ago',
+                'status': 'error',
+                'expires': cert['notAfter']
+            }
+        elif days_until_expiry < 30:
+            return {
+                'valid': True,
+                'message': f'Certificate expires in {days_until_expiry} days',
+                'status': 'warning',
+                'expires': cert['notAfter']
+            }
+        else:
+            return {
+                'valid': True,
+                'message': f'Certificate valid for {days_until_expiry} days',
+                'status': 'ok',
+                'expires': cert['notAfter']
+            }
     
     async def check_redirect_chain(self, url: str, session: aiohttp.ClientSession) -> Dict:
         """
@@ -157,58 +203,34 @@ class AdvancedLinkChecker:
             async with session.get(url, timeout=self.timeout) as resp:
                 if resp.status != 200:
                     return {'available': False, 'status': resp.status}
+                # Images, PDFs and other downloads have no metadata; don't read their bodies
+                if resp.content_type not in HTML_TYPES:
+                    return {'available': False, 'status': resp.status, 'contentType': resp.content_type}
                 
                 html = await resp.text()
-                soup = BeautifulSoup(html, 'html.parser')
-                
-                metadata = {
-                    'available': True,
-                    'title': soup.title.string if soup.title else None,
-                    'meta': {}
-                }
-                
-                # Extract meta tags
-                meta_tags = soup.find_all('meta')
-                for tag in meta_tags:
-                    name = tag.get('name') or tag.get('property')
-                    content = tag.get('content')
-                    
-                    if name and content:
-                        metadata['meta'][name] = content
-                
-                # Extract Open Graph
-                og_tags = {
-                    'og:title': None,
-                    'og:description': None,
-                    'og:image': None,
-                    'og:type': None
-                }
-                
-                for og_key in og_tags.keys():
-                    og_tag = soup.find('meta', property=og_key)
-                    if og_tag:
-                        og_tags[og_key] = og_tag.get('content')
-                
-                metadata['openGraph'] = og_tags
-                
-                # Check for schema.org
-                schema_tag = soup.find('script', type='application/ld+json')
-                metadata['hasSchemaOrg'] = schema_tag is not None
+                metadata = {'available': True}
+                metadata.update(extract_metadata(html))
                 
                 return metadata
         except Exception as e:
             return {'available': False, 'error': str(e)}
     
-    async def check_seo_compliance(self, url: str, session: aiohttp.ClientSession) -> Dict:
+    async def check_seo_compliance(self, url: str, session: aiohttp.ClientSession,
+                                   metadata: Optional[Dict] = None) -> Dict:
         """
         Check SEO compliance
+        Uses metadata already extracted (e.g. by the crawler) when given, otherwise fetches the page
         Returns issues found
         """
         issues = []
         
         try:
-            metadata = await self.extract_metadata(url, session)
+            if metadata is None:
+                metadata = await self.extract_metadata(url, session)
             
+            if metadata.get('contentType'):
+                return {'compliant': None, 'issues': [], 'score': None,
+                        'message': f"Not an HTML page ({metadata['contentType']})"}
             if not metadata.get('available'):
                 return {'compliant': False, 'issues': ['Page not accessible'], 'score': 0}
             
@@ -253,21 +275,94 @@ class AdvancedLinkChecker:
     
     async def full_check(self, url: str) -> Dict:
         """Run all advanced tests on a URL"""
-        connector = aiohttp.TCPConnector(limit=1)
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
+        return (await self.check_many([url]))[0]
+    
+    async def check_many(self, urls: List[str], metadata: Optional[Dict[str, Dict]] = None,
+                         concurrency: int = ADVANCED_CONCURRENCY) -> List[Dict]:
+        """
+        Run all advanced tests on many URLs over one shared session and connection pool
+        The SSL, redirect and SEO tests of a URL run concurrently, up to `concurrency` URLs at once.
+        Pages in `metadata` (by default the crawler's, keyed by canonical URL) are audited without a fetch
+        """
+        if metadata is None:
+            metadata = load_crawl_metadata()
+        self._certificates = {}
+        limiter = AdaptiveHostLimiter(initial_rate=HOST_INITIAL_RATE, max_window=concurrency)
+        sem = asyncio.Semaphore(concurrency)
+        connector = aiohttp.TCPConnector(limit=concurrency, use_dns_cache=True, ttl_dns_cache=300)
         
-        async with aiohttp.ClientSession(connector=connector, headers=headers) as session:
-            results = {
-                'url': url,
-                'checked_at': datetime.now().isoformat(),
-                'ssl_certificate': await self.check_ssl_certificate(url),
-                'redirect_chain': await self.check_redirect_chain(url, session),
-                'seo_compliance': await self.check_seo_compliance(url, session)
-            }
+        async with aiohttp.ClientSession(connector=connector, headers=HEADERS) as session:
+            async def check_one(url):
+                # Wait on the host first so a slow host never holds a global slot
+                async with limiter.throttle(url):
+                    async with sem:
+                        start = time.monotonic()
+                        ssl_info, redirects, seo = await asyncio.gather(
+                            self.check_ssl_certificate(url),
+                            self.check_redirect_chain(url, session),
+                            self.check_seo_compliance(url, session, metadata.get(canonicalize(url)))
+                        )
+                chain = redirects.get('chain') or []
+                limiter.observe(url, chain[0]['status'] if chain else None, (time.monotonic() - start) * 1000)
+                return {
+                    'url': url,
+                    'checked_at': datetime.now().isoformat(),
+                    'ssl_certificate': ssl_info,
+                    'redirect_chain': redirects,
+                    'seo_compliance': seo
+                }
             
-            return results
+            return await asyncio.gather(*(check_one(url) for url in urls))
+
+def load_registered_urls() -> List[str]:
+    """Every English deep link and locale URL the link checker knows, minus whitelisted ones"""
+    urls = {}
+    if os.path.exists(EN_DEEP_LINKS):
+        with open(EN_DEEP_LINKS, 'r') as f:
+            for item in json.load(f):
+                url = item if isinstance(item, str) else item['url']
+                urls.setdefault(canonicalize(url), None)
+    if os.path.exists(LOCALE_MAP):
+        with open(LOCALE_MAP, 'r') as f:
+            for locale_urls in json.load(f).values():
+                for url in locale_urls:
+                    urls.setdefault(canonicalize(url), None)
+    exclusions = ExclusionMatcher.from_sources()
+    return [url for url in urls if url.startswith(('http://', 'https://')) and not exclusions.matches(url)]
+
+async def check_all(concurrency: int = ADVANCED_CONCURRENCY):
+    """Advanced checks across every registered URL, saved to OUTPUT_JSON"""
+    start_time = time.time()
+    urls = load_registered_urls()
+    metadata = load_crawl_metadata()
+    reused = sum(1 for url in urls if url in metadata)
+    print(f"🔍 Advanced checks on {len(urls)} URLs ({reused} audited from crawl metadata, {concurrency} at a time)...")
+    
+    results = await AdvancedLinkChecker().check_many(urls, metadata, concurrency)
+    
+    summary = {'ssl': {}, 'redirects': {}}
+    scores = []
+    for result in results:
+        for key, test in (('ssl', 'ssl_certificate'), ('redirects', 'redirect_chain')):
+            status = result[test]['status']
+            summary[key][status] = summary[key].get(status, 0) + 1
+        # The page metadata is already in the crawl state
+        result['seo_compliance'].pop('metadata', None)
+        if result['seo_compliance'].get('score') is not None:
+            scores.append(result['seo_compliance']['score'])
+    summary['avgSeoScore'] = round(sum(scores) / len(scores), 1) if scores else None
+    
+    os.makedirs(os.path.dirname(OUTPUT_JSON), exist_ok=True)
+    with open(OUTPUT_JSON, 'w', encoding='utf-8') as f:
+        json.dump({'checkedAt': datetime.now().isoformat(), 'total': len(results), 'summary': summary,
+                   'results': results}, f, separators=(',', ':'), ensure_ascii=False)
+    
+    print(f"  🔐 SSL: {summary['ssl']}")
+    print(f"  🔄 Redirects: {summary['redirects']}")
+    print(f"  📝 Average SEO Score: {summary['avgSeoScore']}/100")
+    total_time = time.time() - start_time
+    print(f"💾 Results saved to {OUTPUT_JSON}")
+    print(f"⏱️ Total time taken: {total_time:.2f} seconds ({total_time/60:.2f} minutes)")
 
 async def test_advanced_checking():
     """Test advanced checking functionality"""
@@ -279,11 +374,10 @@ async def test_advanced_checking():
         "https://example.com"
     ]
     
-    for url in test_urls:
+    results = await checker.check_many(test_urls)
+    for url, result in zip(test_urls, results):
         print(f"\n🔍 Advanced Check: {url}")
         try:
-            result = await checker.full_check(url)
-            
             # SSL Certificate
             ssl_status = result['ssl_certificate']['status']
             print(f"  🔐 SSL: {ssl_status}")
@@ -305,4 +399,11 @@ async def test_advanced_checking():
             print(f"  ❌ Error: {e}")
 
 if __name__ == "__main__":
-    asyncio.run(test_advanced_checking())
+    parser = argparse.ArgumentParser(description="SSL, redirect and SEO checks")
+    parser.add_argument("--all", action="store_true", help=f"Check every URL in {EN_DEEP_LINKS} and {LOCALE_MAP} and save to {OUTPUT_JSON}")
+    parser.add_argument("--concurrency", type=int, default=ADVANCED_CONCURRENCY, help="URLs checked at once")
+    args = parser.parse_args()
+    if args.all:
+        asyncio.run(check_all(args.concurrency))
+    else:
+        asyncio.run(test_advanced_checking())
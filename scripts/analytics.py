@@ -5,23 +5,30 @@ Generates reports, metrics, trends, and anomaly detection
 """
 
 import json
-import os
 from datetime import datetime, timedelta
 from collections import defaultdict
 from typing import Dict, List, Tuple
+import heapq
 import statistics
 
+from history_store import HistoryStore, rollup_runs
+from latency_sketch import merge_sketch_sets
+from request_timing import TIMING_PHASES, TimingHistograms, histogram_share
+from results_store import load_results
+from url_history import FLAP_THRESHOLD, UrlHistoryIndex
+
 class LinkCheckerAnalytics:
-    def __init__(self, results_file='data/results.json'):
+    def __init__(self, results_file='data/results.json', history_dir='data/history',
+                 url_history_file='data/url_history.json', response_times_file='data/response_times.json'):
         self.results_file = results_file
+        self.history = HistoryStore(history_dir)
+        self.timings = TimingHistograms.load(response_times_file)
+        self.url_history = UrlHistoryIndex(url_history_file)
         self.data = self.load_data()
     
     def load_data(self) -> Dict:
-        """Load results data from JSON"""
-        if not os.path.exists(self.results_file):
-            return None
-        with open(self.results_file, 'r') as f:
-            return json.load(f)
+        """Load results data from JSON, including the paged broken links"""
+        return load_results(self.results_file)
     
     def get_health_score(self) -> float:
         """
@@ -70,15 +77,19 @@ class LinkCheckerAnalytics:
         
         return dict(sorted(result.items(), key=lambda x: x[1]['count'], reverse=True))
     
-    def detect_anomalies(self, threshold_percent: float = 10) -> List[Dict]:
+    def _runs(self, days: int) -> List[Dict]:
+        """Runs from the last N days, falling back to trends embedded in older results files"""
+        if not self.history.is_empty():
+            return self.history.recent_runs(days)
+        start = (datetime.now() - timedelta(days=days)).isoformat()
+        return [t for t in (self.data or {}).get('trends', []) if t.get('date', '') >= start]
+
+    def detect_anomalies(self, threshold_percent: float = 10, days: int = 90) -> List[Dict]:
         """
-        Detect spikes in broken links
+        Detect spikes in broken links over the last N days
         Returns list of anomalies with details
         """
-        if not self.data or not self.data.get('trends'):
-            return []
-        
-        trends = self.data['trends']
+        trends = self._runs(days)
         if len(trends) < 2:
             return []
         
@@ -141,9 +152,38 @@ class LinkCheckerAnalytics:
         return 'F'
     
     def get_response_time_analysis(self) -> Dict:
-        """Analyze response times and identify slow links"""
+        """Analyze response times per phase and host, and identify slow links"""
+        analysis = {
+            'slowest_links': [], 'distribution': self.data.get('responseTimeDistribution', {}) if self.data else {},
+            'avg_latency_ms': 0, 'phases': {}, 'slowest_hosts': [],
+            'percentiles': self.data.get('latencyPercentiles', {}) if self.data else {}
+        }
+
+        # Phase histograms cover every checked URL, healthy or broken
+        for phase in TIMING_PHASES:
+            stats = self.timings.combined(phase)
+            count = sum(stats['counts'])
+            if count:
+                analysis['phases'][phase] = {
+                    'count': count,
+                    'avg_ms': round(stats['sum'] / count, 2),
+                    'over_1s_percent': round(histogram_share(stats['counts'], 1000) * 100, 2)
+                }
+
+        # Slow TTFB points at the server or CDN, slow DNS/connect at the network path
+        hosts = []
+        for host, phases in self.timings.hosts.items():
+            total = phases.get('total')
+            if not total or not sum(total['counts']):
+                continue
+            means = {phase: round(stats['sum'] / sum(stats['counts']), 2)
+                     for phase, stats in phases.items() if sum(stats['counts'])}
+            hosts.append({'host': host, 'checks': sum(total['counts']),
+                          **{f'avg_{phase}_ms': ms for phase, ms in means.items()}})
+        analysis['slowest_hosts'] = sorted(hosts, key=lambda x: x['avg_total_ms'], reverse=True)[:10]
+
         if not self.data or not self.data.get('brokenLinksList'):
-            return {'slowest_links': [], 'distribution': {}, 'avg_latency': 0}
+            return analysis
         
         links_with_latency = [
             link for link in self.data['brokenLinksList']
@@ -151,19 +191,15 @@ class LinkCheckerAnalytics:
         ]
         
         if not links_with_latency:
-            return {'slowest_links': [], 'distribution': {}, 'avg_latency': 0}
+            return analysis
         
         # Get slowest links
-        slowest = sorted(
-            links_with_latency,
-            key=lambda x: x['latency'],
-            reverse=True
-        )[:10]
+        slowest = heapq.nlargest(10, links_with_latency, key=lambda x: x['latency'])
         
         latencies = [link['latency'] for link in links_with_latency]
-        avg_latency = statistics.mean(latencies)
+        avg_latency = sum(latencies) / len(latencies)
         
-        return {
+        analysis.update({
             'slowest_links': [
                 {
                     'url': link['url'],
@@ -173,45 +209,48 @@ class LinkCheckerAnalytics:
                 }
                 for link in slowest
             ],
-            'distribution': self.data.get('responseTimeDistribution', {}),
             'avg_latency_ms': round(avg_latency, 2),
             'max_latency_ms': max(latencies) if latencies else 0,
             'min_latency_ms': min(latencies) if latencies else 0
+        })
+        return analysis
+    
+    def get_latency_percentiles(self, days: int = 30, limit: int = 10) -> Dict:
+        """p50/p95/p99 check time over the last N days, overall, per locale and for the slowest hosts"""
+        start = (datetime.now() - timedelta(days=days)).isoformat()
+        merged = merge_sketch_sets(self.history.sketches(start=start))
+        hosts = [{'host': host, **sketch.percentiles()} for host, sketch in merged.hosts.items() if sketch.count]
+        return {
+            'days': days,
+            'overall': merged.run.percentiles(),
+            'locales': {locale: sketch.percentiles() for locale, sketch in merged.locales.items() if sketch.count},
+            'slowest_hosts': heapq.nlargest(limit, hosts, key=lambda x: x['p95'])
         }
     
     def get_trend_summary(self, days: int = 30) -> Dict:
-        """Get trend summary for the last N days"""
-        if not self.data or not self.data.get('trends'):
-            return {}
-        
-        trends = self.data['trends']
-        if not trends:
-            return {}
-        
-        # Get the last N trends
-        recent_trends = trends[-days:] if len(trends) > days else trends
-        broken_counts = [t.get('brokenLinks', 0) for t in recent_trends]
-        
-        if not broken_counts:
+        """Get trend summary for the last N days, using one rolled-up point per day"""
+        daily = rollup_runs(self._runs(days))
+        if not daily:
             return {}
         
-        first_count = broken_counts[0]
-        last_count = broken_counts[-1]
+        first_count = daily[0]['lastBroken']
+        last_count = daily[-1]['lastBroken']
         change = last_count - first_count
         change_percent = ((change / first_count) * 100) if first_count > 0 else 0
         
         return {
-            'period_days': len(recent_trends),
-            'start_date': recent_trends[0].get('date'),
-            'end_date': recent_trends[-1].get('date'),
+            'period_days': len(daily),
+            'start_date': daily[0]['date'],
+            'end_date': daily[-1]['date'],
             'starting_broken_links': first_count,
             'ending_broken_links': last_count,
             'change': change,
             'change_percent': round(change_percent, 2),
             'trend': 'improving' if change < 0 else 'worsening' if change > 0 else 'stable',
-            'average_broken_links': round(statistics.mean(broken_counts), 2),
-            'highest_broken_links': max(broken_counts),
-            'lowest_broken_links': min(broken_counts)
+            'average_broken_links': round(statistics.mean(d['avgBroken'] for d in daily), 2),
+            'highest_broken_links': max(d['maxBroken'] for d in daily),
+            'lowest_broken_links': min(d['minBroken'] for d in daily),
+            'daily': daily
         }
     
     def get_critical_links(self) -> List[Dict]:
@@ -248,11 +287,51 @@ class LinkCheckerAnalytics:
                     'error_type': link.get('errorType'),
                     'reasons': reasons,
                     'last_checked': link.get('lastChecked'),
-                    'latency_ms': latency
+                    'latency_ms': latency,
+                    'broken_since': self.url_history.first_broken(link['url']),
+                    'flap_count': self.url_history.flap_count(link['url'])
                 })
         
         return critical[:20]  # Return top 20
     
+    def get_flapping_links(self, min_flaps: int = FLAP_THRESHOLD) -> List[Dict]:
+        """Broken links that keep switching between healthy and broken"""
+        if not self.data or not self.data.get('brokenLinksList'):
+            return []
+        
+        flapping = []
+        for link in self.data['brokenLinksList']:
+            flaps = self.url_history.flap_count(link['url'])
+            if flaps >= min_flaps:
+                flapping.append({
+                    'url': link['url'],
+                    'locale': link.get('locale'),
+                    'status_code': link.get('statusCode'),
+                    'flap_count': flaps,
+                    'broken_since': self.url_history.first_broken(link['url'])
+                })
+        
+        return sorted(flapping, key=lambda x: x['flap_count'], reverse=True)
+    
+    def get_longest_broken(self, limit: int = 20) -> List[Dict]:
+        """Broken links ordered by how long they have been broken"""
+        if not self.data or not self.data.get('brokenLinksList'):
+            return []
+        
+        longest = []
+        for link in self.data['brokenLinksList']:
+            since = self.url_history.first_broken(link['url'])
+            if since:
+                longest.append({
+                    'url': link['url'],
+                    'locale': link.get('locale'),
+                    'status_code': link.get('statusCode'),
+                    'broken_since': since,
+                    'consecutive_failures': self.url_history.streak(link['url'])
+                })
+        
+        return sorted(longest, key=lambda x: x['broken_since'])[:limit]
+    
     def export_analytics_report(self, output_file: str = 'data/analytics_report.json') -> None:
         """Export comprehensive analytics report"""
         report = {
@@ -262,9 +341,12 @@ class LinkCheckerAnalytics:
             'anomalies': self.detect_anomalies(),
             'locale_comparison': self.get_locale_comparison(),
             'response_time_analysis': self.get_response_time_analysis(),
+            'latency_percentiles_30days': self.get_latency_percentiles(30),
             'trend_summary_30days': self.get_trend_summary(30),
             'trend_summary_90days': self.get_trend_summary(90),
             'critical_links': self.get_critical_links(),
+            'flapping_links': self.get_flapping_links(),
+            'longest_broken_links': self.get_longest_broken(),
             'summary': {
                 'total_urls': self.data.get('totalUrls', 0) if self.data else 0,
                 'broken_links': self.data.get('brokenLinks', 0) if self.data else 0,
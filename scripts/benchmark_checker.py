@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Checker Benchmark
+Compares the multi-process and single-process sweeps against a local stand-in server
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+
+from aiohttp import web
+
+import checker
+from sharding import shard_by_host
+
+# Loopback addresses the server listens on, so the limiter and sharding see several hosts
+HOSTS = [f"127.0.0.{i}" for i in range(1, 9)]
+
+
+def build_app(delay_ms: int) -> web.Application:
+    """Stand-in site: every path answers after a small random delay, some with 404"""
+    rng = random.Random(42)
+    broken = set()
+
+    async def handle(request):
+        path = request.match_info['path']
+        await asyncio.sleep(rng.uniform(0.5, 1.5) * delay_ms / 1000)
+        if path in broken:
+            return web.Response(status=404)
+        return web.Response(text="ok", headers={"ETag": f'"{path}"'})
+
+    app = web.Application()
+    app.router.add_route('*', '/{path:.*}', handle)
+    app['broken'] = broken
+    return app
+
+
+def build_tasks(port: int, count: int, error_rate: float, broken: set):
+    """Generate checker tasks spread over the stand-in hosts"""
+    tasks = []
+    for i in range(count):
+        path = f"page/{i}"
+        if i < count * error_rate:
+            broken.add(path)
+        url = f"http://{HOSTS[i % len(HOSTS)]}:{port}/{path}"
+        tasks.append({"url": url, "locale": "English", "is_deep": True, "source": url, "text": "Benchmark"})
+    return tasks
+
+
+async def time_mode(tasks, single_process: bool):
+    """Run one sweep with cold validator and host method caches and return its wall-clock time"""
+    with tempfile.TemporaryDirectory() as tmp:
+        cache_file = os.path.join(tmp, "validator_cache.json")
+        methods_file = os.path.join(tmp, "host_methods.json")
+        chunks = shard_by_host(tasks, 1 if single_process else checker.PROCESS_COUNT)
+        start = time.perf_counter()
+        chunk_results = await checker.run_checks(chunks, single_process, cache_file=cache_file,
+                                                 log_dir=os.path.join(tmp, "run"), methods_file=methods_file)
+        elapsed = time.perf_counter() - start
+
+    broken = sum(result.aggregates.broken for result in chunk_results)
+    return elapsed, broken
+
+
+async def main(count: int, delay_ms: int, error_rate: float, rounds: int):
+    app = build_app(delay_ms)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, HOSTS[0], 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    for host in HOSTS[1:]:
+        await web.TCPSite(runner, host, port).start()
+
+    tasks = build_tasks(port, count, error_rate, app['broken'])
+    print(f"🧪 Benchmarking {count} URLs, ~{delay_ms}ms server delay, {checker.PROCESS_COUNT} processes")
+
+    try:
+        for label, single in (("multi-process", False), ("single-process", True)):
+            timings = []
+            for _ in range(rounds):
+                elapsed, broken = await time_mode(tasks, single)
+                timings.append(elapsed)
+            best = min(timings)
+            print(f"  {label:<15} best {best:.2f}s ({count / best:.0f} URLs/s), {broken} broken")
+    finally:
+        await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark checker sweep modes on a local server")
+    parser.add_argument("--urls", type=int, default=2000)
+    parser.add_argument("--delay-ms", type=int, default=50)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
+    asyncio.run(main(args.urls, args.delay_ms, args.error_rate, args.rounds))
@@ -1,3 +1,4 @@
+import argparse
 import asyncio
 import aiohttp
 import json
@@ -5,12 +6,48 @@ import os
 import time
 from datetime import datetime
 from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, NamedTuple
 import multiprocessing
 
+from exclusions import ExclusionMatcher
+from history_store import HistoryStore
+from host_methods import HEAD_REJECTED, HostMethodCache
+from link_sources import LinkSourceIndex
+from host_limiter import AdaptiveHostLimiter
+from results_store import write_broken_link_pages
+from request_timing import TIMING_PHASES, timing_trace_config
+from retry_policy import RetryPolicy, classify_exception, classify_link, retry_budgets, split_budgets
+from run_log import (RunAggregates, RunLog, latest_run, make_record, new_run_id, prune_runs, read_manifest,
+                     read_records, run_dir, write_json_streaming, write_manifest)
+from locale_sampling import LocaleSampler
+from scheduler import PRIORITY_NEW, RecheckScheduler
+from sharding import estimate_costs, shard_by_host
+from url_canon import canonicalize
+from url_history import UrlHistoryIndex
+from validator_cache import ValidatorCache
+
 # Settings
 EN_DEEP_LINKS = "registry/en_deep_links.json"
 LOCALE_MAP = "registry/locale_map.json"
 OUTPUT_JSON = "data/results.json"
+VALIDATOR_CACHE = "data/validator_cache.json"
+# Hosts that reject HEAD, so their URLs are checked with a single ranged GET
+HOST_METHODS = "data/host_methods.json"
+# Per-host DNS/connect/TTFB/total histograms of every checked URL
+RESPONSE_TIMES = "data/response_times.json"
+HISTORY_DIR = "data/history"
+URL_HISTORY = "data/url_history.json"
+LINK_SOURCES = "registry/link_sources.json"
+# Written by locale_mapper.py --hreflang: "alternates" maps alternate URL -> [[declaring page, hreflang], ...]
+DECLARED_ALTERNATES = "registry/declared_alternates.json"
+CRAWL_STATE = "registry/crawl_state.json"
+LOCALE_SAMPLING = "data/locale_sampling.json"
+# Share of each page's locale variants checked per run; 1.0 (the default) checks them all
+# Sampling is opt-in: set the LOCALE_SAMPLE_RATE env variable or pass --locale-sample-rate, e.g. 0.25
+LOCALE_SAMPLE_RATE = float(os.getenv('LOCALE_SAMPLE_RATE', 1.0))
+# Recent runs copied into the summary for quick charts; the full history lives in HISTORY_DIR
+SUMMARY_TRENDS = 30
 INTERNAL_DOMAIN = "kwalee.com"
 
 # Concurrency Settings
@@ -19,45 +56,88 @@ EXTERNAL_CONCURRENCY = 20
 # Use all available cores, with minimum of 2 for GitHub Actions
 # Can override with PROCESS_COUNT env variable (e.g., for GitHub Actions: 4)
 PROCESS_COUNT = int(os.getenv('PROCESS_COUNT', max(multiprocessing.cpu_count(), 2)))
+# Per-host AIMD starting rate (requests/second) and latency that counts as congestion
+HOST_INITIAL_RATE = 5.0
+LATENCY_TARGET_MS = 3000
+# Resolved hosts are reused for this many seconds instead of aiohttp's 10s default
+DNS_CACHE_TTL = 300
+# First-attempt timeout in seconds; retries take theirs from the retry policy
+REQUEST_TIMEOUT = 15
+KEEPALIVE_TIMEOUT = 30
+
+def resolve_status(cache, url, status, response_headers, latency):
+    """Map a 304 onto the cached status and record fresh validators"""
+    if cache is None:
+        return status
+    if status == 304 and cache.get(url):
+        return cache.mark_unchanged(url, latency)
+    cache.store(url, status, response_headers, latency)
+    return status
+
+def ranged_get(session, url, timeout, headers, timing=None):
+    """GET asking for a single byte; callers read the status and headers, never the body"""
+    return session.get(url, timeout=timeout, allow_redirects=True, headers={**headers, "Range": "bytes=0-0"},
+                       trace_request_ctx=timing)
+
+def ranged_status(status):
+    """206 is a normal success for a ranged GET; 416 means the resource exists but is empty"""
+    return 200 if status == 416 else status
 
-async def check_url(session, url, locale_name, is_deep_check, source=None, text=None, timeout=15, retries=1):
+async def check_url(session, url, locale_name, is_deep_check, source=None, text=None, timeout=REQUEST_TIMEOUT, cache=None, limiter=None, methods=None, timing=None):
+    """
+    One check attempt; retries are scheduled by the caller through the retry policy
+    Phase times of every request it sends are added to the timing dict
+    """
     if not url.startswith(('http://', 'https://')):
         return None
+    # Conditional headers let unchanged pages answer with a body-less 304
+    conditional = cache.conditional_headers(url) if cache else {}
+    # Hosts known to reject HEAD go straight to a one-byte GET
+    use_get = methods is not None and methods.skip_head(url)
     try:
         start_time = time.time()
-        # Try HEAD request first for speed
-        async with session.head(url, timeout=timeout, allow_redirects=True) as response:
-            status = response.status
-            
+        head_status = None
+        if not use_get:
+            # Try HEAD request first for speed
+            async with session.head(url, timeout=timeout, allow_redirects=True, headers=conditional,
+                                    trace_request_ctx=timing) as response:
+                head_status = response.status
+                response_headers = response.headers
+            status = head_status
             # If HEAD is not allowed or returns an error that might be a false positive, fallback to GET
-            if status in [405, 403, 400] or status >= 500:
-                async with session.get(url, timeout=timeout, allow_redirects=True) as get_resp:
-                    status = get_resp.status
-            
-            latency = (time.time() - start_time) * 1000
-
-            # Ignore success codes (2xx) and special case 999 (Yahoo)
-            if (200 <= status < 300) or status == 999:
-                return None
-            
-            # Report 4xx and 5xx
-            if 400 <= status < 600:
-                return {
-                    "url": url,
-                    "locale": locale_name,
-                    "statusCode": status,
-                    "errorType": "Client Error" if status < 500 else "Server Error",
-                    "lastChecked": datetime.now().isoformat(),
-                    "latency": latency,
-                    "isDeepCheck": is_deep_check,
-                    "source": source if source else url,
-                    "text": text if text else "Unknown"
-                }
+            use_get = status in HEAD_REJECTED or status >= 500
+            if methods is not None and not use_get:
+                methods.observe_head_ok(url, head_status)
+        if use_get:
+            async with ranged_get(session, url, timeout, conditional, timing) as get_resp:
+                status = ranged_status(get_resp.status)
+                response_headers = get_resp.headers
+            if methods is not None:
+                methods.observe_fallback(url, head_status, status)
+
+        latency = (time.time() - start_time) * 1000
+        if limiter: limiter.observe(url, status, latency, response_headers)
+        status = resolve_status(cache, url, status, response_headers, latency)
+
+        # Ignore success codes (2xx) and special case 999 (Yahoo)
+        if (200 <= status < 300) or status == 999:
+            return None
+
+        # Report 4xx and 5xx
+        if 400 <= status < 600:
+            return {
+                "url": url,
+                "locale": locale_name,
+                "statusCode": status,
+                "errorType": "Client Error" if status < 500 else "Server Error",
+                "lastChecked": datetime.now().isoformat(),
+                "latency": latency,
+                "isDeepCheck": is_deep_check,
+                "source": source if source else url,
+                "text": text if text else "Unknown"
+            }
     except asyncio.TimeoutError:
-        if retries > 0:
-            # Retry with longer timeout
-            return await check_url(session, url, locale_name, is_deep_check, source, text, timeout=30, retries=retries - 1)
-        
+        if limiter: limiter.observe(url, timed_out=True)
         return {
             "url": url,
             "locale": locale_name,
@@ -70,10 +150,15 @@ async def check_url(session, url, locale_name, is_deep_check, source=None, text=
             "text": text if text else "Unknown"
         }
     except Exception as e:
-        # Fallback to GET on any other exception during HEAD
+        # Fallback to GET on any other exception during HEAD; a GET that failed itself is not sent twice
         try:
-            async with session.get(url, timeout=timeout, allow_redirects=True) as get_resp:
-                status = get_resp.status
+            if use_get:
+                raise e
+            async with ranged_get(session, url, timeout, conditional, timing) as get_resp:
+                latency = (time.time() - start_time) * 1000
+                get_status = ranged_status(get_resp.status)
+                if limiter: limiter.observe(url, get_status, latency, get_resp.headers)
+                status = resolve_status(cache, url, get_status, get_resp.headers, latency)
                 if (200 <= status < 300) or status == 999: return None
                 return {
                     "url": url,
@@ -87,15 +172,13 @@ async def check_url(session, url, locale_name, is_deep_check, source=None, text=
                     "text": text if text else "Unknown"
                 }
         except Exception as e2:
-            if retries > 0:
-                # Retry on network error as well
-                return await check_url(session, url, locale_name, is_deep_check, source, text, timeout=30, retries=retries - 1)
             return {
                 "url": url,
                 "locale": locale_name,
                 "statusCode": "Error",
                 "errorType": "Network Error",
                 "errorMessage": f"{type(e2).__name__}",
+                "errorClass": classify_exception(e2),
                 "lastChecked": datetime.now().isoformat(),
                 "latency": (time.time() - start_time) * 1000,
                 "isDeepCheck": is_deep_check,
@@ -104,11 +187,28 @@ async def check_url(session, url, locale_name, is_deep_check, source=None, text=
             }
     return None
 
-async def process_chunk_async(tasks_chunk):
-    internal_sem = asyncio.Semaphore(INTERNAL_CONCURRENCY // PROCESS_COUNT)
-    external_sem = asyncio.Semaphore(EXTERNAL_CONCURRENCY // PROCESS_COUNT)
+def build_limiter(process_count):
+    """Per-host limiter; the internal site gets the larger share of each process's budget"""
+    internal_window = max(INTERNAL_CONCURRENCY // process_count, 1)
+    external_window = max(EXTERNAL_CONCURRENCY // process_count, 1)
+    return AdaptiveHostLimiter(
+        initial_rate=HOST_INITIAL_RATE,
+        max_window=external_window,
+        latency_target_ms=LATENCY_TARGET_MS,
+        host_overrides={INTERNAL_DOMAIN: {"initial_rate": HOST_INITIAL_RATE * 2, "max_window": internal_window}}
+    )
+
+async def process_chunk_async(tasks_chunk, cache=None, process_count=PROCESS_COUNT, run_log=None, methods=None, retries=None):
+    # Hosts are throttled individually; the global cap only bounds open sockets
+    limiter = build_limiter(process_count)
+    retries = retries or RetryPolicy(tasks_chunk)
+    global_sem = asyncio.Semaphore(max((INTERNAL_CONCURRENCY + EXTERNAL_CONCURRENCY) // process_count, 1))
     
-    connector = aiohttp.TCPConnector(limit=0, limit_per_host=0) # Unlimited per host
+    connector = aiohttp.TCPConnector(
+        limit=0, limit_per_host=0, # Per-host limits come from the limiter
+        use_dns_cache=True, ttl_dns_cache=DNS_CACHE_TTL,
+        keepalive_timeout=KEEPALIVE_TIMEOUT
+    )
     headers = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
         "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8",
@@ -120,24 +220,145 @@ async def process_chunk_async(tasks_chunk):
         connector=connector, 
         headers=headers,
         max_line_size=16384,
-        max_field_size=16384
+        max_field_size=16384,
+        trace_configs=[timing_trace_config()]
     ) as session:
+        aggregates = RunAggregates()
+
         async def bounded_check(t):
-            is_internal = INTERNAL_DOMAIN in t["url"]
-            sem = internal_sem if is_internal else external_sem
-            async with sem:
-                return await check_url(session, t["url"], t["locale"], t["is_deep"], t["source"], t["text"])
+            attempt, timeout = 1, REQUEST_TIMEOUT
+            while True:
+                # Wait on the host first so a throttled host never holds a global slot
+                async with limiter.throttle(t["url"]):
+                    async with global_sem:
+                        timing = {}
+                        started = time.perf_counter()
+                        link = await check_url(session, t["url"], t["locale"], t["is_deep"], t["source"], t["text"],
+                                               timeout=timeout, cache=cache, limiter=limiter, methods=methods,
+                                               timing=timing)
+                        timing["total"] = (time.perf_counter() - started) * 1000
+                # Retries back off outside both slots and then queue for the host like any other request
+                error_class = classify_link(link)
+                if not retries.should_retry(t["url"], error_class, attempt):
+                    break
+                await asyncio.sleep(retries.delay(error_class, attempt))
+                attempt += 1
+                timeout = retries.timeout(error_class, REQUEST_TIMEOUT)
+            # Stream the outcome out as soon as it is known
+            record = make_record(t, link, attempt, timing)
+            # Journal what the check taught the caches so an interrupted run doesn't lose it
+            if cache is not None and t["url"] in cache.updates:
+                record["validators"] = cache.updates[t["url"]]
+            if methods is not None and t["url"] in methods.observed:
+                record["headStatus"] = methods.observed.pop(t["url"])
+            if run_log: run_log.append(record)
+            aggregates.add_record(record)
         
-        return await asyncio.gather(*(bounded_check(t) for t in tasks_chunk))
+        await asyncio.gather(*(bounded_check(t) for t in tasks_chunk))
+        return aggregates
+
+class ChunkResult(NamedTuple):
+    """What a worker hands back besides the per-URL run log"""
+    aggregates: RunAggregates
+    cache_updates: Dict
+    revalidated: int
+    method_updates: Dict
+    saved_round_trips: int
+    # Retries each host had left of the share of its budget this chunk was given
+    retry_budgets: Dict
 
-def run_process_chunk(tasks_chunk):
-    return asyncio.run(process_chunk_async(tasks_chunk))
+def run_process_chunk(tasks_chunk, budgets, cache_file=VALIDATOR_CACHE, log_dir=None, methods_file=HOST_METHODS):
+    # Each worker reads the caches itself and hands its updates back to the parent
+    cache = ValidatorCache(cache_file)
+    methods = HostMethodCache(methods_file)
+    retries = RetryPolicy(budgets=budgets)
+    run_log = RunLog(os.path.join(log_dir, f"part-{os.getpid()}.ndjson")) if log_dir else None
+    try:
+        aggregates = asyncio.run(process_chunk_async(tasks_chunk, cache, run_log=run_log, methods=methods,
+                                                     retries=retries))
+    finally:
+        if run_log: run_log.close()
+    return ChunkResult(aggregates, cache.updates, cache.revalidated, methods.updates, methods.saved, retries.budgets)
 
-async def main():
+async def run_checks(chunks, single_process=False, cache_file=VALIDATOR_CACHE, log_dir=None, methods_file=HOST_METHODS,
+                     budgets=None):
+    """
+    Check every chunk and return a ChunkResult per chunk
+    Per-URL outcomes go to the run log in log_dir rather than back through the pool
+    Single-process mode runs everything on the current event loop with one shared connector
+    Each host's retry budget (sized from the chunks unless given) is split between the chunks holding its URLs
+    """
+    if budgets is None:
+        budgets = retry_budgets(t for chunk in chunks for t in chunk)
+    if single_process:
+        cache = ValidatorCache(cache_file)
+        methods = HostMethodCache(methods_file)
+        retries = RetryPolicy(budgets=budgets)
+        run_log = RunLog(os.path.join(log_dir, "part-main.ndjson")) if log_dir else None
+        try:
+            aggregates = await process_chunk_async([t for chunk in chunks for t in chunk], cache, process_count=1,
+                                                   run_log=run_log, methods=methods, retries=retries)
+        finally:
+            if run_log: run_log.close()
+        return [ChunkResult(aggregates, cache.updates, cache.revalidated, methods.updates, methods.saved,
+                            retries.budgets)]
+
+    with ProcessPoolExecutor(max_workers=PROCESS_COUNT) as executor:
+        loop = asyncio.get_event_loop()
+        worker = partial(run_process_chunk, cache_file=cache_file, log_dir=log_dir, methods_file=methods_file)
+        return await asyncio.gather(*(loop.run_in_executor(executor, worker, chunk, share)
+                                      for chunk, share in zip(chunks, split_budgets(budgets, chunks))))
+
+def load_page_hashes(sampler):
+    """English page content hashes from the crawler, used to spot changed templates"""
+    if os.path.exists(CRAWL_STATE):
+        try:
+            with open(CRAWL_STATE, 'r') as f:
+                return sampler.page_hashes(json.load(f))
+        except:
+            pass
+    return {}
+
+async def main(full=False, single_process=False, resume=None, sample_rate=LOCALE_SAMPLE_RATE):
     start_time = time.time()
     if not os.path.exists('data'):
         os.makedirs('data')
 
+    # A resumed run reuses its journal and the options it was started with
+    resumed = RunAggregates()
+    completed = set()
+    resumed_validators = {}
+    resumed_head_statuses = {}
+    manifest = None
+    if resume:
+        run_id = latest_run() if resume == "latest" else resume
+        manifest = read_manifest(run_dir(run_id)) if run_id else None
+        if manifest is None:
+            print(f"❌ No run journal found for {resume}")
+            return
+        if manifest.get("completed"):
+            # Its results are already saved; resuming would replay them over newer state
+            print(f"ℹ️ Run {run_id} already completed at {manifest.get('completedAt')}; starting a fresh run")
+            manifest = None
+        else:
+            full = manifest.get("full", full)
+            sample_rate = manifest.get("localeSampleRate", sample_rate)
+            for record in read_records(run_dir(run_id)):
+                if record["url"] not in completed:
+                    completed.add(record["url"])
+                    resumed.add_record(record)
+                if "validators" in record:
+                    resumed_validators[record["url"]] = record["validators"]
+                if "headStatus" in record:
+                    resumed_head_statuses[record["url"]] = record["headStatus"]
+            print(f"⏯️ Resuming run {run_id}: {len(completed)} URLs already checked")
+    if manifest is None:
+        run_id = new_run_id()
+        manifest = {"runId": run_id, "startedAt": datetime.now().isoformat(), "full": full,
+                    "localeSampleRate": sample_rate}
+        write_manifest(run_dir(run_id), manifest)
+    log_dir = run_dir(run_id)
+
     # Load English deep links
     with open(EN_DEEP_LINKS, 'r') as f:
         en_links = json.load(f)
@@ -146,6 +367,15 @@ async def main():
     with open(LOCALE_MAP, 'r') as f:
         locale_map = json.load(f)
 
+    # Locale URLs the site declares through hreflang, with the pages declaring them
+    declared_alternates = {}
+    if os.path.exists(DECLARED_ALTERNATES):
+        try:
+            with open(DECLARED_ALTERNATES, 'r') as f:
+                declared_alternates = json.load(f)["alternates"]
+        except:
+            pass
+
     # Load locales for prefix detection
     with open('registry/locales.json', 'r') as f:
         locales_config = json.load(f)
@@ -158,33 +388,134 @@ async def main():
             if f"kwalee.com{prefix}/" in url: return name
         return "English"
 
+    # Tasks are keyed by canonical URL so spellings of one URL are checked once;
+    # each task keeps the raw spellings (aliases) it stands for
     unique_tasks = {}
+    occurrence_count = 0
+    # Whitelisted domains and patterns (config.yaml and the issue tracker's whitelist) are never requested
+    exclusions = ExclusionMatcher.from_sources()
+    excluded = set()
     for item in en_links:
         if isinstance(item, str): url, source, text = item, None, None
         else: url, source, text = item['url'], item.get('source'), item.get('text')
-        unique_tasks[url] = {"url": url, "locale": detect_locale(url, "English"), "is_deep": True, "source": source, "text": text}
+        if exclusions.matches(url):
+            excluded.add(url)
+            continue
+        key = canonicalize(url)
+        if key not in unique_tasks:
+            unique_tasks[key] = {"url": key, "locale": detect_locale(key, "English"), "is_deep": True, "source": source, "text": text, "aliases": []}
+        if url not in unique_tasks[key]["aliases"]:
+            unique_tasks[key]["aliases"].append(url)
+        occurrence_count += 1
 
     for locale_name, urls in locale_map.items():
         for url in urls:
-            if url in unique_tasks:
-                if unique_tasks[url]["locale"] == "English": unique_tasks[url]["locale"] = locale_name
+            if exclusions.matches(url):
+                excluded.add(url)
+                continue
+            key = canonicalize(url)
+            if key in unique_tasks:
+                if unique_tasks[key]["locale"] == "English": unique_tasks[key]["locale"] = locale_name
+            elif url in declared_alternates:
+                page, hreflang = declared_alternates[url][0]
+                unique_tasks[key] = {"url": key, "locale": locale_name, "is_deep": False, "source": page, "text": f"hreflang={hreflang}", "aliases": []}
             else:
-                unique_tasks[url] = {"url": url, "locale": locale_name, "is_deep": False, "source": url, "text": "Base URL"}
+                unique_tasks[key] = {"url": key, "locale": locale_name, "is_deep": False, "source": url, "text": "Base URL", "aliases": []}
+            if url in declared_alternates:
+                unique_tasks[key].setdefault("declaredBy", []).extend(declared_alternates[url])
+            if url not in unique_tasks[key]["aliases"]:
+                unique_tasks[key]["aliases"].append(url)
+            occurrence_count += 1
+
+    # Only keep aliases where they add something beyond the task itself
+    for key, task in unique_tasks.items():
+        aliases = task.pop("aliases")
+        if aliases != [key]:
+            task["aliases"] = aliases
+    collapsed_urls = occurrence_count - len(unique_tasks)
 
     all_tasks = list(unique_tasks.values())
-    print(f"🚀 Checking {len(all_tasks)} unique URLs using {PROCESS_COUNT} processes...")
 
-    # Split tasks into chunks for multiprocessing
-    chunk_size = (len(all_tasks) + PROCESS_COUNT - 1) // PROCESS_COUNT
-    chunks = [all_tasks[i:i + chunk_size] for i in range(0, len(all_tasks), chunk_size)]
+    # Only check URLs whose recheck interval has elapsed, unless --full is given.
+    # The per-URL ring buffer is the single record of health, streaks and flapping
+    url_history = UrlHistoryIndex(URL_HISTORY)
+    scheduler = RecheckScheduler(url_history)
+    due_tasks = all_tasks if full else scheduler.due_tasks(all_tasks)
 
-    with ProcessPoolExecutor(max_workers=PROCESS_COUNT) as executor:
-        loop = asyncio.get_event_loop()
-        chunk_results = await asyncio.gather(*(loop.run_in_executor(executor, run_process_chunk, chunk) for chunk in chunks))
+    # Locale variants of one page share a template: check a rotating sample of each group.
+    # New, broken and flapping URLs are always in the sample, and a changed English page checks its whole group
+    sampler = LocaleSampler(prefix_to_name, sample_rate, LOCALE_SAMPLING)
+    if not full and sample_rate < 1:
+        due_tasks = sampler.plan(all_tasks, due_tasks, lambda url: scheduler.get_priority(url) <= PRIORITY_NEW,
+                                 load_page_hashes(sampler))
+        print(f"🧪 {sampler.held_back()} locale variants held back by sampling ({sample_rate:.0%} per page, "
+              f"{sampler.changed} changed pages checked in full)")
+    due_tasks = [t for t in due_tasks if t["url"] not in completed]
+    mode = "a single event loop" if single_process else f"{PROCESS_COUNT} processes"
+    if excluded:
+        print(f"🚫 {len(excluded)} whitelisted URLs skipped")
+    if collapsed_urls:
+        print(f"🔗 {collapsed_urls} duplicate URL spellings collapsed by canonicalization")
+    print(f"🚀 Checking {len(due_tasks)} of {len(all_tasks)} unique URLs using {mode} (run {run_id})...")
+
+    # Shard by host so each host's keep-alive pool lives in a single process
+    cache = ValidatorCache(VALIDATOR_CACHE)
+    costs = estimate_costs(due_tasks, lambda url: (cache.get(url) or {}).get("latency"))
+    chunks = shard_by_host(due_tasks, 1 if single_process else PROCESS_COUNT, costs)
+    chunk_results = await run_checks(chunks, single_process, log_dir=log_dir)
 
-    # Flatten results
-    results = [item for sublist in chunk_results for item in sublist]
-    broken_links = [r for r in results if r is not None]
+    # A sample that newly fails means the template may be broken everywhere: check the rest of its group.
+    # The per-URL history is recorded after the run, so it still holds each URL's previous status
+    escalated = [t for t in sampler.escalate(r["url"] for r in read_records(log_dir)
+                                             if not r["ok"] and url_history.last_status(r["url"]) == "ok")
+                 if t["url"] not in completed]
+    if escalated:
+        print(f"🚨 Sample failures: checking {len(escalated)} more locale variants")
+        costs = estimate_costs(escalated, lambda url: (cache.get(url) or {}).get("latency"))
+        chunks = shard_by_host(escalated, 1 if single_process else PROCESS_COUNT, costs)
+        # Hosts already checked keep spending what is left of their budget; new ones get their own
+        budgets = retry_budgets(escalated)
+        for host in {host for result in chunk_results for host in result.retry_budgets}:
+            budgets[host] = sum(result.retry_budgets.get(host, 0) for result in chunk_results)
+        chunk_results += await run_checks(chunks, single_process, log_dir=log_dir, budgets=budgets)
+
+    # Aggregates cover every registered URL; skipped ones count as healthy
+    aggregates = RunAggregates()
+    for t in all_tasks:
+        aggregates.add_task(t)
+    aggregates.merge(resumed)
+
+    # Merge worker aggregates and persist the validators and host capabilities they collected
+    revalidated = 0
+    saved_round_trips = 0
+    methods = HostMethodCache(HOST_METHODS)
+    # Updates journalled before the interruption come first; this run's checks are newer
+    cache.merge(resumed_validators)
+    for url, head_status in resumed_head_statuses.items():
+        methods.replay(url, head_status)
+    for result in chunk_results:
+        aggregates.merge(result.aggregates)
+        cache.merge(result.cache_updates)
+        methods.merge(result.method_updates)
+        revalidated += result.revalidated
+        saved_round_trips += result.saved_round_trips
+    cache.save()
+    methods.save()
+    # Per-host phase histograms tell our own DNS/connect time apart from the server's TTFB
+    aggregates.timings.save(RESPONSE_TIMES)
+    means = {phase: aggregates.timings.combined(phase) for phase in TIMING_PHASES}
+    print("⏱️ Mean " + ", ".join(f"{phase} {stats['sum'] / max(sum(stats['counts']), 1):.0f}ms"
+                                for phase, stats in means.items()) + f" across {len(aggregates.timings.hosts)} hosts")
+    percentiles = aggregates.sketches.run.percentiles()
+    if percentiles:
+        print(f"📈 Check time p50 {percentiles['p50']}ms, p95 {percentiles['p95']}ms, p99 {percentiles['p99']}ms")
+    print(f"♻️ {revalidated} URLs unchanged since last run (304 Not Modified)")
+    print(f"🔁 {aggregates.retries} retries after timeouts, network errors, 429s and 5xx")
+    print(f"⚡ {saved_round_trips} round-trips saved by skipping HEAD on {len(methods.rejecting_hosts())} hosts that reject it")
+
+    if sampler.sampled:
+        sampler.prune(unique_tasks)
+        sampler.save()
 
     # Load existing data to preserve history
     existing_data = {}
@@ -196,57 +527,109 @@ async def main():
 
     current_time = datetime.now().isoformat()
     total_runs = existing_data.get("totalRuns", 0) + 1
-    
-    dashboard_data = {
-        "lastUpdated": current_time,
-        "totalRuns": total_runs,
-        "totalUrls": len(all_tasks),
-        "brokenLinks": len(broken_links),
-        "successRate": ((len(all_tasks) - len(broken_links)) / len(all_tasks)) * 100 if all_tasks else 100,
-        "brokenLinksList": broken_links,
-        "locales": [],
-        "trends": existing_data.get("trends", [])
-    }
 
-    error_dist = {}
-    for link in broken_links:
-        code = str(link['statusCode'])
-        error_dist[code] = error_dist.get(code, 0) + 1
-    dashboard_data["errorDistribution"] = error_dist
+    # Append this run to the history store, seeding it from older embedded trends once
+    history = HistoryStore(HISTORY_DIR)
+    if history.is_empty() and existing_data.get("trends"):
+        history.append_runs(existing_data["trends"])
+    history.append_run({
+        "date": current_time, "runId": run_id, "brokenLinks": aggregates.broken,
+        "totalUrls": aggregates.total, "checkedUrls": aggregates.checked,
+        "successRate": aggregates.success_rate(), "errorDistribution": aggregates.error_distribution,
+        "latencyPercentiles": aggregates.sketches.run.percentiles()
+    })
+    # Mergeable sketches give p50/p95/p99 for any window of runs without raw samples
+    history.append_sketches(current_time, run_id, aggregates.sketches.to_dict())
+    # Skipped URLs were healthy last time by construction, so only checked ones are recorded
+    statuses = [(r["url"], "ok" if r["ok"] else r["link"]["statusCode"]) for r in read_records(log_dir)]
+    # Change events are found against the per-URL index before this run is pushed onto it
+    history.record_url_statuses(current_time, statuses, url_history.last_status)
+    trends = history.last_runs(SUMMARY_TRENDS)
 
-    dashboard_data["trends"].append({"date": current_time, "brokenLinks": len(broken_links), "totalUrls": len(all_tasks), "errorDistribution": error_dist})
-    if len(dashboard_data["trends"]) > 200: dashboard_data["trends"] = dashboard_data["trends"][-200:]
+    # Per-URL ring buffer answers "broken since when", "is it flapping" and "is it due" without old results
+    url_history.record_many(statuses, current_time)
+    url_history.prune(unique_tasks)
+    url_history.save()
 
-    locales_stats = {}
-    for t in all_tasks:
-        loc = t["locale"]
-        if loc not in locales_stats: locales_stats[loc] = {"total": 0, "broken": 0}
-        locales_stats[loc]["total"] += 1
-    
-    for link in broken_links:
-        locales_stats[link['locale']]["broken"] += 1
-
-    for name, stats in locales_stats.items():
-        dashboard_data["locales"].append({
-            "name": name, "total": stats["total"], "broken": stats["broken"],
-            "successRate": ((stats["total"] - stats["broken"]) / stats["total"]) * 100 if stats["total"] > 0 else 100
-        })
-
-    dashboard_data["responseTimeDistribution"] = {"<1s": 0, "1-3s": 0, "3-5s": 0, ">5s": 0}
-    for link in broken_links:
-        latency = link.get('latency', 0)
-        if latency < 1000: dashboard_data["responseTimeDistribution"]["<1s"] += 1
-        elif latency < 3000: dashboard_data["responseTimeDistribution"]["1-3s"] += 1
-        elif latency < 5000: dashboard_data["responseTimeDistribution"]["3-5s"] += 1
-        else: dashboard_data["responseTimeDistribution"][">5s"] += 1
-
-    with open(OUTPUT_JSON, 'w', encoding='utf-8') as f:
-        json.dump(dashboard_data, f, indent=2)
+    # Every page that links to a broken URL, under any of its spellings, from the crawler's index
+    link_sources = LinkSourceIndex(LINK_SOURCES)
 
+    def referrers_of(link):
+        pairs = {}
+        for alias in link.get("aliases") or [link["url"]]:
+            for pair in link_sources.referrers(alias):
+                pairs.setdefault(pair, list(pair))
+        # Pages declaring a broken hreflang alternate need fixing too
+        for page, hreflang in link.get("declaredBy", []):
+            pairs.setdefault((page, f"hreflang={hreflang}"), [page, f"hreflang={hreflang}"])
+        return list(pairs.values()) or [[link["source"], link["text"]]]
+
+    broken_alternates = []
+
+    def annotate(link):
+        link["brokenSince"] = url_history.first_broken(link["url"])
+        link["flapCount"] = url_history.flap_count(link["url"])
+        link["referrers"] = referrers_of(link)
+        # [page, href] for pages that wrote the URL in another spelling than the canonical one reported
+        spellings = {pair for alias in link.get("aliases") or [link["url"]] for pair in link_sources.spellings_of(alias)}
+        if spellings:
+            link["spellings"] = [list(pair) for pair in sorted(spellings)]
+        if link.get("declaredBy"):
+            broken_alternates.append(link["url"])
+        return link
+
+    # Broken links are streamed from the run log straight into paged, dictionary-encoded shards
+    broken_pages = write_broken_link_pages(
+        (annotate(r["link"]) for r in read_records(log_dir) if not r["ok"]), OUTPUT_JSON
+    )
+
+    # The summary stays small enough for the dashboard's first paint
+    write_json_streaming(OUTPUT_JSON, [
+        ("lastUpdated", current_time),
+        ("totalRuns", total_runs),
+        ("totalUrls", aggregates.total),
+        ("checkedUrls", aggregates.checked),
+        ("collapsedUrls", collapsed_urls),
+        ("excludedUrls", len(excluded)),
+        ("savedRoundTrips", saved_round_trips),
+        ("retries", aggregates.retries),
+        ("brokenLinks", aggregates.broken),
+        ("brokenAlternates", len(broken_alternates)),
+        ("successRate", aggregates.success_rate()),
+        ("avgLatency", aggregates.avg_latency()),
+        ("latencyPercentiles", aggregates.sketches.run.percentiles()),
+        ("brokenLinksPages", broken_pages),
+        ("locales", aggregates.locale_list()),
+        ("trends", trends),
+        ("errorDistribution", aggregates.error_distribution),
+        ("responseTimeDistribution", aggregates.response_times)
+    ])
+    # Everything is saved: a later --resume of this run must not replay its journal
+    write_manifest(log_dir, {**manifest, "completed": True, "completedAt": datetime.now().isoformat()})
+    prune_runs()
+
+    if broken_alternates:
+        print(f"🌐 {len(broken_alternates)} declared hreflang alternates are broken:")
+        for url in broken_alternates[:20]:
+            print(f"   - {url}")
     print(f"✅ Check completed. Total Runs: {total_runs}")
     print(f"📊 Results saved to {OUTPUT_JSON}")
     total_time = time.time() - start_time
     print(f"⏱️ Total time taken: {total_time:.2f} seconds ({total_time/60:.2f} minutes)")
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Check all registered links")
+    parser.add_argument("--full", action="store_true", help="Check every URL regardless of its recheck interval")
+    parser.add_argument("--single-process", action="store_true", help="Run the whole sweep on one event loop (also implied by PROCESS_COUNT=1)")
+    parser.add_argument("--locale-sample-rate", type=float, default=LOCALE_SAMPLE_RATE, help="Share of each page's locale variants checked per run, e.g. 0.25; the default 1 checks them all")
+    parser.add_argument("--resume", metavar="RUN_ID", help="Continue an interrupted run from its journal ('latest' for the newest)")
+    args = parser.parse_args()
+
+    single_process = args.single_process or PROCESS_COUNT == 1
+    if single_process:
+        try:
+            import uvloop
+            asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+        except ImportError:
+            pass
+    asyncio.run(main(full=args.full, single_process=single_process, resume=args.resume, sample_rate=args.locale_sample_rate))
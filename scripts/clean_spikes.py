@@ -1,32 +1,20 @@
-import json
-import os
+from history_store import HistoryStore
 
 SPIKE_THRESHOLD = 1000  # Configure spike threshold here
 
-def clean_file(filepath, threshold=SPIKE_THRESHOLD):
-    if not os.path.exists(filepath):
-        print(f"File not found: {filepath}")
+def clean_history(history_dir, threshold=SPIKE_THRESHOLD):
+    history = HistoryStore(history_dir)
+    if history.is_empty():
+        print(f"No run history in {history_dir}")
         return
 
-    with open(filepath, 'r') as f:
-        data = json.load(f)
-
-    if 'trends' not in data:
-        print(f"No trends in {filepath}")
-        return
-
-    original_count = len(data['trends'])
     # Remove entries with more broken links than threshold
-    data['trends'] = [t for t in data['trends'] if t.get('brokenLinks', 0) < threshold]
-    new_count = len(data['trends'])
+    removed = history.rewrite_runs(lambda t: t.get('brokenLinks', 0) < threshold)
 
-    if original_count != new_count:
-        with open(filepath, 'w') as f:
-            json.dump(data, f, indent=2)
-        print(f"Cleaned {filepath}: Removed {original_count - new_count} spikes (>= {threshold}).")
+    if removed:
+        print(f"Cleaned {history_dir}: Removed {removed} spikes (>= {threshold}).")
     else:
-        print(f"No spikes found in {filepath}.")
+        print(f"No spikes found in {history_dir}.")
 
 if __name__ == "__main__":
-    clean_file('data/results.json')
-    clean_file('dashboard/data/results.json')
+    clean_history('data/history')
@@ -1,57 +1,299 @@
+import argparse
 import asyncio
 import aiohttp
-from bs4 import BeautifulSoup
 import csv
+import hashlib
 import json
 import os
 import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from datetime import datetime
+import multiprocessing
 from urllib.parse import urljoin, urlparse
+from urllib.robotparser import RobotFileParser
+
+from frontier import DEFAULT_MAX_DEPTH, DEFAULT_MAX_PAGES, CrawlFrontier
+from host_limiter import AdaptiveHostLimiter, host_of
+from link_extractor import extract_page
+from link_sources import LINK_SOURCES, LinkSourceIndex
+from sitemap import iter_sitemap_urls, unchanged_since
+from url_canon import canonicalize
 
 INPUT_CSV = "live_urls.csv"
+# Pages found by --discover, in crawl order
+DISCOVERED_CSV = "registry/discovered_urls.csv"
 OUTPUT_JSON = "registry/en_deep_links.json"
+# Per-page validators, content hash and extracted links from the previous crawl
+CRAWL_STATE = "registry/crawl_state.json"
+# Every sitemap page with its lastmod and declared hreflang alternates
+SITEMAP_PAGES = "registry/sitemap_pages.json"
+# hreflang alternates declared by each crawled page's <link rel="alternate"> tags
+PAGE_ALTERNATES = "registry/page_alternates.json"
+LOCALES_JSON = "registry/locales.json"
 BASE_URL = "https://kwalee.com"
 
-async def fetch_links(session, url, sem):
-    async with sem:
+# HTML parsing runs in a process pool while fetching stays on the event loop
+# Can override with PARSE_WORKERS env variable
+PARSE_WORKERS = int(os.getenv('PARSE_WORKERS', max(multiprocessing.cpu_count() - 1, 1)))
+# Fetched pages waiting for a parser; fetches pause when it is full
+PARSE_QUEUE_SIZE = PARSE_WORKERS * 4
+
+HTML_TYPES = ("text/html", "application/xhtml+xml")
+# Discovery politeness: per-host starting rate (requests/second) and concurrency cap
+DISCOVER_RATE = 2.0
+DISCOVER_CONCURRENCY = 8
+# Pages fetched per breadth-first step
+DISCOVER_BATCH = 50
+ROBOTS_USER_AGENT = "*"
+
+def load_crawl_state():
+    """Load the previous crawl's per-page state"""
+    if os.path.exists(CRAWL_STATE):
         try:
-            async with session.get(url, timeout=20) as response:
+            with open(CRAWL_STATE, 'r') as f:
+                state = json.load(f)
+            # Pages crawled before alternates and metadata were extracted are parsed again once
+            return {url: entry for url, entry in state.items() if "alternates" in entry and "metadata" in entry}
+        except:
+            pass
+    return {}
+
+async def fetch_links(session, url, sem, state, parse_queue, limiter=None, lastmod=None):
+    """
+    Fetch a page and return its (url, text) links
+    Unchanged pages (sitemap lastmod, 304 or same content hash) reuse the links stored in state;
+    changed ones are handed to the parser pool through parse_queue
+    """
+    previous = state.get(url)
+    # The sitemap says nothing changed since the last crawl, so skip the request entirely
+    if previous and unchanged_since(lastmod, previous.get("crawledAt")):
+        return previous["links"], "lastmod"
+
+    headers = {}
+    if previous:
+        if previous.get("etag"):
+            headers["If-None-Match"] = previous["etag"]
+        if previous.get("lastModified"):
+            headers["If-Modified-Since"] = previous["lastModified"]
+
+    try:
+        async with sem, (limiter.throttle(url) if limiter else nullcontext()):
+            start = time.monotonic()
+            try:
+                response = await session.get(url, timeout=20, headers=headers)
+            except asyncio.TimeoutError:
+                if limiter:
+                    limiter.observe(url, timed_out=True)
+                raise
+            async with response:
+                if limiter:
+                    limiter.observe(url, response.status, (time.monotonic() - start) * 1000, response.headers)
+                if response.status == 304 and previous:
+                    return previous["links"], "not_modified"
                 if response.status != 200:
                     print(f"⚠️ Failed to fetch {url}: {response.status}")
-                    return []
-                
-                html = await response.text()
-                soup = BeautifulSoup(html, 'html.parser')
-                links = set()
-                
-                for a in soup.find_all('a', href=True):
-                    href = a['href']
-                    full_url = urljoin(url, href)
-                    if not full_url.startswith(('http://', 'https://')):
-                        continue
-                    text = a.get_text(strip=True)
-                    # Only include links with visible text
-                    if text:
-                        links.add((full_url, text))
-                
-                print(f"✅ Extracted {len(links)} links from {url}")
-                return [{"url": l[0], "source": url, "text": l[1]} for l in links]
+                    state.pop(url, None)
+                    return [], "failed"
+                if response.content_type not in HTML_TYPES:
+                    return [], "skipped"
+
+                body = await response.read()
+                content_hash = hashlib.sha256(body).hexdigest()
+                entry = {
+                    "etag": response.headers.get("ETag"),
+                    "lastModified": response.headers.get("Last-Modified"),
+                    "hash": content_hash,
+                    "crawledAt": datetime.now().isoformat()
+                }
+                if previous and previous.get("hash") == content_hash:
+                    entry["links"] = previous["links"]
+                    entry["alternates"] = previous["alternates"]
+                    entry["metadata"] = previous["metadata"]
+                    state[url] = entry
+                    return entry["links"], "unchanged"
+
+                html = body.decode(response.get_encoding(), errors='replace')
+
+            # Waits while the parse queue is full, keeping this fetch slot busy,
+            # so downloading slows to the pace of the parsers instead of piling up pages
+            parsed = asyncio.get_running_loop().create_future()
+            await parse_queue.put((url, html, parsed))
+
+        page = await parsed
+        entry["links"] = page["links"]
+        entry["alternates"] = page["alternates"]
+        # Title, meta and Open Graph tags, so the advanced checker's SEO audit needn't fetch the page again
+        entry["metadata"] = page["metadata"]
+        state[url] = entry
+        print(f"✅ Extracted {len(entry['links'])} links from {url}")
+        return entry["links"], "parsed"
+    except Exception as e:
+        print(f"❌ Error fetching {url}: {e}")
+        # Keep last known links on transient errors rather than dropping them from the registry
+        return (previous["links"] if previous else []), "failed"
+
+async def parse_worker(parse_queue, pool):
+    """Feed queued pages to the process pool so parsing never blocks the event loop"""
+    loop = asyncio.get_running_loop()
+    while True:
+        url, html, parsed = await parse_queue.get()
+        try:
+            parsed.set_result(await loop.run_in_executor(pool, extract_page, html, url))
         except Exception as e:
-            print(f"❌ Error fetching {url}: {e}")
-            return []
+            parsed.set_exception(e)
+        finally:
+            parse_queue.task_done()
 
-async def main():
-    start_time = time.time()
-    if not os.path.exists('registry'):
-        os.makedirs('registry')
+async def fetch_text(session, url):
+    """GET a small text resource, None unless it answers 200"""
+    try:
+        async with session.get(url, timeout=20) as response:
+            if response.status == 200:
+                return await response.text()
+    except Exception as e:
+        print(f"⚠️ Could not fetch {url}: {e}")
+    return None
+
+async def load_robots(session, base_url):
+    """Fetch and parse robots.txt; a missing file allows everything"""
+    robots = RobotFileParser(urljoin(base_url, "/robots.txt"))
+    text = await fetch_text(session, robots.url)
+    robots.parse((text or "").splitlines())
+    return robots
+
+async def read_sitemaps(session, robots, max_urls=None):
+    """
+    Stream page entries from the sitemaps listed in robots.txt (or /sitemap.xml)
+    Each page's lastmod and hreflang alternates are written to SITEMAP_PAGES as it arrives;
+    when the sitemaps list no pages the file is removed rather than left stale
+    """
+    sitemaps = robots.site_maps() or [urljoin(BASE_URL, "/sitemap.xml")]
+    tmp_path = SITEMAP_PAGES + '.tmp'
+    count = 0
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write('{')
+        async for entry in iter_sitemap_urls(session, sitemaps, max_urls):
+            page = {"lastmod": entry["lastmod"], "alternates": entry["alternates"]}
+            f.write(',' if count else '')
+            f.write(f'\n  {json.dumps(entry["loc"])}: ' + json.dumps(page, indent=2).replace('\n', '\n  '))
+            count += 1
+            yield entry
+        f.write('\n}')
+    print(f"🗺️ {count} pages listed in {len(sitemaps)} sitemap(s)")
+    if count:
+        os.replace(tmp_path, SITEMAP_PAGES)
+    else:
+        os.remove(tmp_path)
+        if os.path.exists(SITEMAP_PAGES):
+            os.remove(SITEMAP_PAGES)
+
+def load_locale_prefixes():
+    """Path prefixes of the localized copies of the site, e.g. /fr-fr"""
+    if os.path.exists(LOCALES_JSON):
+        try:
+            with open(LOCALES_JSON, 'r') as f:
+                return [l['href'] for l in json.load(f) if l.get('href')]
+        except:
+            pass
+    return []
+
+async def english_pages(entries):
+    """Canonical sitemap pages outside the locale prefixes, with their lastmod"""
+    prefixes = tuple(prefix.rstrip('/') + '/' for prefix in load_locale_prefixes())
+    pages = {}
+    async for entry in entries:
+        path = urlparse(entry["loc"]).path
+        if prefixes and (path + '/').startswith(prefixes):
+            continue
+        pages.setdefault(canonicalize(entry["loc"]), entry["lastmod"])
+    return pages
+
+async def discover_pages(session, sem, state, parse_queue, max_depth, max_pages, use_bloom):
+    """
+    Breadth-first crawl from BASE_URL over internal links
+    Seeds from robots.txt sitemaps (or /sitemap.xml) and honours robots rules and crawl-delay
+    Returns the crawled page URLs and their fetch_links results, in crawl order
+    """
+    base_host = host_of(BASE_URL)
+    robots = await load_robots(session, BASE_URL)
+    limiter = AdaptiveHostLimiter(initial_rate=DISCOVER_RATE, max_window=DISCOVER_CONCURRENCY)
+    crawl_delay = robots.crawl_delay(ROBOTS_USER_AGENT)
+    if crawl_delay:
+        rate = 1 / float(crawl_delay)
+        limiter.host_overrides[base_host] = {"initial_rate": rate, "max_rate": rate, "max_window": 1}
+
+    # Localized copies are mapped from the English pages by locale_mapper, so only English pages are crawled
+    frontier = CrawlFrontier([base_host], max_depth, max_pages, robots, ROBOTS_USER_AGENT, use_bloom,
+                             excluded_prefixes=load_locale_prefixes())
+    frontier.add(BASE_URL, 0)
+    # Seeds go straight into the frontier as the sitemaps stream in
+    lastmods, seeded = {}, 0
+    async for entry in read_sitemaps(session, robots, max_pages):
+        if entry["lastmod"]:
+            lastmods[canonicalize(entry["loc"])] = entry["lastmod"]
+        seeded += frontier.add(entry["loc"], 1)
+    print(f"🗺️ Seeded {seeded} pages from the sitemaps")
+
+    pages, results = [], []
+    while True:
+        batch = frontier.pop_batch(DISCOVER_BATCH)
+        if not batch:
+            break
+        batch_results = await asyncio.gather(*(
+            fetch_links(session, url, sem, state, parse_queue, limiter, lastmods.get(url)) for url, _ in batch
+        ))
+        for (url, depth), (links, outcome) in zip(batch, batch_results):
+            if outcome == "skipped":
+                continue
+            pages.append(url)
+            results.append((links, outcome))
+            for link in links:
+                frontier.add(link['url'], depth + 1)
+        print(f"🔎 {len(pages)} pages crawled, {len(frontier)} queued (depth {batch[-1][1]})")
 
+    skipped = frontier.skipped
+    print(f"🧭 Discovery done: {len(pages)} pages; skipped {skipped['excluded']} localized, {skipped['depth']} too deep, "
+          f"{skipped['robots']} disallowed by robots.txt, {skipped['limit']} over the page limit")
+    return pages, results
+
+def merge_registry(existing, discovered):
+    """
+    Update the link registry in place
+    Entries that are still linked keep their position, vanished ones are dropped
+    and newly discovered ones are appended
+    """
+    merged = []
+    for item in existing:
+        url = item['url'] if isinstance(item, dict) else item
+        if url in discovered:
+            merged.append(discovered.pop(url))
+    merged.extend(discovered.values())
+    return merged
+
+def read_input_csv():
+    """Canonical English page URLs from the hand-maintained INPUT_CSV"""
     urls = []
     with open(INPUT_CSV, newline='', encoding="utf-8") as f:
         reader = csv.reader(f)
         for row in reader:
             if row:
-                urls.append(row[0].strip())
+                urls.append(canonicalize(row[0].strip()))
+    # Spellings of the same page are crawled once, as --discover does
+    return list(dict.fromkeys(urls))
+
+async def main(discover=False, max_depth=DEFAULT_MAX_DEPTH, max_pages=DEFAULT_MAX_PAGES, use_bloom=False, use_sitemap=False):
+    start_time = time.time()
+    if not os.path.exists('registry'):
+        os.makedirs('registry')
 
-    print(f"🚀 Starting deep crawl of {len(urls)} English URLs...")
+    urls = []
+    lastmods = {}
+    if discover:
+        print(f"🚀 Discovering pages from {BASE_URL} (depth {max_depth}, up to {max_pages} pages)...")
+    elif not use_sitemap:
+        urls = read_input_csv()
+        print(f"🚀 Starting deep crawl of {len(urls)} English URLs...")
     
     sem = asyncio.Semaphore(50) # Increased concurrency
     headers = {
@@ -60,24 +302,91 @@ async def main():
         "Accept-Language": "en-US,en;q=0.9"
     }
     
-    async with aiohttp.ClientSession(headers=headers) as session:
-        tasks = [fetch_links(session, url, sem) for url in urls]
-        results = await asyncio.gather(*tasks)
+    state = load_crawl_state()
+    parse_queue = asyncio.Queue(maxsize=PARSE_QUEUE_SIZE)
+    with ProcessPoolExecutor(max_workers=PARSE_WORKERS) as pool:
+        parsers = [asyncio.create_task(parse_worker(parse_queue, pool)) for _ in range(PARSE_WORKERS)]
+        async with aiohttp.ClientSession(headers=headers) as session:
+            if discover:
+                urls, results = await discover_pages(session, sem, state, parse_queue, max_depth, max_pages, use_bloom)
+            else:
+                if use_sitemap:
+                    robots = await load_robots(session, BASE_URL)
+                    lastmods = await english_pages(read_sitemaps(session, robots))
+                    urls = list(lastmods)
+                    if not urls:
+                        print(f"⚠️ No pages in the sitemaps, falling back to {INPUT_CSV}")
+                        urls = read_input_csv()
+                    print(f"🚀 Starting deep crawl of {len(urls)} English URLs...")
+                tasks = [fetch_links(session, url, sem, state, parse_queue, lastmod=lastmods.get(url)) for url in urls]
+                results = await asyncio.gather(*tasks)
+        for parser in parsers:
+            parser.cancel()
 
-    # Deduplicate while preserving source/text (keep the first one found)
+    outcomes = {}
+    for _, outcome in results:
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    print(f"♻️ {outcomes.get('lastmod', 0)} pages skipped by sitemap lastmod, "
+          f"{outcomes.get('not_modified', 0)} not modified, {outcomes.get('unchanged', 0)} unchanged, "
+          f"{outcomes.get('parsed', 0)} parsed, {outcomes.get('failed', 0)} failed")
+
+    # The registry keeps the first source/text per link; every referring page goes to the source index.
+    # Both are keyed by canonical URL so spellings of one link are checked and reported once;
+    # the index keeps the spelling each page actually wrote
     unique_links = {}
-    for result_list in results:
-        for item in result_list:
-            if item['url'] not in unique_links:
-                unique_links[item['url']] = item
+    link_sources = LinkSourceIndex(LINK_SOURCES, load=False)
+    for page_url, (links, _) in zip(urls, results):
+        for link in links:
+            url = canonicalize(link['url'])
+            if url not in unique_links:
+                unique_links[url] = {"url": url, "source": page_url, "text": link['text']}
+            link_sources.add(url, page_url, link['text'], link['url'])
+    link_sources.save()
+
+    print(f"📊 Total unique links discovered: {len(unique_links)} on {len(link_sources.sources)} pages")
+
+    if discover:
+        # Pages that could not be fetched are not known to exist
+        crawled = [url for url, (_, outcome) in zip(urls, results) if outcome != "failed"]
+        with open(DISCOVERED_CSV, 'w', newline='', encoding='utf-8') as f:
+            csv.writer(f).writerows([url] for url in crawled)
+        print(f"📝 {len(crawled)} crawled pages written to {DISCOVERED_CSV}")
+
+    existing = []
+    if os.path.exists(OUTPUT_JSON):
+        try:
+            with open(OUTPUT_JSON, 'r') as f:
+                existing = json.load(f)
+        except:
+            pass
+
+    merged = merge_registry(existing, unique_links)
+    if merged != existing:
+        with open(OUTPUT_JSON, 'w', encoding='utf-8') as f:
+            json.dump(merged, f, indent=2)
+    else:
+        print(f"✨ {OUTPUT_JSON} already up to date")
 
-    print(f"📊 Total unique links discovered: {len(unique_links)}")
+    # Forget pages that were removed from the input list
+    page_set = set(urls)
+    state = {url: entry for url, entry in state.items() if url in page_set}
 
-    with open(OUTPUT_JSON, 'w', encoding='utf-8') as f:
-        json.dump(list(unique_links.values()), f, indent=2)
+    alternates = {url: state[url]["alternates"] for url in urls if state.get(url, {}).get("alternates")}
+    with open(PAGE_ALTERNATES, 'w', encoding='utf-8') as f:
+        json.dump(alternates, f, indent=2)
+    print(f"🌐 {len(alternates)} pages declare hreflang alternates")
+    with open(CRAWL_STATE, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2)
     
     total_time = time.time() - start_time
     print(f"⏱️ Total time taken: {total_time:.2f} seconds ({total_time/60:.2f} minutes)")
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Extract links from the site's pages")
+    parser.add_argument("--discover", action="store_true", help=f"Find pages by crawling from {BASE_URL} instead of reading {INPUT_CSV}")
+    parser.add_argument("--sitemap", action="store_true", help=f"Read the English pages from the site's sitemaps instead of {INPUT_CSV}")
+    parser.add_argument("--max-depth", type=int, default=DEFAULT_MAX_DEPTH, help="Link depth limit for --discover")
+    parser.add_argument("--max-pages", type=int, default=DEFAULT_MAX_PAGES, help="Page limit for --discover")
+    parser.add_argument("--bloom", action="store_true", help="Use a fixed-size Bloom filter as the seen-set for very large sites")
+    args = parser.parse_args()
+    asyncio.run(main(args.discover, args.max_depth, args.max_pages, args.bloom, args.sitemap))
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+URL Exclusions
+Compiled matcher for excluded domains and URL patterns, from the config.yaml whitelist
+and the issue tracker's whitelist file
+"""
+
+import json
+import os
+import re
+from typing import Dict, Iterable, List
+from urllib.parse import urlsplit
+
+CONFIG_FILE = "config.yaml"
+WHITELIST_FILE = "config/whitelist.json"
+# Leading/trailing ".*" add nothing to re.search but make every failed match quadratic
+_OPEN_ENDS = re.compile(r'^(?:\.\*)+|(?<!\\)(?:\.\*)+$')
+_BACKREFERENCE = re.compile(r'\\[1-9]|\(\?P=')
+
+
+def _normalize_domain(domain: str) -> str:
+    """Bare lowercase host from a domain, netloc or URL entry"""
+    domain = domain.strip().lower()
+    if '://' in domain:
+        domain = urlsplit(domain).hostname or ''
+    domain = domain.split('/', 1)[0].rsplit('@', 1)[-1]
+    if not domain.startswith('['):
+        domain = domain.split(':', 1)[0]
+    return domain.lstrip('*').strip('.')
+
+
+class DomainTrie:
+    """Host suffix trie over reversed labels; a domain also matches all of its subdomains"""
+
+    def __init__(self, domains: Iterable[str] = ()):
+        self.root = {}
+        self.size = 0
+        for domain in domains:
+            self.add(domain)
+
+    def add(self, domain: str) -> None:
+        domain = _normalize_domain(domain)
+        if not domain:
+            return
+        node = self.root
+        for label in reversed(domain.split('.')):
+            node = node.setdefault(label, {})
+        if not node.get(''):
+            node[''] = True
+            self.size += 1
+
+    def matches(self, host: str) -> bool:
+        node = self.root
+        for label in reversed(host.split('.')):
+            node = node.get(label)
+            if node is None:
+                return False
+            if node.get(''):
+                return True
+        return False
+
+    def __len__(self) -> int:
+        return self.size
+
+
+class ExclusionMatcher:
+    """
+    Decides whether a URL is excluded from checking
+    Domains go into a suffix trie and patterns into one precompiled regex,
+    so each URL costs a host lookup and a single regex scan
+    """
+
+    def __init__(self, domains: Iterable[str] = (), patterns: Iterable[str] = ()):
+        self.domains = DomainTrie(domains)
+        self.patterns = []
+        for pattern in patterns:
+            try:
+                re.compile(pattern)
+                self.patterns.append(pattern)
+            except re.error:
+                print(f"⚠️ Ignoring invalid exclusion pattern: {pattern}")
+        self.regex = self._combine(self.patterns)
+
+    @staticmethod
+    def _combine(patterns: List[str]):
+        if not patterns:
+            return None
+        # Group numbers shift once patterns are combined, so backreferences are matched on their own
+        separate = [pattern for pattern in patterns if _BACKREFERENCE.search(pattern)]
+        combined = [_OPEN_ENDS.sub('', pattern) for pattern in patterns if pattern not in separate]
+        try:
+            compiled = [re.compile('|'.join(f'(?:{pattern})' for pattern in combined))] if combined else []
+        except re.error:
+            # e.g. the same group name in two patterns
+            compiled, separate = [], patterns
+        compiled.extend(re.compile(pattern) for pattern in separate)
+        return compiled[0] if len(compiled) == 1 else _PatternList(compiled)
+
+    def matches(self, url: str) -> bool:
+        """Check if a URL is excluded"""
+        if len(self.domains):
+            try:
+                host = (urlsplit(url).hostname or '').lower()
+            except ValueError:
+                host = ''
+            if host and self.domains.matches(host):
+                return True
+        return self.regex is not None and self.regex.search(url) is not None
+
+    def __bool__(self) -> bool:
+        return bool(len(self.domains) or self.patterns)
+
+    @classmethod
+    def from_sources(cls, config_file: str = CONFIG_FILE, whitelist_file: str = WHITELIST_FILE) -> 'ExclusionMatcher':
+        """Exclusions from the config.yaml whitelist plus the issue tracker's whitelist file"""
+        config = load_config_whitelist(config_file)
+        whitelist = load_whitelist_file(whitelist_file)
+        return cls(
+            list(config.get('domains') or []) + list(whitelist.get('excluded_domains') or []),
+            list(config.get('patterns') or []) + list(whitelist.get('excluded_patterns') or [])
+        )
+
+
+class _PatternList:
+    """Patterns that can't share the combined regex, tried in turn"""
+
+    def __init__(self, compiled):
+        self.compiled = compiled
+
+    def search(self, url: str):
+        for regex in self.compiled:
+            match = regex.search(url)
+            if match:
+                return match
+        return None
+
+
+def load_config_whitelist(config_file: str = CONFIG_FILE) -> Dict:
+    """The whitelist section of config.yaml"""
+    if os.path.exists(config_file):
+        try:
+            import yaml
+            with open(config_file, 'r') as f:
+                return (yaml.safe_load(f) or {}).get('whitelist') or {}
+        except:
+            pass
+    return {}
+
+
+def load_whitelist_file(whitelist_file: str = WHITELIST_FILE) -> Dict:
+    """The issue tracker's whitelist JSON"""
+    if os.path.exists(whitelist_file):
+        try:
+            with open(whitelist_file, 'r') as f:
+                return json.load(f)
+        except:
+            pass
+    return {}
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Extractor Parity Check
+Runs every installed extractor backend over an HTML corpus, compares the results
+with the BeautifulSoup reference and reports parse time per backend
+"""
+
+import argparse
+import glob
+import os
+import time
+
+from link_extractor import available_backends, extract_alternates, extract_links, extract_metadata
+
+BASE_URL = "https://kwalee.com/games/"
+
+# Markup that exercises the tree-building edge cases the reference handles
+CORPUS = {
+    "basic": "<a href='/a'>A</a><a href='https://ext.example/b'>B</a><a href='#top'>Top</a>",
+    "nested_text": "<a href='/x'>Hello <b>World</b><!-- note --> !</a>",
+    "entities": "<a href='/e?a=1&amp;b=2'>Fish &amp; Chips &copy; &#169; &#x41; &#150; &bogus; &amp</a>",
+    "empty_href": "<a href>Self</a><a href=''>Also self</a><a>No href</a>",
+    "duplicate_attrs": "<a href='/first' href='/second'>Dupe</a>",
+    "unclosed": "<div><a href='/u'>Unclosed <span>tail",
+    "mis_nested": "<p><a href='/m'>one</p>two</a><b><a href='/n'>x</b>y</a>",
+    "nested_anchors": "<a href='/outer'>Out<a href='/inner'>In</a>side</a>",
+    "scripts": "<a href='/s'><script>var x = '<a href=/no>no</a>';</script>Visible<style>a{}</style></a>",
+    "template": "<a href='/t'><template>hidden</template>shown</a><template><a href='/h'>inside</a></template>",
+    "ruby": "<a href='/r'><ruby>漢<rp>(</rp><rt>kan</rt><rp>)</rp></ruby></a>",
+    "void": "<a href='/v'>line<br>break<img src=x>img</br>end</a>",
+    "self_closing": "<a href='/sc'/>text<a href='/sc2'>ok<br/>after</a>",
+    "whitespace": "<a href='/w'>  \n  </a><a href='/w2'> spaced text </a><pre><a href='/p'>  pre  </a></pre>",
+    "cdata": "<a href='/c'><![CDATA[raw]]> data</a>",
+    "schemes": "<a href='mailto:a@b.c'>Mail</a><a href='javascript:void(0)'>JS</a><a href='//cdn.example/x'>Proto</a>",
+    "duplicates": "<a href='/d'>Same</a><a href='/d'>Same</a><a href='/d'>Other</a>",
+    "uppercase": "<A HREF='/up'>Upper</A>",
+    "metadata": (
+        "<!DOCTYPE html><html><head><title>Kwalee &amp; Friends - Games</title>"
+        "<meta charset='utf-8'><meta name='description' content='Mobile games publisher'>"
+        "<meta property='og:title' content='Kwalee'><meta property='og:image' content='/og.png'>"
+        "<meta property='og:title' content='Second'><meta name='empty' content=''>"
+        "<script type='application/ld+json'>{\"@type\": \"Organization\"}</script></head>"
+        "<body><meta name='late' content='in body'></body></html>"
+    ),
+    "hreflang": (
+        "<head><link rel='alternate' hreflang='fr-FR' href='/fr-fr/games/'>"
+        "<link rel='Alternate' hreflang='de' href=' https://kwalee.com/de-de/games/ '>"
+        "<link rel='alternate' hreflang='fr-fr' href='/duplicate'><link rel='canonical' href='/games/'>"
+        "<link rel='stylesheet' hreflang='es' href='/style.css'><link rel='alternate' hreflang='x-default' href='/games/'>"
+        "<link rel='alternate' hreflang='it'><link rel='alternate' hreflang='ja' href='javascript:void(0)'></head>"
+    ),
+    "title_single_child": "<title><b>Bold title</b></title>",
+    "title_mixed": "<title>Part <b>two</b></title>",
+    "title_blank": "<title>   </title><title>Second</title>",
+    "title_missing": "<head></head>",
+    "og_no_content": "<meta property='og:type'><meta property='og:description' content>",
+    "large_page": "<html><body>" + "".join(
+        f"<div class='card'><a href='/games/{i}'><span>Game {i}</span></a><p>{'lorem ipsum ' * 20}</p></div>"
+        for i in range(3000)
+    ) + "</body></html>",
+}
+
+
+def load_corpus(directory=None):
+    """Built-in snippets plus any .html files in directory"""
+    corpus = dict(CORPUS)
+    if directory:
+        for path in sorted(glob.glob(os.path.join(directory, '*.html'))):
+            with open(path, 'r', encoding='utf-8', errors='replace') as f:
+                corpus[os.path.basename(path)] = f.read()
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare extractor backends with the BeautifulSoup reference")
+    parser.add_argument("--dir", help="Directory of saved .html pages to add to the corpus")
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.dir)
+    backends = available_backends()
+    if 'bs4' not in backends:
+        print("❌ BeautifulSoup is required as the reference backend")
+        return 1
+
+    print(f"🧪 {len(corpus)} documents, backends: {', '.join(backends)}")
+    expected = {name: (extract_links(html, BASE_URL, 'bs4'), extract_metadata(html, 'bs4'),
+                       extract_alternates(html, BASE_URL, 'bs4'))
+                for name, html in corpus.items()}
+
+    failures = 0
+    for backend in backends:
+        mismatches = []
+        start = time.perf_counter()
+        for name, html in corpus.items():
+            result = (extract_links(html, BASE_URL, backend), extract_metadata(html, backend),
+                      extract_alternates(html, BASE_URL, backend))
+            if result != expected[name]:
+                mismatches.append(name)
+        elapsed = (time.perf_counter() - start) * 1000
+
+        status = "✅" if not mismatches else "⚠️"
+        print(f"{status} {backend}: {len(corpus) - len(mismatches)}/{len(corpus)} identical, {elapsed:.0f}ms")
+        for name in mismatches:
+            print(f"     differs on: {name}")
+        # Every backend stands in for the reference, so each must match everywhere
+        failures += len(mismatches)
+
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
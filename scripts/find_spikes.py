@@ -1,21 +1,17 @@
-import json
 import os
 
-SPIKE_THRESHOLD = 1000  # Configure spike threshold here
-
-def find_spikes(filepath, threshold=SPIKE_THRESHOLD):
-    if not os.path.exists(filepath):
-        return
+from history_store import HistoryStore
 
-    with open(filepath, 'r') as f:
-        data = json.load(f)
+SPIKE_THRESHOLD = 1000  # Configure spike threshold here
 
-    if 'trends' not in data:
+def find_spikes(history_dir, threshold=SPIKE_THRESHOLD, start=None, end=None):
+    if not os.path.isdir(history_dir):
         return
 
-    print(f"Checking {filepath} (threshold: {threshold})...")
+    history = HistoryStore(history_dir)
+    print(f"Checking {history_dir} (threshold: {threshold})...")
     spikes = []
-    for i, t in enumerate(data['trends']):
+    for i, t in enumerate(history.runs(start, end)):
         bl = t.get('brokenLinks', 0)
         if bl > threshold:
             spikes.append((i, bl, t.get('date')))
@@ -24,5 +20,4 @@ def find_spikes(filepath, threshold=SPIKE_THRESHOLD):
     return spikes
 
 if __name__ == "__main__":
-    find_spikes('data/results.json')
-    find_spikes('dashboard/data/results.json')
+    find_spikes('data/history')
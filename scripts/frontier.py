@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Crawl Frontier
+Breadth-first URL queue with canonical dedup, depth/page limits, robots.txt rules
+and a disk spill so memory stays bounded on large sites
+"""
+
+import hashlib
+import json
+import math
+import tempfile
+from collections import deque
+from typing import Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+from urllib.robotparser import RobotFileParser
+
+from host_limiter import host_of
+from url_canon import canonicalize
+
+DEFAULT_MAX_DEPTH = 5
+DEFAULT_MAX_PAGES = 20000
+# Queued URLs held in memory; the rest wait in a temporary file in FIFO order
+MEMORY_QUEUE_LIMIT = 5000
+BLOOM_ERROR_RATE = 0.001
+
+
+def _digest(url: str) -> bytes:
+    return hashlib.blake2b(url.encode('utf-8'), digest_size=16).digest()
+
+
+class SeenSet:
+    """Exact seen-set storing 8-byte hashes instead of full URL strings"""
+
+    def __init__(self):
+        self.hashes = set()
+
+    def add(self, url: str) -> None:
+        self.hashes.add(_digest(url)[:8])
+
+    def __contains__(self, url: str) -> bool:
+        return _digest(url)[:8] in self.hashes
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+
+class BloomFilter:
+    """
+    Fixed-size probabilistic seen-set
+    Never forgets a URL; may wrongly report an unseen one as seen at error_rate
+    """
+
+    def __init__(self, capacity: int, error_rate: float = BLOOM_ERROR_RATE):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, url: str) -> Iterable[int]:
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = _digest(url)
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, url: str) -> None:
+        for position in self._positions(url):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, url: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(url))
+
+    def __len__(self) -> int:
+        return self.count
+
+
+class SpillQueue:
+    """FIFO queue that keeps the head in memory and overflows to a temporary file"""
+
+    def __init__(self, memory_limit: int = MEMORY_QUEUE_LIMIT):
+        self.memory_limit = memory_limit
+        self.memory = deque()
+        self.spill = None
+        self.read_offset = 0
+        self.spilled = 0
+
+    def push(self, item) -> None:
+        # Once anything is on disk, newer items must queue behind it
+        if self.spilled or len(self.memory) >= self.memory_limit:
+            if self.spill is None:
+                self.spill = tempfile.TemporaryFile(mode='w+', encoding='utf-8')
+            self.spill.seek(0, 2)
+            self.spill.write(json.dumps(item) + '\n')
+            self.spilled += 1
+        else:
+            self.memory.append(item)
+
+    def _refill(self) -> None:
+        self.spill.seek(self.read_offset)
+        while self.spilled and len(self.memory) < self.memory_limit:
+            self.memory.append(tuple(json.loads(self.spill.readline())))
+            self.spilled -= 1
+        self.read_offset = self.spill.tell()
+        if not self.spilled:
+            self.spill.seek(0)
+            self.spill.truncate()
+            self.read_offset = 0
+
+    def pop(self):
+        if not self.memory and self.spilled:
+            self._refill()
+        return self.memory.popleft() if self.memory else None
+
+    def __len__(self) -> int:
+        return len(self.memory) + self.spilled
+
+
+class CrawlFrontier:
+    """
+    Breadth-first frontier over a set of allowed hosts
+    URLs are canonicalized before dedup, and every URL is queued at most once,
+    so the page limit also bounds how many pages are fetched
+    """
+
+    def __init__(self,
+                 allowed_hosts: Iterable[str],
+                 max_depth: int = DEFAULT_MAX_DEPTH,
+                 max_pages: int = DEFAULT_MAX_PAGES,
+                 robots: Optional[RobotFileParser] = None,
+                 user_agent: str = '*',
+                 use_bloom: bool = False,
+                 excluded_prefixes: Iterable[str] = ()):
+        self.allowed_hosts = {host.lower() for host in allowed_hosts}
+        # Path prefixes never crawled, e.g. the localized copies of the site (/fr-fr)
+        self.excluded_prefixes = tuple(prefix.rstrip('/') + '/' for prefix in excluded_prefixes)
+        self.max_depth = max_depth
+        self.max_pages = max_pages
+        self.robots = robots
+        self.user_agent = user_agent
+        # A Bloom filter sized for the page limit keeps memory fixed however many links are seen
+        self.seen = BloomFilter(max_pages * 10) if use_bloom else SeenSet()
+        self.queue = SpillQueue()
+        self.queued = 0
+        self.skipped = {'depth': 0, 'robots': 0, 'limit': 0, 'excluded': 0}
+
+    def in_scope(self, url: str) -> bool:
+        return url.startswith(('http://', 'https://')) and host_of(url) in self.allowed_hosts
+
+    def add(self, url: str, depth: int) -> bool:
+        """Queue a URL unless it is out of scope, already seen, excluded, too deep or over the page limit"""
+        url = canonicalize(url)
+        if not self.in_scope(url) or url in self.seen:
+            return False
+        self.seen.add(url)
+
+        if self.excluded_prefixes and (urlparse(url).path + '/').startswith(self.excluded_prefixes):
+            self.skipped['excluded'] += 1
+            return False
+        if depth > self.max_depth:
+            self.skipped['depth'] += 1
+            return False
+        if self.robots is not None and not self.robots.can_fetch(self.user_agent, url):
+            self.skipped['robots'] += 1
+            return False
+        if self.queued >= self.max_pages:
+            self.skipped['limit'] += 1
+            return False
+
+        self.queue.push((url, depth))
+        self.queued += 1
+        return True
+
+    def pop_batch(self, size: int) -> List[Tuple[str, int]]:
+        """Next URLs in breadth-first order as (url, depth)"""
+        batch = []
+        while len(batch) < size:
+            item = self.queue.pop()
+            if item is None:
+                break
+            batch.append(item)
+        return batch
+
+    def __len__(self) -> int:
+        return len(self.queue)
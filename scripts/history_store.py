@@ -0,0 +1,210 @@
+#!/usr/bin/env python3
+"""
+Historical Store
+Append-only run aggregates and per-URL status changes with a per-day index
+"""
+
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+HISTORY_DIR = "data/history"
+RUNS_LOG = "runs.ndjson"
+RUNS_INDEX = "runs.index.json"
+URL_EVENTS_LOG = "url_events.ndjson"
+# Per-run latency sketches (run, hosts, locales), indexed by day like the runs
+SKETCH_LOG = "latency_sketches.ndjson"
+SKETCH_INDEX = "latency_sketches.index.json"
+
+
+def rollup_runs(runs: Iterable[Dict]) -> List[Dict]:
+    """Downsample date-ordered runs to one entry per day"""
+    days = {}
+    for run in runs:
+        broken = run.get('brokenLinks', 0)
+        day = days.get(run['date'][:10])
+        if day is None:
+            day = days[run['date'][:10]] = {
+                'date': run['date'][:10], 'runs': 0, 'brokenTotal': 0,
+                'minBroken': broken, 'maxBroken': broken, 'errorDistribution': {}
+            }
+        day['runs'] += 1
+        day['brokenTotal'] += broken
+        day['minBroken'] = min(day['minBroken'], broken)
+        day['maxBroken'] = max(day['maxBroken'], broken)
+        day['lastBroken'] = broken
+        day['totalUrls'] = run.get('totalUrls', 0)
+        for code, count in run.get('errorDistribution', {}).items():
+            day['errorDistribution'][code] = day['errorDistribution'].get(code, 0) + count
+
+    result = []
+    for day in days.values():
+        day['avgBroken'] = day.pop('brokenTotal') / day['runs']
+        result.append(day)
+    return result
+
+
+class HistoryStore:
+    """
+    Time-series store for run aggregates and per-URL status history
+    Runs are appended to an NDJSON log whose per-day byte offsets make range
+    queries seek straight to the first day asked for. Per-URL history only
+    records status changes, so a steady site adds almost nothing per run.
+    """
+
+    def __init__(self, history_dir: str = HISTORY_DIR):
+        self.history_dir = history_dir
+        self.runs_path = os.path.join(history_dir, RUNS_LOG)
+        self.index_path = os.path.join(history_dir, RUNS_INDEX)
+        self.events_path = os.path.join(history_dir, URL_EVENTS_LOG)
+        self.sketch_path = os.path.join(history_dir, SKETCH_LOG)
+        self.sketch_index_path = os.path.join(history_dir, SKETCH_INDEX)
+        self.index = self._load_json(self.index_path, {})
+        self.sketch_index = self._load_json(self.sketch_index_path, {})
+
+    def _load_json(self, path: str, default):
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    return json.load(f)
+            except:
+                pass
+        return default
+
+    def _save_json(self, path: str, data) -> None:
+        os.makedirs(self.history_dir, exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def is_empty(self) -> bool:
+        return not os.path.exists(self.runs_path) or os.path.getsize(self.runs_path) == 0
+
+    # Run aggregates
+
+    def append_run(self, run: Dict) -> None:
+        """Append one run's aggregates; run['date'] is an ISO timestamp"""
+        self.append_runs([run])
+
+    def append_runs(self, runs: Iterable[Dict]) -> None:
+        """Append runs in date order and extend the per-day index"""
+        self._append_dated(self.runs_path, self.index, self.index_path, runs)
+
+    def _append_dated(self, path: str, index: Dict, index_path: str, entries: Iterable[Dict],
+                      compact: bool = False) -> None:
+        """Append date-ordered entries to an NDJSON log and record each new day's byte offset"""
+        os.makedirs(self.history_dir, exist_ok=True)
+        with open(path, 'ab') as f:
+            for entry in entries:
+                day = entry['date'][:10]
+                if day not in index:
+                    index[day] = f.tell()
+                line = json.dumps(entry, ensure_ascii=False, separators=(',', ':') if compact else None)
+                f.write((line + '\n').encode('utf-8'))
+        self._save_json(index_path, index)
+
+    def _start_offset(self, start: Optional[str], index: Dict, path: str) -> int:
+        """Byte offset of the first indexed day on or after start"""
+        if not start:
+            return 0
+        days = sorted(day for day in index if day >= start[:10])
+        return index[days[0]] if days else os.path.getsize(path)
+
+    def _read_dated(self, path: str, index: Dict, start: Optional[str], end: Optional[str]) -> Iterator[Dict]:
+        """Stream entries of a day-indexed log with start <= date <= end"""
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            return
+        with open(path, 'rb') as f:
+            f.seek(self._start_offset(start, index, path))
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if start and entry['date'] < start:
+                    continue
+                if end and entry['date'] > end:
+                    break
+                yield entry
+
+    def runs(self, start: Optional[str] = None, end: Optional[str] = None) -> Iterator[Dict]:
+        """Stream runs with start <= date <= end (ISO strings, either may be omitted)"""
+        return self._read_dated(self.runs_path, self.index, start, end)
+
+    def recent_runs(self, days: int, now: Optional[datetime] = None) -> List[Dict]:
+        """Runs from the last N days"""
+        now = now or datetime.now()
+        return list(self.runs(start=(now - timedelta(days=days)).isoformat()))
+
+    def last_runs(self, count: int) -> List[Dict]:
+        """The newest N runs, oldest first"""
+        collected = []
+        # Walk back a day at a time so only the tail of the log is read
+        for day in sorted(self.index, reverse=True):
+            collected = list(self.runs(start=day))
+            if len(collected) >= count:
+                break
+        return collected[-count:]
+
+    def rollup(self, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict]:
+        """Downsample runs in a date range to one entry per day"""
+        return rollup_runs(self.runs(start, end))
+
+    def rewrite_runs(self, keep) -> int:
+        """Rewrite the log keeping only runs for which keep(run) is true; returns removed count"""
+        runs = list(self.runs())
+        kept = [run for run in runs if keep(run)]
+        if len(kept) == len(runs):
+            return 0
+        os.replace(self.runs_path, self.runs_path + '.bak')
+        self.index = {}
+        self.append_runs(kept)
+        os.remove(self.runs_path + '.bak')
+        return len(runs) - len(kept)
+
+    # Latency sketches
+
+    def append_sketches(self, date: str, run_id: str, sketches: Dict) -> None:
+        """Store one run's latency sketches; date is an ISO timestamp"""
+        self._append_dated(self.sketch_path, self.sketch_index, self.sketch_index_path,
+                           [{'date': date, 'runId': run_id, **sketches}], compact=True)
+
+    def sketches(self, start: Optional[str] = None, end: Optional[str] = None) -> Iterator[Dict]:
+        """Stream per-run sketch sets with start <= date <= end"""
+        return self._read_dated(self.sketch_path, self.sketch_index, start, end)
+
+    # Per-URL status history
+
+    def record_url_statuses(self, date: str, statuses: Iterable[Tuple[str, object]],
+                            previous: Callable[[str], object]) -> int:
+        """
+        Append an event for every URL whose status differs from its last recorded one
+        previous(url) gives that last status, e.g. UrlHistoryIndex.last_status before this run is recorded
+        """
+        changes = 0
+        os.makedirs(self.history_dir, exist_ok=True)
+        with open(self.events_path, 'a', encoding='utf-8') as f:
+            for url, status in statuses:
+                if previous(url) != status:
+                    f.write(json.dumps({'date': date, 'url': url, 'status': status}, ensure_ascii=False) + '\n')
+                    changes += 1
+        return changes
+
+    def url_history(self, url: str, start: Optional[str] = None, end: Optional[str] = None) -> List[Dict]:
+        """Status changes of one URL within a date range"""
+        if not os.path.exists(self.events_path):
+            return []
+        events = []
+        with open(self.events_path, 'r', encoding='utf-8') as f:
+            for line in f:
+                if url not in line:
+                    continue
+                event = json.loads(line)
+                if event['url'] != url:
+                    continue
+                if (start and event['date'] < start) or (end and event['date'] > end):
+                    continue
+                events.append(event)
+        return events
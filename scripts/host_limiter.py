@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Adaptive Per-Host Rate Limiting
+Token bucket per host whose rate and concurrency adapt with AIMD
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+# Statuses that mean the host is asking us to slow down
+THROTTLE_STATUSES = {429, 503}
+# Longest Retry-After we are willing to honour, in seconds
+MAX_RETRY_AFTER = 120
+
+
+def host_of(url: str) -> str:
+    """Get the lowercase host of a URL"""
+    return (urlparse(url).hostname or '').lower()
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds or as an HTTP date"""
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            seconds = parsedate_to_datetime(value).timestamp() - time.time()
+        except (TypeError, ValueError):
+            return None
+    return max(0.0, min(seconds, MAX_RETRY_AFTER))
+
+
+class HostBucket:
+    """Token bucket plus concurrency window for a single host"""
+
+    def __init__(self, rate: float, max_rate: float, window: float, max_window: float):
+        self.rate = rate
+        self.max_rate = max_rate
+        self.tokens = 1.0
+        self.window = window
+        self.max_window = max_window
+        self.in_flight = 0
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        self.latency_ewma = None
+        self.waiters = asyncio.Condition()
+
+    def refill(self, now: float) -> None:
+        """Add tokens for the time elapsed since the last refill"""
+        burst = max(self.window, 1.0)
+        self.tokens = min(burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until a request may start, 0 if it can start now"""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.tokens < 1.0:
+            return (1.0 - self.tokens) / self.rate
+        return 0.0
+
+
+class AdaptiveHostLimiter:
+    """
+    Per-host AIMD limiter
+    Each host grows its rate additively while responses stay fast, halves it on
+    429/503, timeouts or latency spikes, and pauses entirely for Retry-After
+    """
+
+    def __init__(self,
+                 initial_rate: float = 5.0,
+                 min_rate: float = 0.5,
+                 max_rate: float = 50.0,
+                 max_window: int = 20,
+                 latency_target_ms: float = 3000,
+                 host_overrides: Optional[Dict[str, Dict]] = None):
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.max_window = max_window
+        self.latency_target_ms = latency_target_ms
+        self.host_overrides = host_overrides or {}
+        self.buckets = {}
+        self.throttled = 0
+
+    def _settings_for(self, host: str) -> Dict:
+        """Get limits for a host, honouring suffix overrides"""
+        for suffix, settings in self.host_overrides.items():
+            if host == suffix or host.endswith('.' + suffix):
+                return settings
+        return {}
+
+    def bucket(self, host: str) -> HostBucket:
+        """Get or create the bucket for a host"""
+        if host not in self.buckets:
+            settings = self._settings_for(host)
+            max_window = settings.get('max_window', self.max_window)
+            max_rate = settings.get('max_rate', self.max_rate)
+            rate = settings.get('initial_rate', self.initial_rate)
+            self.buckets[host] = HostBucket(rate, max_rate, max(1.0, min(rate, max_window)), max_window)
+        return self.buckets[host]
+
+    async def acquire(self, host: str) -> None:
+        """Wait until the host has both a token and a free concurrency slot"""
+        bucket = self.bucket(host)
+        async with bucket.waiters:
+            while True:
+                now = time.monotonic()
+                bucket.refill(now)
+                delay = bucket.wait_time(now)
+                if delay == 0 and bucket.in_flight < int(bucket.window):
+                    bucket.tokens -= 1.0
+                    bucket.in_flight += 1
+                    return
+                try:
+                    # Woken early by a release, otherwise by the token refill
+                    await asyncio.wait_for(bucket.waiters.wait(), timeout=delay or None)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def release(self, host: str) -> None:
+        """Free a concurrency slot and wake waiting requests"""
+        bucket = self.bucket(host)
+        async with bucket.waiters:
+            bucket.in_flight -= 1
+            bucket.waiters.notify_all()
+
+    @asynccontextmanager
+    async def throttle(self, url: str):
+        """Hold a per-host slot for the duration of a check"""
+        host = host_of(url)
+        await self.acquire(host)
+        try:
+            yield
+        finally:
+            await self.release(host)
+
+    def _increase(self, bucket: HostBucket) -> None:
+        """Additive increase: one more request per second, one more slot per window"""
+        bucket.rate = min(bucket.max_rate, bucket.rate + 1.0)
+        bucket.window = min(bucket.max_window, bucket.window + 1.0 / bucket.window)
+
+    def _decrease(self, bucket: HostBucket, now: float) -> None:
+        """Multiplicative decrease, at most once per observed round trip"""
+        rtt = (bucket.latency_ewma or 1000) / 1000
+        if now - bucket.last_decrease < rtt:
+            return
+        bucket.rate = max(self.min_rate, bucket.rate / 2)
+        bucket.window = max(1.0, bucket.window / 2)
+        bucket.last_decrease = now
+        self.throttled += 1
+
+    def observe(self, url: str, status: Optional[int] = None, latency: Optional[float] = None,
+                headers=None, timed_out: bool = False) -> None:
+        """Feed the outcome of a request back into the host's rate"""
+        bucket = self.bucket(host_of(url))
+        now = time.monotonic()
+
+        retry_after = parse_retry_after(headers.get('Retry-After')) if headers else None
+        if retry_after:
+            bucket.blocked_until = max(bucket.blocked_until, now + retry_after)
+
+        spiked = False
+        if latency is not None:
+            if bucket.latency_ewma is not None:
+                spiked = latency > max(self.latency_target_ms, 2 * bucket.latency_ewma)
+            bucket.latency_ewma = latency if bucket.latency_ewma is None else 0.8 * bucket.latency_ewma + 0.2 * latency
+
+        if timed_out or status in THROTTLE_STATUSES or spiked:
+            self._decrease(bucket, now)
+        elif status is not None:
+            self._increase(bucket)
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Per-Host Request Method Memory
+Remembers hosts that reject HEAD so they are checked with a single bodiless GET,
+once enough distinct pages on the host have shown it
+"""
+
+import json
+import os
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from host_limiter import host_of
+
+HOST_METHODS_FILE = "data/host_methods.json"
+# HEAD statuses that say "use GET instead" rather than "this page is broken"
+HEAD_REJECTED = {400, 403, 405, 501}
+# Hosts marked as rejecting HEAD are probed with HEAD again after this long
+HEAD_RETRY_AFTER = timedelta(days=7)
+# Distinct URLs that must see HEAD rejected while GET works before the whole host is switched to GET
+HEAD_REJECTED_MIN_URLS = 3
+
+
+class HostMethodCache:
+    """Per-host HEAD capability, shared by every URL on the host"""
+
+    def __init__(self, cache_file: str = HOST_METHODS_FILE):
+        self.cache_file = cache_file
+        self.entries = self._load()
+        self.updates = {}
+        # URL -> HEAD status that changed what is known about its host, taken into the run log per check
+        self.observed = {}
+        # HEAD requests not sent because the host was already known to reject them
+        self.saved = 0
+
+    def _load(self) -> Dict:
+        """Load host capabilities from JSON"""
+        if os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, 'r') as f:
+                    return json.load(f)
+            except:
+                pass
+        return {}
+
+    def get(self, host: str) -> Optional[Dict]:
+        if host in self.updates:
+            return self.updates[host]
+        return self.entries.get(host)
+
+    @staticmethod
+    def _head_allowed(entry: Optional[Dict], now: Optional[datetime] = None) -> bool:
+        if not entry or entry.get('head', True):
+            return True
+        now = now or datetime.now()
+        return now - datetime.fromisoformat(entry['since']) >= HEAD_RETRY_AFTER
+
+    def head_allowed(self, url: str, now: Optional[datetime] = None) -> bool:
+        """False while the URL's host is known to reject HEAD"""
+        return self._head_allowed(self.get(host_of(url)), now)
+
+    def rejecting_hosts(self) -> List[str]:
+        """Hosts whose URLs are currently checked with GET only"""
+        return [host for host, entry in self.entries.items() if not self._head_allowed(entry)]
+
+    def skip_head(self, url: str) -> bool:
+        """Whether to go straight to GET, counting the saved round-trip"""
+        if self.head_allowed(url):
+            return False
+        self.saved += 1
+        return True
+
+    def observe_fallback(self, url: str, head_status: Optional[int], get_status: int) -> None:
+        """
+        Record a GET fallback after HEAD answered with a status
+        Only a rejection status followed by a successful GET is evidence against the host;
+        HEAD raising is a network problem, not a rejection
+        """
+        if get_status < 400 and head_status in HEAD_REJECTED:
+            self.observe_rejection(url, head_status)
+
+    def observe_rejection(self, url: str, head_status: int) -> None:
+        """Count a URL whose HEAD was rejected while GET worked; also replays journalled observations"""
+        self.observed[url] = head_status
+        host = host_of(url)
+        entry = self.get(host) or {}
+        if not entry.get('head', True):
+            # Already switched: a rejection during the periodic HEAD re-probe renews it
+            if self.head_allowed(url):
+                self.updates[host] = self._switched(head_status)
+            return
+        # Evidence builds up across runs until enough distinct pages agree
+        rejected_by = {**entry.get('rejectedBy', {}), url: head_status}
+        self.updates[host] = self._combine({'head': True, 'rejectedBy': rejected_by})
+
+    def observe_head_ok(self, url: str, head_status: int) -> None:
+        """
+        Record a HEAD answered normally
+        When it was the periodic re-probe of a host switched to GET, the host goes back to HEAD
+        """
+        host = host_of(url)
+        entry = self.get(host)
+        if entry and not entry.get('head', True):
+            self.observed[url] = head_status
+            self.updates[host] = {'head': True, 'since': datetime.now().isoformat()}
+
+    def replay(self, url: str, head_status: int) -> None:
+        """Apply an observation journalled by an interrupted run"""
+        if head_status in HEAD_REJECTED:
+            self.observe_rejection(url, head_status)
+        else:
+            self.observe_head_ok(url, head_status)
+
+    def _switched(self, head_status: int) -> Dict:
+        return {'head': False, 'since': datetime.now().isoformat(), 'status': head_status}
+
+    def _combine(self, entry: Dict) -> Dict:
+        """Switch a host to GET once its evidence covers HEAD_REJECTED_MIN_URLS URLs"""
+        if entry.get('head', True) and len(entry.get('rejectedBy', {})) >= HEAD_REJECTED_MIN_URLS:
+            return self._switched(list(entry['rejectedBy'].values())[-1])
+        return entry
+
+    def merge(self, updates: Dict) -> None:
+        """Merge updates collected by a worker process, pooling per-host evidence"""
+        for host, update in updates.items():
+            mine = self.updates.get(host)
+            # A switch either way is a decision; only gathered evidence is pooled
+            if mine is None or 'rejectedBy' not in update:
+                self.updates[host] = update
+            elif mine.get('head', True):
+                self.updates[host] = self._combine(
+                    {'head': True, 'rejectedBy': {**mine.get('rejectedBy', {}), **update.get('rejectedBy', {})}})
+
+    def save(self) -> None:
+        """Apply pending updates and write the cache to disk"""
+        self.entries.update(self.updates)
+        self.updates = {}
+        os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+        with open(self.cache_file, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=2)
@@ -11,18 +11,25 @@ from typing import Dict, List, Optional
 from datetime import datetime
 import requests
 
+from exclusions import ExclusionMatcher
+from results_store import iter_broken_links, load_summary
+from url_history import UrlHistoryIndex
+
 class IssueTracker:
     def __init__(self, 
                  whitelist_file: str = 'config/whitelist.json',
                  tracking_file: str = 'data/issue_tracking.json',
                  github_token: Optional[str] = None,
-                 github_repo: Optional[str] = None):
+                 github_repo: Optional[str] = None,
+                 url_history_file: str = 'data/url_history.json'):
         self.whitelist_file = whitelist_file
         self.tracking_file = tracking_file
         self.github_token = github_token or os.getenv('GH_TOKEN')
         self.github_repo = github_repo or os.getenv('GH_REPO')
         self.whitelist = self._load_whitelist()
+        self._matcher = None
         self.tracking_data = self._load_tracking()
+        self.url_history = UrlHistoryIndex(url_history_file)
     
     def _load_whitelist(self) -> Dict:
         """Load whitelist configuration"""
@@ -67,21 +74,12 @@ class IssueTracker:
             json.dump(self.whitelist, f, indent=2)
     
     def is_whitelisted(self, url: str) -> bool:
-        """Check if URL is whitelisted"""
-        # Check excluded domains
-        for domain in self.whitelist.get('excluded_domains', []):
-            if domain in url:
-                return True
-        
-        # Check excluded patterns (regex)
-        for pattern in self.whitelist.get('excluded_patterns', []):
-            try:
-                if re.search(pattern, url):
-                    return True
-            except:
-                pass
-        
-        return False
+        """Check if URL is whitelisted (its host is under an excluded domain or it matches a pattern)"""
+        # Compiled once and rebuilt after the whitelist changes
+        if self._matcher is None:
+            self._matcher = ExclusionMatcher(self.whitelist.get('excluded_domains', []),
+                                             self.whitelist.get('excluded_patterns', []))
+        return self._matcher.matches(url)
     
     def add_to_whitelist(self, url: str, pattern: bool = False, reason: str = '') -> None:
         """Add URL or pattern to whitelist"""
@@ -99,6 +97,7 @@ class IssueTracker:
             self.whitelist['excluded_domains'].append(domain)
             print(f"✅ Added domain to whitelist: {domain}")
         
+        self._matcher = None
         self._save_whitelist()
     
     def tag_link(self, url: str, tags: List[str]) -> None:
@@ -141,7 +140,7 @@ class IssueTracker:
         print(f"✅ Marked as resolved: {url}")
     
     def create_github_issue(self, url: str, status_code: int, locale: str, 
-                           error_type: str, source: str = '') -> Optional[str]:
+                           error_type: str, source: str = '', broken_since: str = '') -> Optional[str]:
         """Create a GitHub issue for a broken link"""
         if not self.github_token or not self.github_repo:
             print("⚠️  GitHub config not available (GH_TOKEN, GH_REPO)")
@@ -155,7 +154,7 @@ class IssueTracker:
 **Error Type:** {error_type}
 **Locale:** {locale}
 **Source Page:** {source}
-**Detected:** {datetime.now().isoformat()}
+**Detected:** {broken_since or datetime.now().isoformat()}
 
 ### Action Required
 - [ ] Verify the link is actually broken
@@ -204,13 +203,11 @@ class IssueTracker:
         if not os.path.exists(results_file):
             return 0
         
-        with open(results_file, 'r') as f:
-            data = json.load(f)
-        
         count = 0
         try:
-            for link in data.get('brokenLinksList', []):
-                if re.search(pattern, link['url']):
+            regex = re.compile(pattern)
+            for link in iter_broken_links(results_file):
+                if regex.search(link['url']):
                     self.tag_link(link['url'], [tag])
                     count += 1
         except:
@@ -222,13 +219,11 @@ class IssueTracker:
     def get_issue_summary(self) -> Dict:
         """Get summary of tracked issues"""
         results_file = 'data/results.json'
-        if not os.path.exists(results_file):
+        summary = load_summary(results_file)
+        if summary is None:
             return {}
         
-        with open(results_file, 'r') as f:
-            data = json.load(f)
-        
-        broken_links = data.get('brokenLinksList', [])
+        broken_links = list(iter_broken_links(results_file, summary))
         
         # Categorize links
         categorized = {
@@ -241,12 +236,20 @@ class IssueTracker:
         acknowledged_urls = {a['url'] for a in self.tracking_data.get('acknowledged', [])}
         resolved_urls = {r['url'] for r in self.tracking_data.get('resolved', [])}
         
+        flapping = 0
         for link in broken_links:
             url = link['url']
             
             if url in resolved_urls:
                 continue
             
+            # Answer "since when" and "is it intermittent" from the per-URL history index
+            link['brokenSince'] = self.url_history.first_broken(url)
+            link['failureStreak'] = self.url_history.streak(url)
+            link['flapCount'] = self.url_history.flap_count(url)
+            if self.url_history.is_flapping(url):
+                flapping += 1
+            
             if self.is_whitelisted(url):
                 categorized['whitelisted'].append(link)
             elif url in acknowledged_urls:
@@ -263,6 +266,7 @@ class IssueTracker:
             'acknowledged_count': len(categorized['acknowledged']),
             'critical_count': len(categorized['critical']),
             'new_issues': len(categorized['new']),
+            'flapping_count': flapping,
             'action_required': len(categorized['new']) + len(categorized['critical']),
             'categorized': categorized
         }
@@ -283,7 +287,8 @@ class IssueTracker:
                 status_code=link.get('statusCode', 'Unknown'),
                 locale=link.get('locale', 'Unknown'),
                 error_type=link.get('errorType', 'Unknown'),
-                source=link.get('source', '')
+                source=link.get('source', ''),
+                broken_since=link.get('brokenSince') or ''
             )
             
             if issue_url:
@@ -301,6 +306,7 @@ if __name__ == "__main__":
     print(f"  Total Broken Links: {summary['total_broken']}")
     print(f"  New Issues: {summary['new_issues']}")
     print(f"  Critical: {summary['critical_count']}")
+    print(f"  Flapping: {summary['flapping_count']}")
     print(f"  Acknowledged: {summary['acknowledged_count']}")
     print(f"  Whitelisted: {summary['whitelisted_count']}")
     print(f"  Action Required: {summary['action_required']}")
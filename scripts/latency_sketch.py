@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Latency Sketches
+DDSketch-style quantile sketches: relative-error percentiles from log-spaced buckets,
+mergeable across workers, hosts, locales and runs without keeping raw samples
+"""
+
+import math
+from typing import Dict, Iterable, Optional
+
+# Any quantile is within this relative error of the true sample value
+SKETCH_ACCURACY = 0.02
+# Latencies below this (ms) are counted in a single zero bucket
+MIN_LATENCY_MS = 0.5
+PERCENTILES = {"p50": 0.5, "p95": 0.95, "p99": 0.99}
+
+
+class DDSketch:
+    """
+    Sparse DDSketch over positive values
+    Bucket i holds values in (gamma^(i-1), gamma^i], so its midpoint estimate is
+    off by at most the relative accuracy
+    """
+
+    def __init__(self, relative_accuracy: float = SKETCH_ACCURACY):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.bins = {}
+        self.zero = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def _index(self, value: float) -> int:
+        return math.ceil(math.log(value) / self.log_gamma)
+
+    def _value(self, index: int) -> float:
+        return 2 * self.gamma ** index / (self.gamma + 1)
+
+    def add(self, value: float, count: int = 1) -> None:
+        """Add a sample, or `count` copies of it"""
+        if value < MIN_LATENCY_MS:
+            self.zero += count
+        else:
+            index = self._index(value)
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.count += count
+        self.sum += value * count
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: 'DDSketch') -> None:
+        """Fold another sketch into this one"""
+        if not other.count:
+            return
+        if other.gamma != self.gamma:
+            # Different accuracy: re-add the other sketch's bucket estimates
+            for index, count in other.bins.items():
+                self.add(other._value(index), count)
+            if other.zero:
+                self.add(0, other.zero)
+            return
+        for index, count in other.bins.items():
+            self.bins[index] = self.bins.get(index, 0) + count
+        self.zero += other.zero
+        self.count += other.count
+        self.sum += other.sum
+        self.min = other.min if self.min is None else min(self.min, other.min)
+        self.max = other.max if self.max is None else max(self.max, other.max)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimated value at quantile q (0..1), None for an empty sketch"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero
+        if rank < seen:
+            return self.min
+        for index in sorted(self.bins):
+            seen += self.bins[index]
+            if rank < seen:
+                return min(max(self._value(index), self.min), self.max)
+        return self.max
+
+    def percentiles(self) -> Dict[str, float]:
+        """p50/p95/p99 plus count and mean, rounded to 0.1 ms"""
+        if not self.count:
+            return {}
+        result = {name: round(float(self.quantile(q)), 1) for name, q in PERCENTILES.items()}
+        result["count"] = self.count
+        result["mean"] = round(self.sum / self.count, 1)
+        return result
+
+    def to_dict(self) -> Dict:
+        """Compact form: bucket counts as a dense list starting at index `o`"""
+        data = {"a": self.relative_accuracy, "n": self.count, "z": self.zero, "sum": round(self.sum, 1),
+                "min": self.min, "max": self.max}
+        if self.bins:
+            low, high = min(self.bins), max(self.bins)
+            data["o"] = low
+            data["c"] = [self.bins.get(index, 0) for index in range(low, high + 1)]
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'DDSketch':
+        sketch = cls(data.get("a", SKETCH_ACCURACY))
+        sketch.count = data.get("n", 0)
+        sketch.zero = data.get("z", 0)
+        sketch.sum = data.get("sum", 0.0)
+        sketch.min = data.get("min")
+        sketch.max = data.get("max")
+        offset = data.get("o", 0)
+        sketch.bins = {offset + i: count for i, count in enumerate(data.get("c", [])) if count}
+        return sketch
+
+
+class SketchSet:
+    """One sketch for the whole run plus one per host and per locale"""
+
+    def __init__(self):
+        self.run = DDSketch()
+        self.hosts = {}
+        self.locales = {}
+
+    def add(self, host: str, locale: str, latency: float) -> None:
+        self.run.add(latency)
+        self.hosts.setdefault(host, DDSketch()).add(latency)
+        self.locales.setdefault(locale, DDSketch()).add(latency)
+
+    def merge(self, other: 'SketchSet') -> None:
+        """Merge sketches collected by another worker or run"""
+        self.run.merge(other.run)
+        for mine, theirs in ((self.hosts, other.hosts), (self.locales, other.locales)):
+            for key, sketch in theirs.items():
+                mine.setdefault(key, DDSketch()).merge(sketch)
+
+    def to_dict(self) -> Dict:
+        return {
+            "run": self.run.to_dict(),
+            "hosts": {host: sketch.to_dict() for host, sketch in self.hosts.items()},
+            "locales": {locale: sketch.to_dict() for locale, sketch in self.locales.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'SketchSet':
+        sketches = cls()
+        sketches.run = DDSketch.from_dict(data.get("run") or {})
+        sketches.hosts = {host: DDSketch.from_dict(d) for host, d in (data.get("hosts") or {}).items()}
+        sketches.locales = {locale: DDSketch.from_dict(d) for locale, d in (data.get("locales") or {}).items()}
+        return sketches
+
+
+def merge_sketch_sets(entries: Iterable[Dict]) -> SketchSet:
+    """Merge persisted per-run sketch sets, e.g. every run in a time window"""
+    merged = SketchSet()
+    for entry in entries:
+        merged.merge(SketchSet.from_dict(entry))
+    return merged
@@ -0,0 +1,374 @@
+#!/usr/bin/env python3
+"""
+Link & Metadata Extraction
+Pluggable HTML extractors: an event-based html.parser backend that never builds a DOM,
+and the original BeautifulSoup path as reference
+"""
+
+import os
+from html.entities import html5
+from html.parser import HTMLParser
+from typing import Dict, List, Optional
+from urllib.parse import urljoin
+
+# Backend used when none is passed; override with the LINK_EXTRACTOR env variable
+EXTRACTOR_BACKEND = os.getenv('LINK_EXTRACTOR', 'stream')
+
+OG_KEYS = ['og:title', 'og:description', 'og:image', 'og:type']
+SCHEMA_TYPE = 'application/ld+json'
+
+# Tree-building rules of BeautifulSoup's html.parser builder, mirrored by the streaming backend
+VOID_ELEMENTS = frozenset([
+    'area', 'base', 'basefont', 'bgsound', 'br', 'col', 'command', 'embed', 'frame', 'hr', 'image', 'img',
+    'input', 'isindex', 'keygen', 'link', 'menuitem', 'meta', 'nextid', 'param', 'source', 'spacer', 'track', 'wbr'
+])
+# Text inside these is not part of a link's visible text
+STRING_CONTAINERS = frozenset(['rt', 'rp', 'style', 'script', 'template'])
+PRESERVE_WHITESPACE = frozenset(['pre', 'textarea'])
+ASCII_SPACES = '\x20\x0a\x09\x0c\x0d'
+
+
+def _collapse_blank(text: str) -> str:
+    """Whitespace-only strings collapse to a single space or newline"""
+    if text.strip(ASCII_SPACES):
+        return text
+    return '\n' if '\n' in text else ' '
+
+
+def _numeric_reference(name: str) -> List[str]:
+    """Decode a numeric character reference the way the BeautifulSoup builder does"""
+    base, digits = (16, '0123456789abcdef') if name[:1] in ('x', 'X') else (10, '0123456789')
+    number = name[1:] if base == 16 else name
+    try:
+        value = int(number, base)
+        extra = ''
+    except ValueError:
+        prefix = len(number) - len(number.lstrip(digits))
+        if not prefix:
+            return ['', number]
+        value, extra = int(number[:prefix], base), number[prefix:]
+
+    if value == 0 or value > 0x10ffff or 0xd800 <= value <= 0xdfff:
+        return ['�', extra]
+    if 0x80 <= value <= 0x9f:
+        try:
+            return [bytes([value]).decode('cp1252'), extra]
+        except UnicodeDecodeError:
+            pass
+    return [chr(value), extra]
+
+
+def _dedupe_links(anchors, base_url: str) -> List[Dict]:
+    """Absolute http(s) links with visible text, unique by (url, text), in document order"""
+    links = {}
+    for href, text in anchors:
+        full_url = urljoin(base_url, href)
+        if not full_url.startswith(('http://', 'https://')):
+            continue
+        # Only include links with visible text
+        if text:
+            links.setdefault((full_url, text), None)
+    return [{"url": url, "text": text} for url, text in links]
+
+
+def _alternates(links, base_url: str) -> Dict[str, str]:
+    """hreflang -> absolute URL from (rel, hreflang, href) triples; the first declaration wins"""
+    alternates = {}
+    for rel, hreflang, href in links:
+        if 'alternate' not in rel.lower().split() or not hreflang or href is None:
+            continue
+        full_url = urljoin(base_url, href.strip())
+        if full_url.startswith(('http://', 'https://')):
+            alternates.setdefault(hreflang.strip().lower(), full_url)
+    return alternates
+
+
+def _metadata(title, meta: Dict, open_graph: Dict, has_schema: bool) -> Dict:
+    return {
+        'title': title,
+        'meta': meta,
+        'openGraph': {key: open_graph.get(key) for key in OG_KEYS},
+        'hasSchemaOrg': has_schema
+    }
+
+
+class StreamingExtractor(HTMLParser):
+    """
+    Event-based extractor
+    Keeps only a stack of open tag names, so memory stays flat however large the page.
+    Mirrors BeautifulSoup's html.parser tree rules (void elements, string splitting,
+    pop-to-matching-tag) so results are identical without building the tree.
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.stack = []          # [tag, anchor, title node] per open element
+        self.open_anchors = []
+        self.pending = []
+        self.containers = 0
+        self.preserve = 0
+        self.closed_void = []
+        self.anchors = []        # [href, [stripped strings]] in document order
+        self.link_tags = []      # (rel, hreflang, href) of <link> tags declaring an hreflang
+        self.title_node = None
+        self.meta = {}
+        self.open_graph = {}
+        self.has_schema = False
+
+    def _end_data(self, kind: str = 'text') -> None:
+        """Close the current string, like BeautifulSoup's endData"""
+        if not self.pending:
+            return
+        data = ''.join(self.pending)
+        self.pending = []
+        if not self.preserve:
+            data = _collapse_blank(data)
+
+        if kind == 'cdata' or (kind == 'text' and not self.containers):
+            stripped = data.strip()
+            if stripped:
+                for anchor in self.open_anchors:
+                    anchor[1].append(stripped)
+
+        node = self.stack[-1][2] if self.stack else None
+        if node is not None:
+            node.append(data)
+
+    def _start(self, tag: str, attrs, close_void: bool) -> None:
+        self._end_data()
+        values = {key: '' if value is None else value for key, value in attrs}
+
+        anchor = None
+        if tag == 'a' and 'href' in values:
+            anchor = [values['href'], []]
+            self.anchors.append(anchor)
+            self.open_anchors.append(anchor)
+        elif tag == 'meta':
+            name = values.get('name') or values.get('property')
+            if name and values.get('content'):
+                self.meta[name] = values['content']
+            prop = values.get('property')
+            if prop in OG_KEYS and prop not in self.open_graph:
+                self.open_graph[prop] = values.get('content')
+        elif tag == 'script' and values.get('type') == SCHEMA_TYPE:
+            self.has_schema = True
+        elif tag == 'link' and values.get('hreflang'):
+            self.link_tags.append((values.get('rel', ''), values['hreflang'], values.get('href')))
+
+        # Only the first <title> subtree is kept, for BeautifulSoup's .string rule
+        node = None
+        parent = self.stack[-1][2] if self.stack else None
+        if parent is not None:
+            node = []
+            parent.append(node)
+        elif tag == 'title' and self.title_node is None:
+            node = self.title_node = []
+
+        self.stack.append([tag, anchor, node])
+        self.containers += tag in STRING_CONTAINERS
+        self.preserve += tag in PRESERVE_WHITESPACE
+
+        if close_void and tag in VOID_ELEMENTS:
+            self._end_tag(tag)
+            self.closed_void.append(tag)
+
+    def _end_tag(self, tag: str) -> None:
+        self._end_data()
+        for index in range(len(self.stack) - 1, -1, -1):
+            if self.stack[index][0] == tag:
+                break
+        else:
+            return
+        while len(self.stack) > index:
+            name, anchor, _ = self.stack.pop()
+            self.containers -= name in STRING_CONTAINERS
+            self.preserve -= name in PRESERVE_WHITESPACE
+            if anchor is not None:
+                self.open_anchors.remove(anchor)
+
+    def handle_starttag(self, tag, attrs):
+        self._start(tag, attrs, close_void=True)
+
+    def handle_startendtag(self, tag, attrs):
+        self._start(tag, attrs, close_void=False)
+        self._end_tag(tag)
+
+    def handle_endtag(self, tag):
+        if tag in self.closed_void:
+            self.closed_void.remove(tag)
+        else:
+            self._end_tag(tag)
+
+    def handle_data(self, data):
+        self.pending.append(data)
+
+    def handle_charref(self, name):
+        self.pending.extend(_numeric_reference(name))
+
+    def handle_entityref(self, name):
+        character = html5.get(name + ';')
+        self.pending.append(character if character is not None else '&' + name)
+
+    def _special(self, data: str, kind: str) -> None:
+        self._end_data()
+        self.pending.append(data)
+        self._end_data(kind)
+
+    def handle_comment(self, data):
+        self._special(data, 'comment')
+
+    def handle_decl(self, decl):
+        self._special(decl[len('DOCTYPE '):], 'doctype')
+
+    def unknown_decl(self, data):
+        if data.upper().startswith('CDATA['):
+            self._special(data[len('CDATA['):], 'cdata')
+        else:
+            self._special(data, 'declaration')
+
+    def handle_pi(self, data):
+        self._special(data, 'pi')
+
+    def close(self):
+        super().close()
+        self._end_data()
+
+    @property
+    def title(self) -> Optional[str]:
+        """Single string inside the first <title>, recursing through lone child tags"""
+        node = self.title_node
+        while node is not None:
+            if len(node) != 1:
+                return None
+            node = node[0]
+            if isinstance(node, str):
+                return node
+        return None
+
+    def link_pairs(self):
+        return [(href, ''.join(parts)) for href, parts in self.anchors]
+
+
+def _stream_parse(html: str) -> StreamingExtractor:
+    extractor = StreamingExtractor()
+    extractor.feed(html)
+    extractor.close()
+    return extractor
+
+
+def _stream_links(html: str, base_url: str) -> List[Dict]:
+    return _dedupe_links(_stream_parse(html).link_pairs(), base_url)
+
+
+def _stream_metadata(html: str) -> Dict:
+    extractor = _stream_parse(html)
+    return _metadata(extractor.title, extractor.meta, extractor.open_graph, extractor.has_schema)
+
+
+def _stream_alternates(html: str, base_url: str) -> Dict[str, str]:
+    return _alternates(_stream_parse(html).link_tags, base_url)
+
+
+def _stream_page(html: str, base_url: str) -> Dict:
+    # Links, alternates and metadata from a single pass
+    extractor = _stream_parse(html)
+    return {"links": _dedupe_links(extractor.link_pairs(), base_url),
+            "alternates": _alternates(extractor.link_tags, base_url),
+            "metadata": _metadata(extractor.title, extractor.meta, extractor.open_graph, extractor.has_schema)}
+
+
+# BeautifulSoup reference implementation (the original crawler / advanced checker code)
+
+def _bs4_links(html: str, base_url: str) -> List[Dict]:
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+    return _dedupe_links(((a['href'], a.get_text(strip=True)) for a in soup.find_all('a', href=True)), base_url)
+
+
+def _bs4_alternates(html: str, base_url: str) -> Dict[str, str]:
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+    return _alternates(((' '.join(tag.get('rel') or []), tag['hreflang'], tag.get('href'))
+                        for tag in soup.find_all('link', hreflang=True)), base_url)
+
+
+def _bs4_metadata(html: str) -> Dict:
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html, 'html.parser')
+
+    meta = {}
+    for tag in soup.find_all('meta'):
+        name = tag.get('name') or tag.get('property')
+        content = tag.get('content')
+        if name and content:
+            meta[name] = content
+
+    open_graph = {}
+    for og_key in OG_KEYS:
+        og_tag = soup.find('meta', property=og_key)
+        if og_tag:
+            open_graph[og_key] = og_tag.get('content')
+
+    title = soup.title.string if soup.title else None
+    has_schema = soup.find('script', type=SCHEMA_TYPE) is not None
+    return _metadata(str(title) if title is not None else None, meta, open_graph, has_schema)
+
+
+BACKENDS = {
+    'stream': (_stream_links, _stream_metadata, _stream_alternates),
+    'bs4': (_bs4_links, _bs4_metadata, _bs4_alternates),
+}
+OPTIONAL_MODULES = {'bs4': 'bs4'}
+
+
+def available_backends() -> List[str]:
+    """Backends whose libraries are installed"""
+    names = []
+    for name in BACKENDS:
+        try:
+            if name in OPTIONAL_MODULES:
+                __import__(OPTIONAL_MODULES[name])
+            names.append(name)
+        except ImportError:
+            pass
+    return names
+
+
+_resolved = {}
+
+
+def _backend(name: Optional[str]):
+    name = name or EXTRACTOR_BACKEND
+    if name not in _resolved:
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown extractor backend: {name} (choose from {', '.join(BACKENDS)})")
+        if name in available_backends():
+            _resolved[name] = BACKENDS[name]
+        else:
+            print(f"⚠️ Extractor backend '{name}' is not installed, using 'stream'")
+            _resolved[name] = BACKENDS['stream']
+    return _resolved[name]
+
+
+def extract_links(html: str, base_url: str, backend: Optional[str] = None) -> List[Dict]:
+    """Absolute links with visible text as [{"url", "text"}], unique and in document order"""
+    return _backend(backend)[0](html, base_url)
+
+
+def extract_metadata(html: str, backend: Optional[str] = None) -> Dict:
+    """Title, meta tags, Open Graph tags and schema.org presence"""
+    return _backend(backend)[1](html)
+
+
+def extract_alternates(html: str, base_url: str, backend: Optional[str] = None) -> Dict[str, str]:
+    """Locale variants declared with <link rel="alternate" hreflang>, as {hreflang: url}"""
+    return _backend(backend)[2](html, base_url)
+
+
+def extract_page(html: str, base_url: str, backend: Optional[str] = None) -> Dict:
+    """Links, hreflang alternates and metadata of a page as {"links", "alternates", "metadata"}"""
+    functions = _backend(backend)
+    if functions is BACKENDS['stream']:
+        return _stream_page(html, base_url)
+    return {"links": functions[0](html, base_url), "alternates": functions[2](html, base_url),
+            "metadata": functions[1](html)}
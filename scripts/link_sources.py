@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Link Source Index
+Every (source page, anchor text) pair that points at a link, with pages and texts interned,
+plus the original spelling a page used wherever it differs from the canonical URL
+"""
+
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+
+LINK_SOURCES = "registry/link_sources.json"
+
+
+class LinkSourceIndex:
+    """
+    Links -> sources adjacency index
+    Source pages and anchor texts are stored once and referenced by id, and each
+    link keeps a flat [sourceId, textId, sourceId, textId, ...] list.
+    Links are keyed by canonical URL; spellings keep [sourceId, href] for pages that wrote it differently
+    """
+
+    def __init__(self, index_file: str = LINK_SOURCES, load: bool = True):
+        self.index_file = index_file
+        data = self._load() if load else {}
+        self.sources = data.get("sources", [])
+        self.texts = data.get("texts", [])
+        self.links = data.get("links", {})
+        self.spellings = data.get("spellings", {})
+        self.source_ids = {source: i for i, source in enumerate(self.sources)}
+        self.text_ids = {text: i for i, text in enumerate(self.texts)}
+        # Pairs already recorded, including loaded ones, so re-adding them is a no-op
+        self.pairs = {(url, flat[i], flat[i + 1]) for url, flat in self.links.items() for i in range(0, len(flat), 2)}
+        self.spelled = {(url, source_id, href) for url, entries in self.spellings.items() for source_id, href in entries}
+
+    def _load(self) -> Dict:
+        """Load the index from JSON"""
+        if os.path.exists(self.index_file):
+            try:
+                with open(self.index_file, 'r') as f:
+                    return json.load(f)
+            except:
+                pass
+        return {}
+
+    @staticmethod
+    def _intern(values: List[str], ids: Dict[str, int], value: str) -> int:
+        if value not in ids:
+            ids[value] = len(values)
+            values.append(value)
+        return ids[value]
+
+    def add(self, url: str, source: str, text: str, href: Optional[str] = None) -> None:
+        """Record that source links to url with the given anchor text, written as href on the page"""
+        source_id = self._intern(self.sources, self.source_ids, source)
+        text_id = self._intern(self.texts, self.text_ids, text)
+        if href and href != url and (url, source_id, href) not in self.spelled:
+            self.spelled.add((url, source_id, href))
+            self.spellings.setdefault(url, []).append([source_id, href])
+        if (url, source_id, text_id) in self.pairs:
+            return
+        self.pairs.add((url, source_id, text_id))
+        self.links.setdefault(url, []).extend((source_id, text_id))
+
+    def referrers(self, url: str) -> List[Tuple[str, str]]:
+        """All (source page, anchor text) pairs pointing at url"""
+        flat = self.links.get(url, [])
+        return [(self.sources[flat[i]], self.texts[flat[i + 1]]) for i in range(0, len(flat), 2)]
+
+    def spellings_of(self, url: str) -> List[Tuple[str, str]]:
+        """(source page, href) for every page that spelled url differently"""
+        return [(self.sources[source_id], href) for source_id, href in self.spellings.get(url, [])]
+
+    def source_count(self, url: str) -> int:
+        """Number of distinct pages linking to url"""
+        return len(set(self.links.get(url, [])[::2]))
+
+    def __len__(self) -> int:
+        return len(self.links)
+
+    def save(self) -> None:
+        """Write the index to disk"""
+        os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
+        tmp_path = self.index_file + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"sources": self.sources, "texts": self.texts, "links": self.links, "spellings": self.spellings},
+                      f, separators=(',', ':'))
+        os.replace(tmp_path, self.index_file)
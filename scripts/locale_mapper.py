@@ -1,12 +1,86 @@
+import argparse
 import json
 import csv
 import os
+from urllib.parse import urlparse
 
 INPUT_CSV = "live_urls.csv"
 LOCALES_JSON = "registry/locales.json"
 OUTPUT_JSON = "registry/locale_map.json"
+# Written by crawler.py: hreflang alternates from the sitemaps and from each crawled page's <link> tags
+SITEMAP_PAGES = "registry/sitemap_pages.json"
+PAGE_ALTERNATES = "registry/page_alternates.json"
+# "alternates": declared alternate URL -> [[declaring page, hreflang], ...], so the checker can report broken ones
+# "unmapped": hreflang -> [[declaring page, url], ...] for alternates in locales missing from locales.json
+DECLARED_ALTERNATES = "registry/declared_alternates.json"
 
-def main():
+def load_json(path, default):
+    if os.path.exists(path):
+        try:
+            with open(path, 'r') as f:
+                return json.load(f)
+        except:
+            pass
+    return default
+
+def load_declared_alternates():
+    """page -> {hreflang: url}, from crawled pages first and then the sitemaps"""
+    declared = {}
+    for page, alternates in load_json(PAGE_ALTERNATES, {}).items():
+        declared[page] = dict(alternates)
+    for page, entry in load_json(SITEMAP_PAGES, {}).items():
+        merged = declared.setdefault(page, {})
+        for hreflang, url in (entry.get("alternates") or {}).items():
+            merged.setdefault(hreflang, url)
+    return declared
+
+def declared_alternate(alternates, prefix):
+    """The alternate for a locale prefix such as /fr-fr, matched by hreflang code or by its language and URL"""
+    code = prefix.strip('/').lower()
+    if code in alternates:
+        return code, alternates[code]
+    language = code.split('-')[0]
+    candidate = alternates.get(language)
+    if candidate and (urlparse(candidate).path + '/').startswith(prefix.rstrip('/') + '/'):
+        return language, candidate
+    return None, None
+
+def hreflang_locale_map(locales, declared):
+    """
+    Locale variants exactly as the site declares them
+    Returns the locale map, for each alternate the English pages and hreflang codes declaring it,
+    and the declared alternates no known locale claimed, by hreflang
+    """
+    prefixes = tuple(locale['href'].rstrip('/') + '/' for locale in locales if locale.get('href'))
+    english = {url: alternates for url, alternates in declared.items()
+               if not (urlparse(url).path + '/').startswith(prefixes)}
+
+    locale_map = {}
+    declared_by = {}
+    claimed = set()
+    for locale in locales:
+        locale_urls = []
+        for page, alternates in english.items():
+            hreflang, alternate = declared_alternate(alternates, locale['href'])
+            if not alternate:
+                continue
+            if alternate not in declared_by:
+                locale_urls.append(alternate)
+                declared_by[alternate] = []
+            declared_by[alternate].append([page, hreflang])
+            claimed.add((page, hreflang))
+        locale_map[locale['text']] = locale_urls
+
+    # A locale the site added but locales.json lacks would otherwise vanish without a trace
+    unmapped = {}
+    for page, alternates in english.items():
+        for hreflang, alternate in alternates.items():
+            if hreflang == 'x-default' or alternate == page or (page, hreflang) in claimed:
+                continue
+            unmapped.setdefault(hreflang, []).append([page, alternate])
+    return locale_map, declared_by, unmapped
+
+def main(use_hreflang=False):
     if not os.path.exists(LOCALES_JSON):
         print("❌ Locales file not found.")
         return
@@ -14,6 +88,26 @@ def main():
     with open(LOCALES_JSON, 'r') as f:
         locales = json.load(f)
 
+    if use_hreflang:
+        declared = load_declared_alternates()
+        if any(declared.values()):
+            locale_map, declared_by, unmapped = hreflang_locale_map(locales, declared)
+            with open(OUTPUT_JSON, 'w', encoding='utf-8') as f:
+                json.dump(locale_map, f, indent=2)
+            with open(DECLARED_ALTERNATES, 'w', encoding='utf-8') as f:
+                json.dump({"alternates": declared_by, "unmapped": unmapped}, f, indent=2)
+            print(f"✅ Locale map generated for {len(locale_map)} locales from {len(declared_by)} declared hreflang alternates "
+                  f"on {len(declared)} pages.")
+            if unmapped:
+                print(f"⚠️ {sum(len(pairs) for pairs in unmapped.values())} declared alternates are in locales missing "
+                      f"from {LOCALES_JSON}: " + ", ".join(f"{code} ({len(pairs)})" for code, pairs in sorted(unmapped.items())))
+            return
+        print(f"⚠️ No hreflang alternates in {PAGE_ALTERNATES} or {SITEMAP_PAGES}, falling back to {INPUT_CSV}")
+
+    # The prefixed URLs below are guesses, not declarations
+    if os.path.exists(DECLARED_ALTERNATES):
+        os.remove(DECLARED_ALTERNATES)
+
     urls = []
     with open(INPUT_CSV, newline='', encoding="utf-8") as f:
         reader = csv.reader(f)
@@ -46,4 +140,7 @@ def main():
     print(f"✅ Locale map generated for {len(locale_map)} locales.")
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="Build the locale URL map")
+    parser.add_argument("--hreflang", action="store_true", help=f"Use the hreflang alternates the site declares instead of prefixing every URL in {INPUT_CSV}")
+    args = parser.parse_args()
+    main(args.hreflang)
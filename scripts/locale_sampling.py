@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Locale Template Sampling
+Locale variants of a page share one template, so each run checks a rotating sample
+per page and escalates to the whole group when the sample fails or the page changed
+"""
+
+import json
+import math
+import os
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+SAMPLING_FILE = "data/locale_sampling.json"
+# Share of each group checked per run; 1.0 checks every variant
+DEFAULT_SAMPLE_RATE = 0.25
+
+
+class LocaleSampler:
+    """
+    Groups locale URLs by the page they translate and picks a sample per group
+    The sample window rotates through the group, so every variant is still checked
+    at least once every ceil(1 / rate) runs
+    """
+
+    def __init__(self, prefixes: Iterable[str], sample_rate: float = DEFAULT_SAMPLE_RATE,
+                 state_file: str = SAMPLING_FILE):
+        self.prefixes = sorted((p.rstrip('/') for p in prefixes if p), key=len, reverse=True)
+        self.sample_rate = sample_rate
+        self.state_file = state_file
+        self.state = self._load()
+        self.sampled = {}
+        self.deferred = {}
+        self.held = 0
+        self.changed = 0
+
+    def _load(self) -> Dict:
+        """Load rotation state from JSON"""
+        if os.path.exists(self.state_file):
+            try:
+                with open(self.state_file, 'r') as f:
+                    return json.load(f)
+            except:
+                pass
+        return {}
+
+    def template_key(self, url: str) -> Tuple[str, bool]:
+        """(host + path without the locale prefix, whether a prefix was removed)"""
+        parts = urlsplit(url)
+        host = (parts.hostname or '').lower()
+        path = parts.path or '/'
+        for prefix in self.prefixes:
+            if path == prefix or path.startswith(prefix + '/'):
+                return host + (path[len(prefix):] or '/'), True
+        return host + path, False
+
+    def page_hashes(self, crawl_state: Dict) -> Dict[str, str]:
+        """Content hash of each crawled English page, by template key"""
+        hashes = {}
+        for url, entry in crawl_state.items():
+            key, localized = self.template_key(url)
+            if not localized and entry.get("hash"):
+                hashes[key] = entry["hash"]
+        return hashes
+
+    def plan(self, tasks: List[Dict], due_tasks: List[Dict], must_check: Callable[[str], bool],
+             page_hashes: Optional[Dict[str, str]] = None) -> List[Dict]:
+        """
+        Due tasks to check now, in their original order
+        The window rotates over each group's full membership (all registered tasks) and is
+        then intersected with the due set, so a group's rotation doesn't shift as the due set changes.
+        Group members not checked now are held back per group for escalate()
+        """
+        page_hashes = page_hashes or {}
+        groups = {}
+        for task in tasks:
+            key, localized = self.template_key(task["url"])
+            if localized:
+                groups.setdefault(key, []).append(task)
+
+        due = {t["url"] for t in due_tasks}
+        picked = set()
+        for key, members in groups.items():
+            members.sort(key=lambda t: t["url"])
+            entry = self.state.setdefault(key, {"cursor": 0})
+            page_hash = page_hashes.get(key)
+            changed = bool(page_hash and entry.get("hash") and entry["hash"] != page_hash)
+            if page_hash:
+                entry["hash"] = page_hash
+
+            size = len(members)
+            count = size if changed else min(size, max(1, math.ceil(size * self.sample_rate)))
+            start = entry["cursor"] % size
+            window = {(start + i) % size for i in range(count)}
+            entry["cursor"] = (start + count) % size
+            self.changed += changed
+
+            self.sampled[key] = {t["url"] for i, t in enumerate(members)
+                                 if t["url"] in due and (i in window or must_check(t["url"]))}
+            self.deferred[key] = [t for t in members if t["url"] not in self.sampled[key]]
+            self.held += sum(1 for t in self.deferred[key] if t["url"] in due)
+            picked.update(self.sampled[key])
+
+        grouped = {t["url"] for members in groups.values() for t in members}
+        return [t for t in due_tasks if t["url"] not in grouped or t["url"] in picked]
+
+    def escalate(self, new_failures) -> List[Dict]:
+        """
+        Held-back variants of every group whose sample had a new failure
+        Pass only URLs that were healthy before this run: known-broken variants are always
+        in the sample and would otherwise escalate their group on every run
+        """
+        new_failures = set(new_failures)
+        return [t for key, sampled in self.sampled.items() if sampled & new_failures
+                for t in self.deferred[key]]
+
+    def held_back(self) -> int:
+        """Due variants left out of this run's samples"""
+        return self.held
+
+    def prune(self, urls) -> None:
+        """Drop rotation state for pages that no longer have locale variants"""
+        keep = {self.template_key(url)[0] for url in urls}
+        self.state = {key: entry for key, entry in self.state.items() if key in keep}
+
+    def save(self) -> None:
+        """Write rotation state to disk"""
+        os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+        with open(self.state_file, 'w', encoding='utf-8') as f:
+            json.dump(self.state, f, indent=2)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Request Phase Timing
+aiohttp trace hooks that split each check into DNS, connect, TTFB and total time,
+kept per host as fixed-bucket histograms
+"""
+
+import bisect
+import json
+import os
+import time
+from typing import Dict, List, Optional
+
+import aiohttp
+
+from host_limiter import host_of
+
+RESPONSE_TIMES_FILE = "data/response_times.json"
+# aiohttp signals no separate TLS event: for https "connect" is the TCP plus TLS handshake
+TIMING_PHASES = ("dns", "connect", "ttfb", "total")
+# Bucket upper bounds in ms; the 1s/3s/5s edges let the dashboard buckets be derived exactly
+TIMING_BUCKETS_MS = [25, 50, 100, 250, 500, 1000, 2000, 3000, 5000, 10000, 30000]
+
+
+def _add(timing: Dict, phase: str, seconds: float) -> None:
+    timing[phase] = timing.get(phase, 0.0) + seconds * 1000
+
+
+async def _on_request_start(session, context, params):
+    context.dns = 0.0
+
+
+async def _on_dns_start(session, context, params):
+    context.dns_start = time.perf_counter()
+
+
+async def _on_dns_end(session, context, params):
+    context.dns = time.perf_counter() - context.dns_start
+    if context.trace_request_ctx is not None:
+        _add(context.trace_request_ctx, "dns", context.dns)
+
+
+async def _on_connection_start(session, context, params):
+    context.connect_start = time.perf_counter()
+
+
+async def _on_connection_end(session, context, params):
+    # Name resolution happens inside connection creation
+    if context.trace_request_ctx is not None:
+        _add(context.trace_request_ctx, "connect", time.perf_counter() - context.connect_start - context.dns)
+
+
+async def _on_headers_sent(session, context, params):
+    context.sent = time.perf_counter()
+
+
+async def _on_request_end(session, context, params):
+    # Request sent to response headers received: the server's (or CDN's) share
+    if context.trace_request_ctx is not None and hasattr(context, 'sent'):
+        _add(context.trace_request_ctx, "ttfb", time.perf_counter() - context.sent)
+
+
+def timing_trace_config() -> aiohttp.TraceConfig:
+    """
+    Trace config that adds phase times in ms to the dict passed as trace_request_ctx
+    Redirect hops and GET fallbacks of one check add up in the same dict
+    """
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(_on_request_start)
+    trace_config.on_dns_resolvehost_start.append(_on_dns_start)
+    trace_config.on_dns_resolvehost_end.append(_on_dns_end)
+    trace_config.on_connection_create_start.append(_on_connection_start)
+    trace_config.on_connection_create_end.append(_on_connection_end)
+    trace_config.on_request_headers_sent.append(_on_headers_sent)
+    trace_config.on_request_end.append(_on_request_end)
+    return trace_config
+
+
+def bucket_index(ms: float) -> int:
+    """Histogram slot for a duration; the last slot is everything above the largest bound"""
+    return bisect.bisect_right(TIMING_BUCKETS_MS, ms)
+
+
+class TimingHistograms:
+    """
+    Per-host, per-phase histograms over TIMING_BUCKETS_MS
+    Each phase keeps its bucket counts plus the summed time, so means stay exact
+    """
+
+    def __init__(self, hosts: Optional[Dict] = None):
+        self.hosts = hosts or {}
+
+    def add(self, host: str, timing: Dict[str, float]) -> None:
+        """Count one check's phase times for a host"""
+        phases = self.hosts.setdefault(host, {})
+        for phase, ms in timing.items():
+            stats = phases.get(phase)
+            if stats is None:
+                stats = phases[phase] = {"sum": 0, "counts": [0] * (len(TIMING_BUCKETS_MS) + 1)}
+            stats["counts"][bucket_index(ms)] += 1
+            stats["sum"] += ms
+
+    def add_url(self, url: str, timing: Dict[str, float]) -> None:
+        self.add(host_of(url), timing)
+
+    def merge(self, other: 'TimingHistograms') -> None:
+        """Merge histograms collected by another worker"""
+        for host, phases in other.hosts.items():
+            mine = self.hosts.setdefault(host, {})
+            for phase, stats in phases.items():
+                if phase not in mine:
+                    mine[phase] = {"sum": stats["sum"], "counts": list(stats["counts"])}
+                    continue
+                mine[phase]["sum"] += stats["sum"]
+                mine[phase]["counts"] = [a + b for a, b in zip(mine[phase]["counts"], stats["counts"])]
+
+    def combined(self, phase: str) -> Dict:
+        """One phase summed over every host"""
+        total = {"sum": 0, "counts": [0] * (len(TIMING_BUCKETS_MS) + 1)}
+        for phases in self.hosts.values():
+            stats = phases.get(phase)
+            if stats:
+                total["sum"] += stats["sum"]
+                total["counts"] = [a + b for a, b in zip(total["counts"], stats["counts"])]
+        return total
+
+    def save(self, path: str = RESPONSE_TIMES_FILE) -> None:
+        """Write the histograms compactly, rounding sums to whole ms"""
+        for phases in self.hosts.values():
+            for stats in phases.values():
+                stats["sum"] = round(stats["sum"])
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"bucketsMs": TIMING_BUCKETS_MS, "hosts": self.hosts}, f, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path: str = RESPONSE_TIMES_FILE) -> 'TimingHistograms':
+        """Histograms from disk, empty if missing or written with other buckets"""
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    data = json.load(f)
+                if data.get("bucketsMs") == TIMING_BUCKETS_MS:
+                    return cls(data.get("hosts") or {})
+            except:
+                pass
+        return cls()
+
+
+def histogram_share(counts: List[int], above_ms: float) -> float:
+    """Share of samples in buckets at or above a bucket bound"""
+    total = sum(counts)
+    if not total:
+        return 0.0
+    return sum(counts[bucket_index(above_ms):]) / total
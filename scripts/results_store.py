@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+"""
+Results Store
+Compact summary JSON plus dictionary-encoded, pre-paginated broken link shards
+"""
+
+import json
+import os
+import shutil
+from typing import Dict, Iterable, Iterator, List, Optional
+
+RESULTS_JSON = "data/results.json"
+BROKEN_LINKS_DIR = "broken_links"  # Relative to the results file
+PAGE_SIZE = 500
+
+# Low-cardinality fields stored once per page and referenced by index
+DICTIONARY_FIELDS = ["locale", "statusCode", "errorType", "errorMessage", "source", "text"]
+# Lists of [source page, anchor text] pairs (or [page, href] spellings), stored as flat index lists
+# into per-page dictionaries
+PAIR_FIELDS = ["referrers", "declaredBy", "spellings"]
+
+
+def encode_page(links: List[Dict]) -> Dict:
+    """
+    Encode broken links column by column
+    Repeated strings are interned into per-page dictionaries; pair lists become
+    flat [first, second, first, second, ...] index lists
+    """
+    fields = []
+    for link in links:
+        for key in link:
+            if key not in fields:
+                fields.append(key)
+
+    dictionaries = {}
+    pair_dictionaries = {}
+    columns = {}
+    for field in fields:
+        values = [link.get(field) for link in links]
+        if field in DICTIONARY_FIELDS:
+            lookup = {}
+            for value in values:
+                key = json.dumps(value)
+                if key not in lookup:
+                    lookup[key] = len(lookup)
+            dictionaries[field] = [json.loads(key) for key in lookup]
+            columns[field] = [lookup[json.dumps(value)] for value in values]
+        elif field in PAIR_FIELDS:
+            firsts, seconds = {}, {}
+            column = []
+            for value in values:
+                if value is None:
+                    column.append(None)
+                    continue
+                flat = []
+                for first, second in value:
+                    flat.append(firsts.setdefault(first, len(firsts)))
+                    flat.append(seconds.setdefault(second, len(seconds)))
+                column.append(flat)
+            pair_dictionaries[field] = [list(firsts), list(seconds)]
+            columns[field] = column
+        else:
+            columns[field] = values
+
+    page = {"count": len(links), "fields": fields, "dictionaries": dictionaries, "columns": columns}
+    if pair_dictionaries:
+        page["pairDictionaries"] = pair_dictionaries
+    return page
+
+
+def decode_page(page: Dict) -> List[Dict]:
+    """Turn an encoded page back into broken link dicts"""
+    dictionaries = page.get("dictionaries", {})
+    pair_dictionaries = page.get("pairDictionaries", {})
+    columns = {}
+    for field in page["fields"]:
+        column = page["columns"][field]
+        if field in dictionaries:
+            lookup = dictionaries[field]
+            column = [lookup[i] for i in column]
+        elif field in pair_dictionaries:
+            firsts, seconds = pair_dictionaries[field]
+            column = [None if flat is None else
+                      [[firsts[flat[j]], seconds[flat[j + 1]]] for j in range(0, len(flat), 2)]
+                      for flat in column]
+        columns[field] = column
+
+    links = []
+    for i in range(page["count"]):
+        link = {}
+        for field in page["fields"]:
+            value = columns[field][i]
+            if value is not None:
+                link[field] = value
+        links.append(link)
+    return links
+
+
+def write_broken_link_pages(links: Iterable[Dict], results_file: str = RESULTS_JSON,
+                            page_size: int = PAGE_SIZE) -> Dict:
+    """
+    Stream broken links into page files next to the results file
+    Pages are built in a scratch directory and swapped in, so readers never mix runs
+    Returns the page index stored in the summary
+    """
+    base_dir = os.path.dirname(results_file) or '.'
+    target = os.path.join(base_dir, BROKEN_LINKS_DIR)
+    scratch = target + '.tmp'
+    shutil.rmtree(scratch, ignore_errors=True)
+    os.makedirs(scratch)
+
+    pages = []
+    count = 0
+    buffer = []
+
+    def flush():
+        name = f"page-{len(pages) + 1:04d}.json"
+        with open(os.path.join(scratch, name), 'w', encoding='utf-8') as f:
+            json.dump(encode_page(buffer), f, separators=(',', ':'))
+        pages.append(f"{BROKEN_LINKS_DIR}/{name}")
+        buffer.clear()
+
+    for link in links:
+        buffer.append(link)
+        count += 1
+        if len(buffer) >= page_size:
+            flush()
+    if buffer:
+        flush()
+
+    # Move the old pages aside before swapping in the new ones, and delete them only afterwards,
+    # so a crash or a concurrent reader always finds a complete set on disk
+    retired = target + '.old'
+    shutil.rmtree(retired, ignore_errors=True)
+    if os.path.exists(target):
+        os.replace(target, retired)
+    os.replace(scratch, target)
+    shutil.rmtree(retired, ignore_errors=True)
+    return {"count": count, "pageSize": page_size, "pages": pages}
+
+
+def load_summary(results_file: str = RESULTS_JSON) -> Optional[Dict]:
+    """Load the summary JSON, None if there is no results file yet"""
+    if not os.path.exists(results_file):
+        return None
+    with open(results_file, 'r') as f:
+        return json.load(f)
+
+
+def iter_broken_links(results_file: str = RESULTS_JSON, summary: Optional[Dict] = None) -> Iterator[Dict]:
+    """Stream broken links page by page; also reads the older inline brokenLinksList"""
+    summary = summary if summary is not None else load_summary(results_file)
+    if not summary:
+        return
+    if "brokenLinksList" in summary:
+        yield from summary["brokenLinksList"]
+        return
+
+    base_dir = os.path.dirname(results_file) or '.'
+    for page_path in summary.get("brokenLinksPages", {}).get("pages", []):
+        with open(os.path.join(base_dir, page_path), 'r') as f:
+            yield from decode_page(json.load(f))
+
+
+def load_results(results_file: str = RESULTS_JSON) -> Optional[Dict]:
+    """Load the summary with brokenLinksList filled in from the page files"""
+    summary = load_summary(results_file)
+    if summary is not None and "brokenLinksList" not in summary:
+        summary["brokenLinksList"] = list(iter_broken_links(results_file, summary))
+    return summary
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+Retry Policy
+Classifies failed checks, spaces retries with exponential backoff and jitter,
+and caps the retries each host may use in a run
+"""
+
+import asyncio
+import random
+import socket
+import ssl
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+import aiohttp
+
+from host_limiter import host_of
+
+# Per error class: retries allowed, backoff base and cap in seconds, and the timeout for retries
+RETRY_POLICIES = {
+    "timeout": {"retries": 1, "base_delay": 2.0, "max_delay": 20.0, "timeout": 30},
+    "reset": {"retries": 2, "base_delay": 0.5, "max_delay": 5.0},
+    "dns": {"retries": 1, "base_delay": 5.0, "max_delay": 10.0},
+    "connect": {"retries": 1, "base_delay": 1.0, "max_delay": 10.0},
+    # Retry-After is honoured separately by the host limiter
+    "throttled": {"retries": 2, "base_delay": 5.0, "max_delay": 60.0},
+    "server": {"retries": 1, "base_delay": 2.0, "max_delay": 15.0},
+}
+# Each host may retry this share of its URLs per run, but never fewer than RETRY_BUDGET_MIN times
+RETRY_BUDGET_RATIO = 0.1
+RETRY_BUDGET_MIN = 5
+
+
+def classify_exception(error: BaseException) -> Optional[str]:
+    """Error class of an exception raised while checking a URL, None when retrying cannot help"""
+    if isinstance(error, asyncio.TimeoutError):
+        return "timeout"
+    # Bad certificates, redirect loops and malformed URLs fail the same way every time
+    if isinstance(error, (aiohttp.ClientSSLError, ssl.SSLError, aiohttp.TooManyRedirects, aiohttp.InvalidURL)):
+        return None
+    if isinstance(error, aiohttp.ClientConnectorError):
+        cause = getattr(error, 'os_error', None)
+        if isinstance(error, getattr(aiohttp, 'ClientConnectorDNSError', ())) or isinstance(cause, socket.gaierror):
+            return "dns"
+        return "connect"
+    if isinstance(error, (aiohttp.ServerDisconnectedError, aiohttp.ClientOSError, ConnectionResetError,
+                          aiohttp.ClientPayloadError)):
+        return "reset"
+    return None
+
+
+def classify_link(link: Optional[Dict]) -> Optional[str]:
+    """Error class of a check result, None when it is healthy or not worth retrying"""
+    if link is None:
+        return None
+    status = link.get("statusCode")
+    if status == "Timeout":
+        return "timeout"
+    if status == "Error":
+        return link.get("errorClass")
+    if status == 429:
+        return "throttled"
+    if isinstance(status, int) and status >= 500:
+        return "server"
+    return None
+
+
+def retry_budgets(tasks: Iterable[Dict], budget_ratio: float = RETRY_BUDGET_RATIO,
+                  budget_min: int = RETRY_BUDGET_MIN) -> Dict[str, int]:
+    """Retries each host may spend in a run: a share of its URLs, never fewer than budget_min"""
+    counts = Counter(host_of(task["url"]) for task in tasks)
+    return {host: max(budget_min, int(count * budget_ratio)) for host, count in counts.items()}
+
+
+def split_budgets(budgets: Dict[str, int], chunks: List[List[Dict]]) -> List[Dict[str, int]]:
+    """
+    Divide each host's budget between the chunks holding its URLs, in proportion to their URL counts
+    A host split across workers then spends no more than its run-wide budget
+    """
+    counts = [Counter(host_of(task["url"]) for task in chunk) for chunk in chunks]
+    totals = sum(counts, Counter())
+    shares = [{host: budgets.get(host, 0) * count // totals[host] for host, count in chunk_counts.items()}
+              for chunk_counts in counts]
+    # Rounding leftovers go to the first chunks with the host
+    for host, total in totals.items():
+        left = budgets.get(host, 0) - sum(share.get(host, 0) for share in shares)
+        for share in shares:
+            if left <= 0:
+                break
+            if host in share:
+                share[host] += 1
+                left -= 1
+    return shares
+
+
+class RetryPolicy:
+    """
+    Decides whether and when a failed check is tried again
+    Every host gets a retry budget sized from its URL count, so one failing host
+    spends at most a fixed share of extra requests however many of its URLs fail.
+    Pass budgets to spend a share of a run-wide budget; what is left stays in self.budgets
+    """
+
+    def __init__(self, tasks: Iterable[Dict] = (), policies: Optional[Dict] = None,
+                 budget_ratio: float = RETRY_BUDGET_RATIO, budget_min: int = RETRY_BUDGET_MIN,
+                 budgets: Optional[Dict[str, int]] = None):
+        self.policies = policies or RETRY_POLICIES
+        self.budget_min = budget_min
+        self.budgets = dict(budgets) if budgets is not None else retry_budgets(tasks, budget_ratio, budget_min)
+        self.exhausted = set()
+
+    def should_retry(self, url: str, error_class: Optional[str], attempt: int) -> bool:
+        """Whether another attempt is allowed after `attempt` failed ones, spending budget if so"""
+        policy = self.policies.get(error_class)
+        if policy is None or attempt > policy["retries"]:
+            return False
+        host = host_of(url)
+        budget = self.budgets.get(host, self.budget_min)
+        if budget <= 0:
+            if host not in self.exhausted:
+                self.exhausted.add(host)
+                print(f"⚠️ Retry budget exhausted for {host}; further failures there are reported as-is")
+            return False
+        self.budgets[host] = budget - 1
+        return True
+
+    def delay(self, error_class: str, attempt: int) -> float:
+        """Full-jitter exponential backoff before retry number `attempt`"""
+        policy = self.policies[error_class]
+        return random.uniform(0, min(policy["max_delay"], policy["base_delay"] * 2 ** (attempt - 1)))
+
+    def timeout(self, error_class: Optional[str], default: float) -> float:
+        """Request timeout for a retry of the given class"""
+        return (self.policies.get(error_class) or {}).get("timeout", default)
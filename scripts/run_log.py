@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Streaming Run Log & Aggregates
+Appends each check outcome to an NDJSON log and keeps dashboard aggregates incrementally
+"""
+
+import glob
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, Optional
+
+from host_limiter import host_of
+from latency_sketch import SketchSet
+from request_timing import TimingHistograms
+
+RUNS_DIR = "data/runs"
+MANIFEST = "manifest.json"
+# Number of run logs kept on disk
+KEEP_RUNS = 5
+# Force the log to disk after this many records or seconds, whichever comes first
+CHECKPOINT_RECORDS = 200
+CHECKPOINT_SECONDS = 30
+
+RESPONSE_TIME_BUCKETS = [(1000, "<1s"), (3000, "1-3s"), (5000, "3-5s"), (None, ">5s")]
+
+
+def new_run_id() -> str:
+    """Create a sortable run identifier"""
+    return datetime.now().strftime('%Y%m%dT%H%M%S')
+
+
+def run_dir(run_id: str, runs_dir: str = RUNS_DIR) -> str:
+    """Directory holding the log parts of a run"""
+    return os.path.join(runs_dir, run_id)
+
+
+def latest_run(runs_dir: str = RUNS_DIR) -> Optional[str]:
+    """Most recent run id that has a manifest"""
+    if not os.path.isdir(runs_dir):
+        return None
+    runs = sorted(d for d in os.listdir(runs_dir) if os.path.exists(os.path.join(runs_dir, d, MANIFEST)))
+    return runs[-1] if runs else None
+
+
+def write_manifest(directory: str, manifest: Dict) -> None:
+    """Record how a run was started so it can be resumed the same way"""
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, MANIFEST), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+
+
+def read_manifest(directory: str) -> Optional[Dict]:
+    """Load a run's manifest, None if the run doesn't exist"""
+    path = os.path.join(directory, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def prune_runs(runs_dir: str = RUNS_DIR, keep: int = KEEP_RUNS) -> None:
+    """Delete all but the newest run logs"""
+    if not os.path.isdir(runs_dir):
+        return
+    runs = sorted(d for d in os.listdir(runs_dir) if os.path.isdir(os.path.join(runs_dir, d)))
+    for old in runs[:-keep]:
+        shutil.rmtree(os.path.join(runs_dir, old), ignore_errors=True)
+
+
+class RunLog:
+    """
+    Append-only NDJSON journal
+    Lines reach the OS as they are written and are fsynced at regular checkpoints
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.file = open(path, 'a', encoding='utf-8', buffering=1)
+        # A crash can leave a torn last line; never glue a new record onto it
+        if self.file.tell() and not self._ends_with_newline():
+            self.file.write('\n')
+        self.pending = 0
+        self.last_checkpoint = time.monotonic()
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, 'rb') as f:
+            f.seek(-1, os.SEEK_END)
+            return f.read(1) == b'\n'
+
+    def append(self, record: Dict) -> None:
+        """Write one record as a JSON line"""
+        self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.pending += 1
+        if self.pending >= CHECKPOINT_RECORDS or time.monotonic() - self.last_checkpoint >= CHECKPOINT_SECONDS:
+            self.checkpoint()
+
+    def checkpoint(self) -> None:
+        """Force everything written so far onto disk"""
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.pending = 0
+        self.last_checkpoint = time.monotonic()
+
+    def close(self) -> None:
+        self.checkpoint()
+        self.file.close()
+
+
+def read_records(directory: str) -> Iterator[Dict]:
+    """Stream records from every log part of a run, skipping a torn final line"""
+    for path in sorted(glob.glob(os.path.join(directory, '*.ndjson'))):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+
+def make_record(task: Dict, link: Optional[Dict], attempts: int = 1, timing: Optional[Dict] = None) -> Dict:
+    """Build the log record for a checked task; link is the broken-link entry or None"""
+    record = {"url": task["url"], "locale": task["locale"], "ok": link is None}
+    if attempts > 1:
+        record["attempts"] = attempts
+    # Phase times in whole ms of the final attempt, healthy or broken
+    if timing:
+        record["timing"] = {phase: round(ms) for phase, ms in timing.items()}
+    if link is not None:
+        # Every original spelling this canonical URL stands for
+        if task.get("aliases"):
+            link["aliases"] = task["aliases"]
+        # Pages whose hreflang tags declare this URL, as [page, hreflang] pairs
+        if task.get("declaredBy"):
+            link["declaredBy"] = task["declaredBy"]
+        record["link"] = link
+    return record
+
+
+class RunAggregates:
+    """Dashboard aggregates maintained as results stream in"""
+
+    def __init__(self):
+        self.total = 0
+        self.checked = 0
+        self.broken = 0
+        self.retries = 0
+        self.latency_total = 0.0
+        self.error_distribution = {}
+        self.locales = {}
+        self.response_times = {label: 0 for _, label in RESPONSE_TIME_BUCKETS}
+        self.timings = TimingHistograms()
+        # Quantile sketches of each check's total time for the run, per host and per locale
+        self.sketches = SketchSet()
+
+    def _locale(self, name: str) -> Dict:
+        if name not in self.locales:
+            self.locales[name] = {"total": 0, "broken": 0}
+        return self.locales[name]
+
+    def add_task(self, task: Dict) -> None:
+        """Count a registered URL, checked or not"""
+        self.total += 1
+        self._locale(task["locale"])["total"] += 1
+
+    def add_record(self, record: Dict) -> None:
+        """Fold one log record into the aggregates"""
+        self.checked += 1
+        self.retries += record.get("attempts", 1) - 1
+        timing = record.get("timing")
+        if timing:
+            self.timings.add_url(record["url"], timing)
+            self._count_response_time(timing.get("total", 0))
+        link = record.get("link")
+        latency = timing.get("total") if timing else (link or {}).get("latency")
+        if latency is not None:
+            self.sketches.add(host_of(record["url"]), record["locale"], latency)
+        if link is None:
+            return
+
+        self.broken += 1
+        code = str(link['statusCode'])
+        self.error_distribution[code] = self.error_distribution.get(code, 0) + 1
+        self._locale(link['locale'])["broken"] += 1
+
+        latency = link.get('latency', 0)
+        self.latency_total += latency
+        # Records logged before phase timing only have the broken link's latency
+        if not timing:
+            self._count_response_time(latency)
+
+    def _count_response_time(self, latency: float) -> None:
+        for limit, label in RESPONSE_TIME_BUCKETS:
+            if limit is None or latency < limit:
+                self.response_times[label] += 1
+                break
+
+    def merge(self, other: 'RunAggregates') -> None:
+        """Merge aggregates collected by another worker"""
+        self.total += other.total
+        self.checked += other.checked
+        self.broken += other.broken
+        self.retries += other.retries
+        self.latency_total += other.latency_total
+        for code, count in other.error_distribution.items():
+            self.error_distribution[code] = self.error_distribution.get(code, 0) + count
+        for name, stats in other.locales.items():
+            mine = self._locale(name)
+            mine["total"] += stats["total"]
+            mine["broken"] += stats["broken"]
+        for label, count in other.response_times.items():
+            self.response_times[label] += count
+        self.timings.merge(other.timings)
+        self.sketches.merge(other.sketches)
+
+    def success_rate(self) -> float:
+        return ((self.total - self.broken) / self.total) * 100 if self.total else 100
+
+    def avg_latency(self) -> float:
+        """Mean latency of the broken links, in milliseconds"""
+        return self.latency_total / self.broken if self.broken else 0
+
+    def locale_list(self):
+        """Per-locale stats in dashboard format"""
+        return [
+            {
+                "name": name, "total": stats["total"], "broken": stats["broken"],
+                "successRate": ((stats["total"] - stats["broken"]) / stats["total"]) * 100 if stats["total"] > 0 else 100
+            }
+            for name, stats in self.locales.items()
+        ]
+
+
+def write_json_streaming(path: str, fields: Iterable) -> None:
+    """
+    Write a JSON object field by field with the same layout as json.dump(indent=2)
+    A field whose value is an iterator is streamed out as an array, one item at a time
+    """
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write('{')
+        for index, (key, value) in enumerate(fields):
+            f.write(',' if index else '')
+            f.write(f'\n  {json.dumps(key)}: ')
+            if isinstance(value, Iterator):
+                empty = True
+                for item in value:
+                    f.write('[' if empty else ',')
+                    f.write('\n    ' + json.dumps(item, indent=2).replace('\n', '\n    '))
+                    empty = False
+                f.write('[]' if empty else '\n  ]')
+            else:
+                f.write(json.dumps(value, indent=2).replace('\n', '\n  '))
+        f.write('\n}')
+    # Replace atomically so readers never see a half-written file
+    os.replace(tmp_path, path)
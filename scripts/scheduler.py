@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Recheck Scheduler
+Assigns each URL a recheck interval from its history so runs only check the due subset
+"""
+
+import zlib
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from url_history import UrlHistoryIndex
+
+INTERNAL_DOMAIN = "kwalee.com"
+
+# (minimum healthy streak, recheck interval) - first match wins
+INTERNAL_TTLS = [
+    (timedelta(days=14), timedelta(hours=12)),
+    (timedelta(days=3), timedelta(hours=8)),
+]
+EXTERNAL_TTLS = [
+    (timedelta(days=14), timedelta(days=3)),
+    (timedelta(days=7), timedelta(days=1)),
+    (timedelta(days=1), timedelta(hours=12)),
+]
+
+# Dispatch order, lower goes first
+PRIORITY_BROKEN = 0
+PRIORITY_FLAPPING = 1
+PRIORITY_NEW = 2
+PRIORITY_INTERNAL = 3
+PRIORITY_EXTERNAL = 4
+
+
+class RecheckScheduler:
+    """
+    Per-URL TTL scheduler
+    Reads health, streaks and flapping from the per-URL history index, which the checker
+    records every run, so there is a single definition of each
+    """
+
+    def __init__(self, url_history: UrlHistoryIndex):
+        self.url_history = url_history
+
+    def get_ttl(self, url: str, now: Optional[datetime] = None) -> timedelta:
+        """
+        Get the recheck interval for a URL
+        Broken, flapping and unknown URLs are always due
+        """
+        now = now or datetime.now()
+        healthy_since = self.url_history.healthy_since(url)
+        if not healthy_since or self.url_history.is_flapping(url):
+            return timedelta(0)
+
+        streak = now - datetime.fromisoformat(healthy_since)
+        tiers = INTERNAL_TTLS if INTERNAL_DOMAIN in url else EXTERNAL_TTLS
+        for min_streak, ttl in tiers:
+            if streak >= min_streak:
+                return ttl
+        return timedelta(0)
+
+    def get_priority(self, url: str, now: Optional[datetime] = None) -> int:
+        """Get the dispatch priority for a URL"""
+        if self.url_history.get(url) is None:
+            return PRIORITY_NEW
+        if self.url_history.is_broken(url):
+            return PRIORITY_BROKEN
+        if self.url_history.is_flapping(url):
+            return PRIORITY_FLAPPING
+        return PRIORITY_INTERNAL if INTERNAL_DOMAIN in url else PRIORITY_EXTERNAL
+
+    def is_due(self, url: str, now: Optional[datetime] = None) -> bool:
+        """Check if a URL's recheck interval has elapsed"""
+        now = now or datetime.now()
+        ttl = self.get_ttl(url, now)
+        if not ttl:
+            return True
+
+        # Spread expiries over the last quarter of the interval so URLs that
+        # turned healthy together don't all come due on the same run
+        offset = (zlib.crc32(url.encode('utf-8')) % 1000) / 1000
+        ttl = ttl * (0.75 + 0.25 * offset)
+        return now - datetime.fromisoformat(self.url_history.last_checked(url)) >= ttl
+
+    def due_tasks(self, tasks: List[Dict], now: Optional[datetime] = None) -> List[Dict]:
+        """Filter tasks down to the due subset, highest priority first"""
+        now = now or datetime.now()
+        due = [t for t in tasks if self.is_due(t['url'], now)]
+        return sorted(due, key=lambda t: self.get_priority(t['url'], now))
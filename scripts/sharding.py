@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Host-Sharded Work Distribution
+Assigns URLs to worker processes by host so each host's connection pool lives in one process
+"""
+
+import math
+import zlib
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+from host_limiter import host_of
+
+# Expected cost of a URL with no latency history, in milliseconds
+DEFAULT_COST_MS = 1000
+
+
+def estimate_costs(tasks: List[Dict], latency_of: Callable[[str], Optional[float]]) -> List[float]:
+    """
+    Estimate the cost of each task from its last known latency
+    URLs without history fall back to their host's average, then to DEFAULT_COST_MS
+    """
+    known = [latency_of(t['url']) for t in tasks]
+
+    host_totals = defaultdict(lambda: [0.0, 0])
+    for task, latency in zip(tasks, known):
+        if latency:
+            totals = host_totals[host_of(task['url'])]
+            totals[0] += latency
+            totals[1] += 1
+
+    costs = []
+    for task, latency in zip(tasks, known):
+        if not latency:
+            total, count = host_totals.get(host_of(task['url']), (0.0, 0))
+            latency = total / count if count else DEFAULT_COST_MS
+        costs.append(latency)
+    return costs
+
+
+def shard_by_host(tasks: List[Dict], shard_count: int, costs: Optional[List[float]] = None) -> List[List[Dict]]:
+    """
+    Partition tasks into shards so every host lands in as few shards as possible
+    Hosts are placed largest-first onto the least loaded shard. A host costing more
+    than a fair share is split across just enough shards to stay balanced, rather
+    than leaving one worker to straggle. Tasks keep their original relative order.
+    """
+    if shard_count <= 1 or not tasks:
+        return [list(tasks)] if tasks else []
+
+    if costs is None:
+        costs = [1.0] * len(tasks)
+
+    by_host = defaultdict(list)
+    for index, task in enumerate(tasks):
+        by_host[host_of(task['url'])].append(index)
+
+    fair_share = sum(costs) / shard_count
+
+    # Split oversized hosts into contiguous pieces of roughly a fair share each
+    pieces = []
+    for host, indices in by_host.items():
+        host_cost = sum(costs[i] for i in indices)
+        parts = min(shard_count, max(1, math.ceil(host_cost / fair_share))) if fair_share else 1
+        size = math.ceil(len(indices) / parts)
+        for start in range(0, len(indices), size):
+            piece = indices[start:start + size]
+            pieces.append((sum(costs[i] for i in piece), zlib.crc32(host.encode('utf-8')), host, piece))
+
+    # Largest piece first; the hash gives a stable order between equal pieces
+    pieces.sort(key=lambda p: (-p[0], p[1]))
+
+    loads = [0.0] * shard_count
+    shard_hosts = [set() for _ in range(shard_count)]
+    shards = [[] for _ in range(shard_count)]
+    for cost, _, host, piece in pieces:
+        # Pieces of one host go to different shards, otherwise splitting was pointless
+        candidates = [i for i in range(shard_count) if host not in shard_hosts[i]] or range(shard_count)
+        target = min(candidates, key=lambda i: loads[i])
+        loads[target] += cost
+        shard_hosts[target].add(host)
+        shards[target].extend(piece)
+
+    return [[tasks[i] for i in sorted(shard)] for shard in shards if shard]
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Streaming Sitemap Reader
+Reads sitemap.xml files and sitemap indexes (plain or gzipped) with a pull parser,
+so memory stays flat however many URLs a sitemap lists
+"""
+
+import zlib
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, Iterable, Iterator, List, Optional
+from xml.etree import ElementTree
+
+CHUNK_SIZE = 64 * 1024
+# The sitemap protocol caps a file at 50MB uncompressed; anything beyond is ignored
+MAX_SITEMAP_BYTES = 50 * 1024 * 1024
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+def _local(tag: str) -> str:
+    """Tag name without its namespace"""
+    return tag.rsplit('}', 1)[-1]
+
+
+class SitemapParser:
+    """
+    Incremental parser for one sitemap file
+    Feed it raw bytes as they arrive; it yields entries as soon as each
+    <url> or <sitemap> element closes and then drops the element
+    """
+
+    def __init__(self):
+        self.parser = ElementTree.XMLPullParser(events=('start', 'end'))
+        self.decompressor = None
+        self.sniffed = False
+        self.root = None
+        self.size = 0
+
+    def _entries(self) -> List[Dict]:
+        entries = []
+        for event, elem in self.parser.read_events():
+            if event == 'start':
+                if self.root is None:
+                    self.root = elem
+                continue
+            kind = _local(elem.tag)
+            if kind not in ('url', 'sitemap'):
+                continue
+            entry = {"type": kind, "loc": None, "lastmod": None, "alternates": {}}
+            for child in elem:
+                name = _local(child.tag)
+                if name == 'loc' and child.text:
+                    entry["loc"] = child.text.strip()
+                elif name == 'lastmod' and child.text:
+                    entry["lastmod"] = child.text.strip()
+                elif name == 'link' and child.get('rel') == 'alternate' and child.get('hreflang') and child.get('href'):
+                    entry["alternates"][child.get('hreflang').lower()] = child.get('href').strip()
+            if entry["loc"]:
+                entries.append(entry)
+            # Finished entries are removed from the root so the tree never grows
+            self.root.clear()
+        return entries
+
+    def _feed_xml(self, data: bytes) -> List[Dict]:
+        self.size += len(data)
+        if self.size > MAX_SITEMAP_BYTES:
+            raise ElementTree.ParseError("sitemap larger than the protocol limit")
+        self.parser.feed(data)
+        return self._entries()
+
+    def feed(self, chunk: bytes) -> Iterator[Dict]:
+        """Parse the next chunk of the file; gzip is detected from the first bytes"""
+        if not self.sniffed:
+            self.sniffed = True
+            if chunk[:2] == GZIP_MAGIC:
+                self.decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        if self.decompressor is None:
+            yield from self._feed_xml(chunk)
+            return
+
+        # Decompress in bounded steps so a small gzip cannot expand into one huge buffer
+        yield from self._feed_xml(self.decompressor.decompress(chunk, CHUNK_SIZE))
+        while self.decompressor.unconsumed_tail:
+            yield from self._feed_xml(self.decompressor.decompress(self.decompressor.unconsumed_tail, CHUNK_SIZE))
+
+    def close(self) -> Iterator[Dict]:
+        """Flush the parser and return any remaining entries"""
+        if self.decompressor is not None:
+            yield from self._feed_xml(self.decompressor.flush())
+        self.parser.close()
+        yield from self._entries()
+
+
+def parse_sitemap(chunks: Iterable[bytes]) -> List[Dict]:
+    """Parse a whole sitemap from an iterable of byte chunks"""
+    parser = SitemapParser()
+    entries = []
+    for chunk in chunks:
+        entries.extend(parser.feed(chunk))
+    entries.extend(parser.close())
+    return entries
+
+
+async def _read_entries(response) -> AsyncIterator[Dict]:
+    parser = SitemapParser()
+    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+        for entry in parser.feed(chunk):
+            yield entry
+    for entry in parser.close():
+        yield entry
+
+
+async def iter_sitemap_urls(session, sitemaps: Iterable[str], max_urls: Optional[int] = None) -> AsyncIterator[Dict]:
+    """
+    Stream page entries from sitemaps, following sitemap indexes breadth-first
+    Yields {"loc", "lastmod", "alternates"} dicts where alternates maps hreflang to URL
+    """
+    pending = deque(sitemaps)
+    visited = set()
+    count = 0
+    while pending:
+        sitemap = pending.popleft()
+        if sitemap in visited:
+            continue
+        visited.add(sitemap)
+
+        try:
+            async with session.get(sitemap, timeout=60) as response:
+                if response.status != 200:
+                    print(f"⚠️ Could not fetch {sitemap}: {response.status}")
+                    continue
+                async for entry in _read_entries(response):
+                    if entry["type"] == 'sitemap':
+                        pending.append(entry["loc"])
+                        continue
+                    yield {"loc": entry["loc"], "lastmod": entry["lastmod"], "alternates": entry["alternates"]}
+                    count += 1
+                    if max_urls is not None and count >= max_urls:
+                        return
+        except ElementTree.ParseError as e:
+            print(f"⚠️ Invalid sitemap {sitemap}: {e}")
+        except Exception as e:
+            print(f"⚠️ Could not fetch {sitemap}: {e}")
+
+
+def parse_lastmod(value: Optional[str]) -> Optional[datetime]:
+    """
+    Parse a W3C datetime lastmod into an aware datetime
+    A bare date means the page may have changed at any time that day, so it maps to the end of the day
+    """
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.strip().replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if len(value.strip()) == 10:
+        parsed += timedelta(days=1)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def unchanged_since(lastmod: Optional[str], crawled_at: Optional[str]) -> bool:
+    """True when the sitemap says the page has not changed since crawled_at (a local ISO timestamp)"""
+    modified = parse_lastmod(lastmod)
+    if modified is None or not crawled_at:
+        return False
+    try:
+        crawled = datetime.fromisoformat(crawled_at)
+    except ValueError:
+        return False
+    if crawled.tzinfo is None:
+        crawled = crawled.astimezone()
+    return modified <= crawled
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+URL Canonicalization
+Normalizes URLs so trivially different spellings of the same page compare equal
+Rules come from the canonicalization section of config.yaml
+"""
+
+import os
+from fnmatch import fnmatchcase
+from typing import Dict, Optional
+from urllib.parse import unquote_plus, urlsplit, urlunsplit
+
+CONFIG_FILE = "config.yaml"
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+DEFAULT_RULES = {
+    'drop_fragment': True,
+    'sort_query': True,
+    # Query parameters that never change the page; '*' matches any suffix
+    'strip_params': ['utm_*', 'gclid', 'dclid', 'fbclid', 'msclkid', 'mc_cid', 'mc_eid', '_ga', '_gl'],
+    # Per-host trailing slash policy: strip, add or keep; '*' is the fallback
+    'trailing_slash': {'*': 'keep'},
+}
+
+
+def load_rules(config_file: str = CONFIG_FILE) -> Dict:
+    """Canonicalization rules from config.yaml, falling back to the defaults"""
+    rules = dict(DEFAULT_RULES)
+    if os.path.exists(config_file):
+        try:
+            import yaml
+            with open(config_file, 'r') as f:
+                rules.update((yaml.safe_load(f) or {}).get('canonicalization') or {})
+        except:
+            pass
+    return rules
+
+
+class Canonicalizer:
+    """Applies a set of canonicalization rules to absolute URLs"""
+
+    def __init__(self, rules: Optional[Dict] = None):
+        rules = rules if rules is not None else load_rules()
+        self.drop_fragment = rules.get('drop_fragment', True)
+        self.sort_query = rules.get('sort_query', True)
+        self.strip_params = [p.lower() for p in rules.get('strip_params', [])]
+        self.trailing_slash = {host.lower(): policy for host, policy in rules.get('trailing_slash', {}).items()}
+
+    def _slash_policy(self, host: str) -> str:
+        for suffix, policy in self.trailing_slash.items():
+            if suffix != '*' and (host == suffix or host.endswith('.' + suffix)):
+                return policy
+        return self.trailing_slash.get('*', 'keep')
+
+    def _query(self, query: str) -> str:
+        # Work on the raw pairs so the remaining parameters keep their original encoding
+        pairs = []
+        for pair in query.split('&'):
+            if not pair:
+                continue
+            name = unquote_plus(pair.split('=', 1)[0]).lower()
+            if any(fnmatchcase(name, pattern) for pattern in self.strip_params):
+                continue
+            pairs.append(pair)
+        if self.sort_query:
+            pairs.sort(key=lambda pair: pair.split('=', 1)[0])
+        return '&'.join(pairs)
+
+    def _path(self, path: str, host: str) -> str:
+        if not path:
+            return '/'
+        policy = self._slash_policy(host)
+        if policy == 'strip' and path != '/':
+            return path.rstrip('/') or '/'
+        if policy == 'add' and not path.endswith('/') and '.' not in path.rsplit('/', 1)[-1]:
+            return path + '/'
+        return path
+
+    def __call__(self, url: str) -> str:
+        """
+        Canonical form of an absolute URL
+        Lowercases scheme and host, drops default ports, then applies the
+        fragment, tracking parameter, query order and trailing slash rules
+        """
+        parts = urlsplit(url.strip())
+        scheme = parts.scheme.lower()
+        host = (parts.hostname or '').lower()
+        try:
+            port = parts.port
+        except ValueError:
+            # Malformed port, leave the URL as it is
+            return url
+
+        netloc = f"[{host}]" if ':' in host else host  # IPv6 literal
+        if port and port != DEFAULT_PORTS.get(scheme):
+            netloc = f"{netloc}:{port}"
+        if parts.username:
+            netloc = f"{parts.username}{':' + parts.password if parts.password else ''}@{netloc}"
+
+        return urlunsplit((
+            scheme,
+            netloc,
+            self._path(parts.path, host),
+            self._query(parts.query),
+            '' if self.drop_fragment else parts.fragment
+        ))
+
+
+_default = None
+
+
+def canonicalize(url: str) -> str:
+    """Canonicalize with the rules from config.yaml"""
+    global _default
+    if _default is None:
+        _default = Canonicalizer()
+    return _default(url)
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Per-URL Status History Index
+Ring buffer of each URL's recent statuses: the one per-URL store behind recheck scheduling,
+flap detection, "broken since" lookups and the history store's change events
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Dict, Iterable, Optional, Tuple
+
+HISTORY_INDEX = "data/url_history.json"
+# Statuses kept per URL
+RING_SIZE = 32
+# Transitions within the ring that mark a URL as flapping
+FLAP_THRESHOLD = 2
+
+
+def url_key(url: str) -> str:
+    """Short stable hash used as the index key"""
+    return hashlib.blake2b(url.encode('utf-8'), digest_size=8).hexdigest()
+
+
+def is_healthy(status) -> bool:
+    return status == "ok"
+
+
+class UrlHistoryIndex:
+    """
+    Compact per-URL history keyed by URL hash
+    Each entry holds the last RING_SIZE statuses plus when the current
+    healthy/broken streak began, so lookups never touch old results files
+    """
+
+    def __init__(self, index_file: str = HISTORY_INDEX, ring_size: int = RING_SIZE):
+        self.index_file = index_file
+        self.ring_size = ring_size
+        self.entries = self._load()
+
+    def _load(self) -> Dict:
+        """Load the index from JSON"""
+        if os.path.exists(self.index_file):
+            try:
+                with open(self.index_file, 'r') as f:
+                    return json.load(f)
+            except:
+                pass
+        return {}
+
+    def get(self, url: str) -> Optional[Dict]:
+        return self.entries.get(url_key(url))
+
+    def record(self, url: str, status, checked_at: Optional[str] = None) -> None:
+        """Push a status ("ok" or the broken status code) onto the URL's ring"""
+        checked_at = checked_at or datetime.now().isoformat()
+        key = url_key(url)
+        entry = self.entries.get(key)
+
+        if entry is None or is_healthy(entry["r"][-1]) != is_healthy(status):
+            # Health changed, a new streak starts now
+            streak, since = 1, checked_at
+        else:
+            streak, since = entry["streak"] + 1, entry["since"]
+
+        ring = (entry["r"] if entry else []) + [status]
+        self.entries[key] = {
+            "r": ring[-self.ring_size:],
+            "since": since,
+            "streak": streak,
+            "checked": checked_at
+        }
+
+    def record_many(self, statuses: Iterable[Tuple[str, object]], checked_at: Optional[str] = None) -> None:
+        for url, status in statuses:
+            self.record(url, status, checked_at)
+
+    def last_status(self, url: str):
+        """Most recent status ("ok" or the broken status code), None if never checked"""
+        entry = self.get(url)
+        return entry["r"][-1] if entry else None
+
+    def is_broken(self, url: str) -> bool:
+        entry = self.get(url)
+        return bool(entry) and not is_healthy(entry["r"][-1])
+
+    def last_checked(self, url: str) -> Optional[str]:
+        entry = self.get(url)
+        return entry["checked"] if entry else None
+
+    def first_broken(self, url: str) -> Optional[str]:
+        """When the URL's current broken streak began, None if it is healthy"""
+        entry = self.get(url)
+        if not entry or is_healthy(entry["r"][-1]):
+            return None
+        return entry["since"]
+
+    def healthy_since(self, url: str) -> Optional[str]:
+        """When the URL's current healthy streak began, None if it is broken"""
+        entry = self.get(url)
+        if not entry or not is_healthy(entry["r"][-1]):
+            return None
+        return entry["since"]
+
+    def streak(self, url: str) -> int:
+        """Consecutive checks with the URL's current health"""
+        entry = self.get(url)
+        return entry["streak"] if entry else 0
+
+    def flap_count(self, url: str) -> int:
+        """Healthy <-> broken transitions within the ring"""
+        entry = self.get(url)
+        if not entry:
+            return 0
+        health = [is_healthy(s) for s in entry["r"]]
+        return sum(1 for a, b in zip(health, health[1:]) if a != b)
+
+    def is_flapping(self, url: str) -> bool:
+        return self.flap_count(url) >= FLAP_THRESHOLD
+
+    def prune(self, urls: Iterable[str]) -> None:
+        """Drop entries for URLs that are no longer registered"""
+        keep = {url_key(url) for url in urls}
+        self.entries = {key: entry for key, entry in self.entries.items() if key in keep}
+
+    def save(self) -> None:
+        """Write the index to disk"""
+        os.makedirs(os.path.dirname(self.index_file), exist_ok=True)
+        tmp_path = self.index_file + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, separators=(',', ':'))
+        os.replace(tmp_path, self.index_file)
@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Conditional Revalidation Cache
+Persists per-URL HTTP validators (ETag / Last-Modified) between checker runs
+"""
+
+import json
+import os
+from datetime import datetime
+from typing import Dict, Optional
+
+CACHE_FILE = "data/validator_cache.json"
+
+
+class ValidatorCache:
+    """Per-URL validator store used to send conditional requests"""
+
+    def __init__(self, cache_file: str = CACHE_FILE):
+        self.cache_file = cache_file
+        self.entries = self._load()
+        self.updates = {}
+        self.revalidated = 0
+
+    def _load(self) -> Dict:
+        """Load cached validators from JSON"""
+        if os.path.exists(self.cache_file):
+            try:
+                with open(self.cache_file, 'r') as f:
+                    return json.load(f)
+            except:
+                pass
+        return {}
+
+    def get(self, url: str) -> Optional[Dict]:
+        """Get the cached entry for a URL"""
+        if url in self.updates:
+            return self.updates[url]
+        return self.entries.get(url)
+
+    def conditional_headers(self, url: str) -> Dict[str, str]:
+        """
+        Build If-None-Match / If-Modified-Since headers for a URL
+        Only healthy responses are cached, so a 304 always means "still healthy"
+        """
+        entry = self.get(url)
+        if not entry:
+            return {}
+
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('lastModified'):
+            headers['If-Modified-Since'] = entry['lastModified']
+        return headers
+
+    def store(self, url: str, status: int, response_headers, latency: float = None) -> None:
+        """Record the final status and validators of a full response"""
+        etag = response_headers.get('ETag') if response_headers else None
+        last_modified = response_headers.get('Last-Modified') if response_headers else None
+
+        if not (200 <= status < 300) or not (etag or last_modified):
+            # Never revalidate against an error page
+            if url in self.entries or url in self.updates:
+                self.updates[url] = None
+            return
+
+        self.updates[url] = {
+            'etag': etag,
+            'lastModified': last_modified,
+            'status': status,
+            'latency': latency,
+            'lastChecked': datetime.now().isoformat()
+        }
+
+    def mark_unchanged(self, url: str, latency: float = None) -> int:
+        """Handle a 304 response; returns the cached final status"""
+        entry = dict(self.get(url) or {})
+        entry['lastChecked'] = datetime.now().isoformat()
+        if latency is not None:
+            entry['latency'] = latency
+        self.updates[url] = entry
+        self.revalidated += 1
+        return entry.get('status', 200)
+
+    def merge(self, updates: Dict) -> None:
+        """Merge updates collected by a worker process"""
+        self.updates.update(updates)
+
+    def save(self) -> None:
+        """Apply pending updates and write the cache to disk"""
+        for url, entry in self.updates.items():
+            if entry is None:
+                self.entries.pop(url, None)
+            else:
+                self.entries[url] = entry
+        self.updates = {}
+
+        os.makedirs(os.path.dirname(self.cache_file), exist_ok=True)
+        with open(self.cache_file, 'w', encoding='utf-8') as f:
+            json.dump(self.entries, f, indent=2)
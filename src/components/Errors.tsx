@@ -1,7 +1,7 @@
 import { useState, useEffect } from 'react'
 import { Search, Download } from 'lucide-react'
 import Card from './Card'
-import { mockBrokenLinks, loadData } from '../data/mockData'
+import { mockBrokenLinks, loadBrokenLinks } from '../data/mockData'
 import { format } from 'date-fns'
 
 
@@ -24,8 +24,9 @@ export default function Errors() {
   useEffect(() => {
     const loadRealData = async () => {
       try {
-        const data = await loadData()
-        if (data.brokenLinks) setErrors(data.brokenLinks)
+        // Pages stream in, so the table fills as each one arrives
+        const links = await loadBrokenLinks(setErrors)
+        setErrors(links)
       } catch (err) {
         console.error('Error loading errors data:', err)
       }
@@ -83,9 +84,9 @@ export default function Errors() {
   // pagination handlers removed (showing all rows)
 
   const handleExport = () => {
-    let csv = 'Status,URL,Locale,Type,Last Checked\n'
+    let csv = 'Status,URL,Locale,Type,Last Checked,Found On\n'
     filteredErrors.forEach(link => {
-      csv += `${link.statusCode},"${link.url}",${link.locale},${link.errorType},${format(new Date(link.lastChecked), 'yyyy-MM-dd HH:mm')}\n`
+      csv += `${link.statusCode},"${link.url}",${link.locale},${link.errorType},${format(new Date(link.lastChecked), 'yyyy-MM-dd HH:mm')},"${link.sources.join(' ')}"\n`
     })
     
     const blob = new Blob([csv], { type: 'text/csv' })
@@ -159,6 +160,7 @@ export default function Errors() {
                   <th className="text-left py-1 px-2 text-slate-400 font-semibold uppercase text-xs cursor-pointer hover:text-cyan-400" onClick={() => handleSort('locale')}>Locale <SortIndicator column="locale" /></th>
                   <th className="text-left py-1 px-2 text-slate-400 font-semibold uppercase text-xs cursor-pointer hover:text-cyan-400" onClick={() => handleSort('errorType')}>Type <SortIndicator column="errorType" /></th>
                   <th className="text-left py-1 px-2 text-slate-400 font-semibold uppercase text-xs cursor-pointer hover:text-cyan-400" onClick={() => handleSort('lastChecked')}>Last Checked <SortIndicator column="lastChecked" /></th>
+                  <th className="text-left py-1 px-2 text-slate-400 font-semibold uppercase text-xs">Found On</th>
                 </tr>
               </thead>
               <tbody>
@@ -174,11 +176,14 @@ export default function Errors() {
                       <td className="px-2 py-1 text-slate-400 text-xs">{link.locale}</td>
                       <td className="px-2 py-1 text-slate-400 text-xs">{link.errorType}</td>
                       <td className="px-2 py-1 text-slate-500 text-xs">{format(new Date(link.lastChecked), 'MMM dd, HH:mm')}</td>
+                      <td className="px-2 py-1 text-slate-400 truncate text-xs max-w-xs" title={link.sources.join('\n')}>
+                        {link.sources[0]}{link.sources.length > 1 && <span className="text-slate-500"> +{link.sources.length - 1} more</span>}
+                      </td>
                     </tr>
                   ))
                 ) : (
                   <tr>
-                    <td colSpan={5} className="px-2 py-4 text-center text-slate-500 text-xs">No errors found</td>
+                    <td colSpan={6} className="px-2 py-4 text-center text-slate-500 text-xs">No errors found</td>
                   </tr>
                 )}
               </tbody>
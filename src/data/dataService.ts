@@ -1,5 +1,5 @@
-// Data service to fetch real data from results.json
-interface RawBrokenLink {
+// Data service to fetch real data from results.json and its broken link pages
+export interface RawBrokenLink {
   url: string
   locale: string
   statusCode: number
@@ -9,22 +9,69 @@ interface RawBrokenLink {
   isDeepCheck?: boolean
   source: string
   text?: string
+  // From the per-URL history index: start of the current broken streak and recent flaps
+  brokenSince?: string
+  flapCount?: number
+  // Original spellings collapsed into this canonical URL
+  aliases?: string[]
+  // Every [source page, anchor text] pair linking here, from the crawler's source index
+  referrers?: [string, string][]
+  // [source page, href] for pages that wrote this URL in a different spelling
+  spellings?: [string, string][]
+  // [page, hreflang] pairs for locale URLs declared through hreflang alternates
+  declaredBy?: [string, string][]
 }
 
-interface RawResultsData {
+interface BrokenLinkPageIndex {
+  count: number
+  pageSize: number
+  pages: string[]
+}
+
+// Dictionary-encoded, column-oriented page written by scripts/results_store.py
+interface EncodedPage {
+  count: number
+  fields: string[]
+  dictionaries: Record<string, unknown[]>
+  // Pair list fields: [firsts, seconds], with columns holding flat [first, second, ...] index lists
+  pairDictionaries?: Record<string, [string[], string[]]>
+  columns: Record<string, unknown[]>
+}
+
+export interface RawResultsData {
   lastUpdated: string
   totalRuns: number
   totalUrls: number
+  collapsedUrls?: number
+  // Registered URLs skipped because they match the whitelist
+  excludedUrls?: number
+  // HEAD requests not sent because the host is known to reject HEAD
+  savedRoundTrips?: number
+  // Extra attempts spent on timeouts, network errors, 429s and 5xx
+  retries?: number
   brokenLinks: number
+  // Broken locale URLs that pages declare as hreflang alternates
+  brokenAlternates?: number
   successRate: number
-  brokenLinksList: RawBrokenLink[]
+  avgLatency?: number
+  locales?: { name: string; total: number; broken: number; successRate: number }[]
+  errorDistribution?: Record<string, number>
+  // p50/p95/p99 of the total check time this run, from a quantile sketch
+  latencyPercentiles?: { p50: number; p95: number; p99: number; count: number; mean: number }
+  // Total check time of every checked URL, healthy or broken
+  responseTimeDistribution?: Record<string, number>
+  // Older results files inline every broken link
+  brokenLinksList?: RawBrokenLink[]
+  brokenLinksPages?: BrokenLinkPageIndex
 }
 
+// Available under /website_scanner/ on GitHub Pages
+const BASE_PATH = '/website_scanner/'
+
 export async function fetchResultsData(): Promise<RawResultsData> {
   try {
-    // Fetch results.json from public folder (included in build)
-    // Available at /website_scanner/results.json on GitHub Pages
-    const response = await fetch('/website_scanner/results.json')
+    // Fetch the summary from the public folder (included in build)
+    const response = await fetch(`${BASE_PATH}results.json`)
     if (!response.ok) throw new Error('Failed to fetch results.json')
     return await response.json()
   } catch (error) {
@@ -33,6 +80,61 @@ export async function fetchResultsData(): Promise<RawResultsData> {
   }
 }
 
+export function decodePage(page: EncodedPage): RawBrokenLink[] {
+  const columns: Record<string, unknown[]> = {}
+  for (const field of page.fields) {
+    const dictionary = page.dictionaries[field]
+    const pairs = page.pairDictionaries?.[field]
+    if (dictionary) {
+      columns[field] = page.columns[field].map(i => dictionary[i as number])
+    } else if (pairs) {
+      const [firsts, seconds] = pairs
+      columns[field] = page.columns[field].map(flat => {
+        if (flat === null) return null
+        const indexes = flat as number[]
+        const decoded: [string, string][] = []
+        for (let j = 0; j < indexes.length; j += 2) decoded.push([firsts[indexes[j]], seconds[indexes[j + 1]]])
+        return decoded
+      })
+    } else {
+      columns[field] = page.columns[field]
+    }
+  }
+
+  return Array.from({ length: page.count }, (_, i) => {
+    const link: Record<string, unknown> = {}
+    for (const field of page.fields) {
+      if (columns[field][i] !== null) link[field] = columns[field][i]
+    }
+    return link as unknown as RawBrokenLink
+  })
+}
+
+// Fetch broken link pages lazily; onPage fires as each page arrives
+export async function fetchBrokenLinks(
+  data: RawResultsData,
+  onPage?: (links: RawBrokenLink[]) => void
+): Promise<RawBrokenLink[]> {
+  if (data.brokenLinksList) {
+    onPage?.(data.brokenLinksList)
+    return data.brokenLinksList
+  }
+
+  const pages = await Promise.all((data.brokenLinksPages?.pages ?? []).map(async path => {
+    try {
+      const response = await fetch(`${BASE_PATH}${path}`)
+      if (!response.ok) throw new Error(`Failed to fetch ${path}`)
+      const links = decodePage(await response.json())
+      onPage?.(links)
+      return links
+    } catch (error) {
+      console.warn('Could not load broken link page:', error)
+      return []
+    }
+  }))
+  return pages.flat()
+}
+
 // Fallback data if results.json is not available
 function getDefaultData(): RawResultsData {
   return {
@@ -1,4 +1,4 @@
-import { fetchResultsData } from './dataService'
+import { fetchResultsData, fetchBrokenLinks, RawBrokenLink, RawResultsData } from './dataService'
 
 export interface BrokenLink {
   id: string
@@ -8,6 +8,8 @@ export interface BrokenLink {
   errorType: string
   source: string
   text?: string
+  // Every page linking to this URL; falls back to the single source
+  sources: string[]
   lastChecked: string
   latency?: number
 }
@@ -44,29 +46,43 @@ let cachedData: {
   brokenLinks: BrokenLink[]
 } | null = null
 
+function toBrokenLink(link: RawBrokenLink, idx: number): BrokenLink {
+  return {
+    id: idx.toString(),
+    url: link.url,
+    locale: link.locale,
+    statusCode: link.statusCode,
+    errorType: link.errorType,
+    source: link.source,
+    text: link.text,
+    sources: link.referrers ? [...new Set(link.referrers.map(([page]) => page))] : [link.source],
+    lastChecked: link.lastChecked,
+    latency: Math.round(link.latency)
+  }
+}
+
+// Summary data is enough for the first paint; broken links are fetched separately
+let rawDataPromise: Promise<RawResultsData> | null = null
+
+function fetchRawData() {
+  if (!rawDataPromise) rawDataPromise = fetchResultsData()
+  return rawDataPromise
+}
+
 export async function loadData() {
   if (cachedData) return cachedData
 
   try {
-    const rawData = await fetchResultsData()
-
-    // Transform broken links
-    const brokenLinks: BrokenLink[] = rawData.brokenLinksList.map((link, idx) => ({
-      id: idx.toString(),
-      url: link.url,
-      locale: link.locale,
-      statusCode: link.statusCode,
-      errorType: link.errorType,
-      source: link.source,
-      text: link.text,
-      lastChecked: link.lastChecked,
-      latency: Math.round(link.latency)
-    }))
+    const rawData = await fetchRawData()
+    // Older results files inline every link; newer ones page them out
+    const inlineLinks: BrokenLink[] = (rawData.brokenLinksList ?? []).map(toBrokenLink)
 
     // Calculate summary
-    const avgLatency = brokenLinks.length > 0 
-      ? Math.round(brokenLinks.reduce((sum, l) => sum + (l.latency || 0), 0) / brokenLinks.length)
-      : 245
+    const avgLatency = rawData.avgLatency !== undefined
+      ? Math.round(rawData.avgLatency)
+      : inlineLinks.length > 0
+        ? Math.round(inlineLinks.reduce((sum, l) => sum + (l.latency || 0), 0) / inlineLinks.length)
+        : 245
 
     const summary: Summary = {
       totalUrls: rawData.totalUrls,
@@ -78,43 +94,59 @@ export async function loadData() {
     }
 
     // Calculate error distribution
-    const errors: Record<string, number> = {}
-    brokenLinks.forEach(link => {
-      const code = link.statusCode.toString()
-      errors[code] = (errors[code] || 0) + 1
-    })
+    let errors: Record<string, number> = {}
+    if (rawData.errorDistribution) {
+      errors = rawData.errorDistribution
+    } else {
+      inlineLinks.forEach(link => {
+        const code = link.statusCode.toString()
+        errors[code] = (errors[code] || 0) + 1
+      })
+    }
 
     // Calculate response time distribution
-    const responseTimes: Record<string, number> = {
+    let responseTimes: Record<string, number> = {
       '<1s': 0,
       '1-3s': 0,
       '3-5s': 0,
       '>5s': 0
     }
-    brokenLinks.forEach(link => {
-      const latency = link.latency || 0
-      if (latency < 1000) responseTimes['<1s']++
-      else if (latency < 3000) responseTimes['1-3s']++
-      else if (latency < 5000) responseTimes['3-5s']++
-      else responseTimes['>5s']++
-    })
+    if (rawData.responseTimeDistribution) {
+      responseTimes = rawData.responseTimeDistribution
+    } else {
+      inlineLinks.forEach(link => {
+        const latency = link.latency || 0
+        if (latency < 1000) responseTimes['<1s']++
+        else if (latency < 3000) responseTimes['1-3s']++
+        else if (latency < 5000) responseTimes['3-5s']++
+        else responseTimes['>5s']++
+      })
+    }
 
     // Calculate locales
-    const localeMap = new Map<string, { total: number; broken: number }>()
-    brokenLinks.forEach(link => {
-      if (!localeMap.has(link.locale)) {
-        localeMap.set(link.locale, { total: 0, broken: 0 })
-      }
-      const locale = localeMap.get(link.locale)!
-      locale.broken++
-    })
-
-    const locales: Locale[] = Array.from(localeMap.entries()).map(([name, data]) => ({
-      name,
-      total: Math.ceil(rawData.totalUrls / localeMap.size),
-      broken: data.broken,
-      successRate: Math.round(((Math.ceil(rawData.totalUrls / localeMap.size) - data.broken) / Math.ceil(rawData.totalUrls / localeMap.size)) * 1000) / 10
-    })).sort((a, b) => b.broken - a.broken)
+    let locales: Locale[]
+    if (rawData.locales) {
+      locales = rawData.locales.map(locale => ({
+        ...locale,
+        successRate: Math.round(locale.successRate * 10) / 10
+      })).sort((a, b) => b.broken - a.broken)
+    } else {
+      const localeMap = new Map<string, { total: number; broken: number }>()
+      inlineLinks.forEach(link => {
+        if (!localeMap.has(link.locale)) {
+          localeMap.set(link.locale, { total: 0, broken: 0 })
+        }
+        const locale = localeMap.get(link.locale)!
+        locale.broken++
+      })
+
+      locales = Array.from(localeMap.entries()).map(([name, data]) => ({
+        name,
+        total: Math.ceil(rawData.totalUrls / localeMap.size),
+        broken: data.broken,
+        successRate: Math.round(((Math.ceil(rawData.totalUrls / localeMap.size) - data.broken) / Math.ceil(rawData.totalUrls / localeMap.size)) * 1000) / 10
+      })).sort((a, b) => b.broken - a.broken)
+    }
 
     // Generate trends data (simulate last 30 days based on total runs)
     const trends: TrendData[] = Array.from({ length: 30 }, (_, i) => ({
@@ -134,7 +166,7 @@ export async function loadData() {
       errors,
       responseTimes,
       locales,
-      brokenLinks
+      brokenLinks: inlineLinks
     }
 
     return cachedData
@@ -144,6 +176,22 @@ export async function loadData() {
   }
 }
 
+let cachedBrokenLinks: BrokenLink[] | null = null
+
+// Fetch every broken link page; onProgress receives the links loaded so far
+export async function loadBrokenLinks(onProgress?: (links: BrokenLink[]) => void): Promise<BrokenLink[]> {
+  if (cachedBrokenLinks) return cachedBrokenLinks
+
+  const rawData = await fetchRawData()
+  const loaded: BrokenLink[] = []
+  await fetchBrokenLinks(rawData, page => {
+    page.forEach(link => loaded.push(toBrokenLink(link, loaded.length)))
+    onProgress?.([...loaded])
+  })
+  cachedBrokenLinks = loaded
+  return loaded
+}
+
 // Default/fallback data for initial render
 export const mockSummary: Summary = {
   totalUrls: 7837,
@@ -199,6 +247,7 @@ export const mockBrokenLinks: BrokenLink[] = Array.from({ length: 10 }, (_, i) =
   statusCode: [404, 500, 503, 403][i % 4],
   errorType: ['404 Not Found', '500 Server Error', '503 Service Unavailable', '403 Forbidden'][i % 4],
   source: `https://example.com/source-${i + 1}`,
+  sources: [`https://example.com/source-${i + 1}`],
   lastChecked: new Date(Date.now() - i * 3600000).toISOString(),
   latency: 100 + Math.random() * 4900
 }))
@@ -0,0 +1,27 @@
+"""Every extractor backend must give the BeautifulSoup reference's results on the parity corpus"""
+
+import pytest
+
+pytest.importorskip('bs4')
+
+from extractor_parity import BASE_URL, CORPUS
+from link_extractor import available_backends, extract_alternates, extract_links, extract_metadata, extract_page
+
+BACKENDS = [name for name in available_backends() if name != 'bs4']
+
+
+@pytest.mark.parametrize('name', sorted(CORPUS))
+@pytest.mark.parametrize('backend', BACKENDS)
+def test_backend_matches_reference(backend, name):
+    html = CORPUS[name]
+    assert extract_links(html, BASE_URL, backend) == extract_links(html, BASE_URL, 'bs4')
+    assert extract_metadata(html, backend) == extract_metadata(html, 'bs4')
+    assert extract_alternates(html, BASE_URL, backend) == extract_alternates(html, BASE_URL, 'bs4')
+
+
+@pytest.mark.parametrize('name', sorted(CORPUS))
+def test_single_pass_page_matches_reference(name):
+    html = CORPUS[name]
+    assert extract_page(html, BASE_URL) == {"links": extract_links(html, BASE_URL, 'bs4'),
+                                            "alternates": extract_alternates(html, BASE_URL, 'bs4'),
+                                            "metadata": extract_metadata(html, 'bs4')}